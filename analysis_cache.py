@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Cache of AI analysis results for the photo analyzer
+Results are keyed by the SHA-256 of the photos' contents plus the backend, model
+and PROMPT_VERSION, so rerunning after an interruption, or after moving or
+renaming photos, doesn't call the model again. Changing the model or prompt
+misses the old entries. Stored as small JSON files under cache/analysis/ with
+the same size cap and LRU eviction as the preview cache.
+
+    python3 analysis_cache.py stats [project_path]
+    python3 analysis_cache.py clear [project_path]
+"""
+
+import hashlib
+import json
+import sys
+import threading
+from pathlib import Path
+
+from photo_cache import DerivativeCache
+from vision_backends import PROMPT_VERSION
+
+ANALYSIS_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Content-addressed store of analysis dicts"""
+
+    def __init__(self, cache_dir, max_bytes=ANALYSIS_CACHE_MAX_BYTES):
+        self.store = DerivativeCache(cache_dir, max_bytes=max_bytes, suffix='.json')
+        self._digests = {}  # resolved path -> (mtime_ns, size, digest), so a run hashes each file once
+        self._lock = threading.Lock()
+
+    def content_digest(self, path):
+        path = Path(path).resolve()
+        stat = path.stat()
+        with self._lock:
+            known = self._digests.get(path)
+        if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            return known[2]
+        digest = file_digest(path)
+        with self._lock:
+            self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def key_for(self, image_paths, backend):
+        """Cache key for analyzing these photos (in this order) with this backend"""
+        digests = [self.content_digest(path) for path in image_paths]
+        raw = '|'.join([backend.name, backend.model, f'prompt-v{PROMPT_VERSION}', *digests])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Cached analysis dict for key, or None"""
+        path = self.store.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            self.store.discard(key)
+            return None
+
+    def put(self, key, analysis):
+        self.store.put(key, json.dumps(analysis, ensure_ascii=False).encode('utf-8'))
+
+    def invalidate(self, image_paths, backend):
+        """Forget the cached analysis for these photos, so the next run asks the model again"""
+        return self.store.discard(self.key_for(image_paths, backend))
+
+    def clear(self):
+        return self.store.clear()
+
+    def stats(self):
+        return self.store.stats()
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('stats', 'clear'):
+        print("Usage: python3 analysis_cache.py stats|clear [project_path]")
+        sys.exit(1)
+
+    project_path = Path(sys.argv[2]) if len(sys.argv) > 2 else Path.cwd()
+    cache = AnalysisCache(project_path / 'cache' / 'analysis')
+
+    if sys.argv[1] == 'clear':
+        print(f"🧹 Removed {cache.clear()} cached analyses")
+    else:
+        stats = cache.stats()
+        print(f"📦 {stats['entries']} cached analyses, "
+              f"{stats['bytes'] / 1024:.0f} KB of {stats['maxBytes'] / 1024 / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
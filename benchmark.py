@@ -0,0 +1,581 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmarks for the photo organizer server and the photo analyzer
+Everything runs against a synthetic project (seeded, so every run sees the same
+photos and inventory) and reports p50/p95/p99 latency and throughput, compared
+with the baseline saved on this machine.
+
+    python3 benchmark.py fixtures /tmp/depop_bench --photos 60 --items 2000
+    python3 benchmark.py server --fixtures /tmp/depop_bench      # load-test the HTTP endpoints
+    python3 benchmark.py analyzer --fixtures /tmp/depop_bench    # time the analyzer stages
+    python3 benchmark.py all --save-baseline                     # record a baseline to compare against
+
+Without --fixtures a throwaway project is generated first. A run compared with
+the baseline exits with status 1 if any benchmark got slower than --threshold.
+"""
+
+import argparse
+import contextlib
+import csv
+import http.client
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+from PIL import Image
+
+from inventory_store import INVENTORY_FIELDNAMES
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+    HEIC_ENCODER = True
+except ImportError:
+    HEIC_ENCODER = False
+
+REPO_PATH = Path(__file__).resolve().parent
+# Machine-specific, so it lives in the (git-ignored) cache folder
+DEFAULT_BASELINE = REPO_PATH / "cache" / "benchmarks" / "baseline.json"
+FIXTURE_SEED = 2025
+DEFAULT_PHOTO_SIZE = (4032, 3024)  # a 12MP phone photo
+# Share of staging photos per format; the rest are JPEG
+PNG_SHARE = 0.2
+HEIC_SHARE = 0.2
+# A benchmark whose p95 grows (or throughput drops) by more than this is a regression
+DEFAULT_THRESHOLD = 0.25
+
+SERVER_SCENARIOS = ('photo_list', 'thumbnails_cold', 'thumbnails_warm', 'completed_items',
+                    'save', 'update', 'delete')
+ANALYZER_STAGES = ('staging_scan', 'analyze_template', 'payload_encode', 'file_digest',
+                   'inventory_load', 'manifest_load', 'build_row', 'filename_and_hashtags')
+
+BRANDS = ('Zara', 'H&M', 'COS', 'Levis', 'Nike', 'Arket', 'Reformation', 'Uniqlo', 'Vintage', 'ASOS')
+COLORS = ('Black', 'White', 'Navy', 'Red', 'Green', 'Beige', 'Pink', 'Grey', 'Brown', 'Blue')
+CATEGORIES = ('Tops', 'Dresses', 'Bottoms', 'Outerwear', 'Shoes', 'Accessories')
+STATUSES = ('Not Listed', 'Listed', 'Sold')
+
+
+# ---- fixtures -----------------------------------------------------------
+
+def synthetic_photo(rng, size):
+    """Photo-like image: seeded random colour blocks upscaled into smooth gradients
+
+    Noise would be unrealistically hard to compress and flat colour unrealistically
+    easy; upscaled blocks land in between, like real product photos.
+    """
+    width, height = size
+    tile = Image.frombytes('RGB', (32, 24), rng.randbytes(32 * 24 * 3))
+    return tile.resize((width, height), Image.Resampling.BICUBIC)
+
+
+def write_photo(img, path):
+    if path.suffix == '.heic':
+        if HEIC_ENCODER:
+            img.save(path, format='HEIF', quality=80)
+        else:
+            # Pillow detects the format from the contents, so the server still takes its
+            # HEIC path (always converted); only the decoder differs
+            img.save(path, format='JPEG', quality=92)
+    elif path.suffix == '.png':
+        img.save(path, format='PNG')
+    else:
+        img.save(path, format='JPEG', quality=92)
+
+
+def synthetic_row(rng, number):
+    category = rng.choice(CATEGORIES)
+    brand = rng.choice(BRANDS)
+    color = rng.choice(COLORS)
+    row = dict.fromkeys(INVENTORY_FIELDNAMES, '')
+    row.update({
+        'Item_ID': f"DP{number:04d}",
+        'Brand': brand,
+        'Category': category,
+        'Title': f"{brand} {color} {category.lower().rstrip('s')}",
+        'Description': f"{color} {category.lower()} by {brand}, worn a handful of times. #{brand.lower()} #preloved",
+        'Size': rng.choice(('XS', 'S', 'M', 'L', 'UK 8', 'UK 10', 'UK 12')),
+        'Color': color,
+        'Condition': rng.choice(('New with tags', 'Excellent', 'Good', 'Fair')),
+        'Purchase_Price': f"{rng.randint(2, 30)}.00",
+        'Target_Price': f"{rng.randint(8, 80)}.00",
+        'Status': rng.choice(STATUSES),
+        'Date_Added': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        'Photo_1': f"{brand.lower()}_{color.lower()}_{number:03d}_1.jpg",
+        'Hashtags': f"#{brand.lower()} #{color.lower()} #preloved",
+    })
+    return row
+
+
+def build_fixtures(fixture_path, photos=60, items=2000, size=DEFAULT_PHOTO_SIZE, seed=FIXTURE_SEED):
+    """Create a synthetic project at fixture_path: staging photos, inventory CSV and a manifest"""
+    fixture_path = Path(fixture_path)
+    rng = random.Random(seed)
+    staging_path = fixture_path / "photos" / "staging"
+    data_path = fixture_path / "data"
+    for folder in (staging_path, fixture_path / "photos" / "by_category",
+                   fixture_path / "photos" / "ready_for_depop", data_path):
+        folder.mkdir(parents=True, exist_ok=True)
+
+    # Staging photos, named like a phone's camera roll
+    png_count = int(photos * PNG_SHARE)
+    heic_count = int(photos * HEIC_SHARE)
+    suffixes = ['.png'] * png_count + ['.heic'] * heic_count + ['.jpg'] * (photos - png_count - heic_count)
+    rng.shuffle(suffixes)
+    for number, suffix in enumerate(suffixes):
+        write_photo(synthetic_photo(rng, size), staging_path / f"IMG_{1000 + number}{suffix}")
+
+    # Inventory in the organizer's 31-column schema
+    with open(data_path / "inventory_tracker.csv", 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=INVENTORY_FIELDNAMES)
+        writer.writeheader()
+        for number in range(1, items + 1):
+            writer.writerow(synthetic_row(rng, number))
+
+    # A batch-mode manifest confirming every staging photo
+    with open(data_path / "manifest.csv", 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['filename', 'brand', 'category', 'item_type', 'size', 'color', 'condition'])
+        for photo in sorted(staging_path.iterdir()):
+            writer.writerow([photo.name, rng.choice(BRANDS), rng.choice(CATEGORIES).lower(), 'top',
+                             'M', rng.choice(COLORS), 'Good'])
+
+    for name in ("data/hashtag_bank.csv", "photo_organizer.html"):
+        if (REPO_PATH / name).exists():
+            shutil.copy2(REPO_PATH / name, fixture_path / name)
+
+    config = {'photos': photos, 'items': items, 'size': list(size), 'seed': seed, 'realHeic': HEIC_ENCODER}
+    (fixture_path / "fixture.json").write_text(json.dumps(config, indent=2), encoding='utf-8')
+    return config
+
+
+def fixture_config(fixture_path):
+    return json.loads((Path(fixture_path) / "fixture.json").read_text(encoding='utf-8'))
+
+
+# ---- measurement --------------------------------------------------------
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, wall_seconds, errors=0):
+    latencies = sorted(latencies)
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'throughput': len(latencies) / wall_seconds if wall_seconds > 0 else 0.0,
+    }
+
+
+def time_calls(fn, args_list, repeat=1):
+    """Call fn(*args) for every args in args_list, repeat times; returns a summary"""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for args in args_list:
+            call_started = time.perf_counter()
+            fn(*args)
+            latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+# ---- server load generator ----------------------------------------------
+
+class LoadClient:
+    """One keep-alive connection to the server under test"""
+
+    def __init__(self, port):
+        self.port = port
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        """(status, response body); reconnects once if the server closed the connection"""
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        for attempt in (0, 1):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            try:
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.close()
+                return response.status, data
+            except (ConnectionError, http.client.HTTPException):
+                self.close()
+                if attempt:
+                    raise
+
+    def wait_for_job(self, data, poll_interval=0.005):
+        """Poll /api/jobs/<jobId> from a save response until the job ends; returns its HTTP-ish status"""
+        job_id = json.loads(data).get('jobId')
+        while job_id:
+            status, job_data = self.request('GET', f"/api/jobs/{job_id}")
+            if status != 200:
+                return status
+            job_status = json.loads(job_data).get('status')
+            if job_status == 'done':
+                break
+            if job_status == 'failed':
+                return 500
+            time.sleep(poll_interval)
+        return 200
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def run_load(port, requests, concurrency, follow_jobs=False):
+    """Send [(method, path, body)] from concurrency keep-alive clients
+
+    With follow_jobs, a request's latency runs until the background job its
+    response names has finished (a save isn't done until its photos are placed).
+    Returns (summary, [(status, response body)] in request order).
+    """
+    results = [None] * len(requests)
+    latencies = []
+    errors = 0
+    next_index = iter(range(len(requests)))
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal errors
+        client = LoadClient(port)
+        try:
+            while True:
+                with lock:
+                    index = next(next_index, None)
+                if index is None:
+                    return
+                method, path, body = requests[index]
+                started = time.perf_counter()
+                try:
+                    status, data = client.request(method, path, body)
+                    if follow_jobs and status == 200:
+                        status = client.wait_for_job(data)
+                except Exception as e:
+                    status, data = 0, str(e).encode('utf-8')
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    results[index] = (status, data)
+                    if not 200 <= status < 400:
+                        errors += 1
+        finally:
+            client.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(min(concurrency, len(requests)) or 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, time.perf_counter() - started, errors), results
+
+
+@contextlib.contextmanager
+def benchmark_server(fixture_path):
+    """Run the organizer server in-process on a free port against the fixture project
+
+    Yields the port. Previews go to a fresh cache so the first thumbnail pass is cold.
+    """
+    import photo_server
+    from photo_cache import DerivativeCache, init_decode_worker
+
+    class QuietHandler(photo_server.PhotoOrganizerHandler):
+        def log_message(self, format, *args):
+            pass
+
+    cache_dir = tempfile.mkdtemp(prefix='depop_bench_previews_')
+    photo_server.PROJECT_PATH = Path(fixture_path).resolve()
+    photo_server.preview_cache = DerivativeCache(cache_dir, max_bytes=photo_server.preview_cache.max_bytes)
+    photo_server.decode_pool = ProcessPoolExecutor(max_workers=photo_server.DECODE_WORKERS,
+                                                   initializer=init_decode_worker)
+    httpd = photo_server.ThreadedPhotoServer(('127.0.0.1', 0), QuietHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        # The handlers narrate saves and deletes; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield httpd.server_address[1]
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        photo_server.decode_pool.shutdown()
+        photo_server.decode_pool = None
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def wait_for_placements(timeout=120):
+    import photo_server
+    deadline = time.monotonic() + timeout
+    while photo_server.placement_jobs.pending_count() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def server_benchmarks(fixture_path, requests=200, concurrency=8, scenarios=SERVER_SCENARIOS):
+    """Load-test the organizer's endpoints; returns {scenario: summary}"""
+    fixture_path = Path(fixture_path)
+    photos = sorted(path.name for path in (fixture_path / "photos" / "staging").iterdir())
+    thumbnails = [('GET', f"/api/photo/{quote(name)}?size=grid", None) for name in photos]
+    item_count = max(1, requests // 4)  # saves are serialized on the inventory lock
+    results = {}
+
+    with benchmark_server(fixture_path) as port:
+        def run(name, batch, follow_jobs=False):
+            if name in scenarios:
+                results[name], responses = run_load(port, batch, concurrency, follow_jobs)
+                return responses
+            return []
+
+        run('photo_list', [('GET', '/api/photos', None)] * requests)
+        # Cold: every thumbnail rendered in the decode pool; warm: served from the preview cache
+        if 'thumbnails_cold' in scenarios:
+            run('thumbnails_cold', thumbnails)
+        elif 'thumbnails_warm' in scenarios:
+            run_load(port, thumbnails, concurrency)
+        run('thumbnails_warm', (thumbnails * (requests // len(thumbnails) + 1))[:requests])
+        run('completed_items', [('GET', '/api/completed-items?limit=50&sort=dateAdded&order=desc', None)] * requests)
+
+        if not {'save', 'update', 'delete'} & set(scenarios):
+            return results
+
+        saves = [('POST', '/api/save-item', {
+            'photos': [photos[number % len(photos)]],
+            'category': CATEGORIES[number % len(CATEGORIES)],
+            'title': f"Benchmark item {number}",
+            'brand': BRANDS[number % len(BRANDS)],
+            'color': COLORS[number % len(COLORS)],
+            'itemType': 'top',
+            'size': 'M',
+            'condition': 'Good',
+            'targetPrice': '20.00',
+        }) for number in range(item_count)]
+        # A save is timed until its photos are placed, not just until it's queued.
+        # Update and delete need the saved items, and the items are always deleted
+        # again so the fixture inventory is the same for the next run
+        responses = run('save', saves, follow_jobs=True) if 'save' in scenarios else run_load(port, saves, concurrency)[1]
+        wait_for_placements()
+        item_ids = [json.loads(data).get('itemId') for status, data in responses if status == 200]
+        item_ids = [item_id for item_id in item_ids if item_id]
+
+        run('update', [('POST', '/api/save-item', {
+            'itemId': item_id,
+            'category': 'Tops',
+            'title': f"Benchmark item {item_id} (edited)",
+            'brand': 'COS',
+            'color': 'Black',
+            'targetPrice': '25.00',
+        }) for item_id in item_ids])
+        deletes = [('DELETE', f"/api/delete-item/{item_id}", None) for item_id in item_ids]
+        if 'delete' in scenarios:
+            run('delete', deletes)
+        else:
+            run_load(port, deletes, concurrency)
+
+    return results
+
+
+# ---- analyzer micro-benchmarks ------------------------------------------
+
+def analyzer_benchmarks(fixture_path, repeat=3, stages=ANALYZER_STAGES):
+    """Time the photo analyzer's stages on the fixture photos; returns {stage: summary}"""
+    from analysis_cache import file_digest
+    from image_payload import render_payload
+    from inventory_store import InventoryIndex
+    from photo_analyzer import PhotoAnalyzer, load_manifest
+    from vision_backends import ConcurrentAnalyzer, TemplateBackend
+
+    fixture_path = Path(fixture_path)
+    # Template backend, unthrottled: measures our side of an analysis, not a model's
+    vision = ConcurrentAnalyzer(TemplateBackend(), requests_per_minute=1e9)
+    analyzer = PhotoAnalyzer(fixture_path, vision=vision)
+    photos = [(path,) for path in analyzer.staging_image_files()]
+    details = [({
+        'brand': BRANDS[number % len(BRANDS)], 'category': CATEGORIES[number % len(CATEGORIES)].lower(),
+        'item_type': 'top', 'size': 'M', 'color': COLORS[number % len(COLORS)], 'condition': 'Good',
+        'purchase_price': '5.00', 'target_price': '20.00', 'material': 'Cotton', 'notes': '',
+    },) for number in range(len(photos))]
+    csv_path = fixture_path / "data" / "inventory_tracker.csv"
+
+    benchmarks = {
+        'staging_scan': lambda: time_calls(analyzer.staging_image_files, [()], repeat * 10),
+        'analyze_template': lambda: time_calls(analyzer.analyze_photo_with_ai, photos, repeat),
+        'payload_encode': lambda: time_calls(render_payload, photos, 1),
+        'file_digest': lambda: time_calls(file_digest, photos, repeat),
+        'inventory_load': lambda: time_calls(lambda path: InventoryIndex(path).count(), [(csv_path,)], repeat),
+        'manifest_load': lambda: time_calls(load_manifest, [(fixture_path / "data" / "manifest.csv",)], repeat * 10),
+        'build_row': lambda: time_calls(
+            lambda confirmed: analyzer.build_inventory_row(confirmed, 'photo_1.jpg', 'DP0001'), details, repeat * 10),
+        'filename_and_hashtags': lambda: time_calls(
+            lambda confirmed: (analyzer.generate_filename(confirmed), analyzer.suggest_hashtags(confirmed)),
+            details, repeat * 10),
+    }
+    try:
+        return {stage: benchmarks[stage]() for stage in stages}
+    finally:
+        vision.shutdown()
+
+
+# ---- baselines and reporting --------------------------------------------
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def print_results(group, results):
+    print(f"\n📊 {group}")
+    for name, summary in results.items():
+        errors = f"  ❌ {summary['errors']} errors" if summary['errors'] else ''
+        print(f"  {name:<22} {summary['count']:>6}x  "
+              f"p50 {summary['p50'] * 1000:8.2f}ms  p95 {summary['p95'] * 1000:8.2f}ms  "
+              f"p99 {summary['p99'] * 1000:8.2f}ms  {summary['throughput']:9.1f}/s{errors}")
+
+
+def load_baseline(baseline_path):
+    if not Path(baseline_path).exists():
+        return None
+    return json.loads(Path(baseline_path).read_text(encoding='utf-8'))
+
+
+def save_baseline(baseline_path, report):
+    """Merge this run's results into the baseline file (other groups are kept)"""
+    baseline = load_baseline(baseline_path) or {'results': {}}
+    baseline.update({key: value for key, value in report.items() if key != 'results'})
+    for group, results in report['results'].items():
+        baseline['results'].setdefault(group, {}).update(results)
+    Path(baseline_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(baseline_path).write_text(json.dumps(baseline, indent=2), encoding='utf-8')
+
+
+def compare(report, baseline, threshold):
+    """Print changes against the baseline; returns the list of regressions"""
+    if baseline.get('config') != report['config'] or baseline.get('environment') != report['environment']:
+        print("\n⚠️  Baseline was recorded with different settings or on a different machine:")
+        print(f"   baseline {baseline.get('config')} {baseline.get('environment')}")
+        print(f"   this run {report['config']} {report['environment']}")
+
+    regressions = []
+    print(f"\n📐 Compared with baseline from {baseline.get('recordedAt', '?')} (threshold {threshold:.0%})")
+    for group, results in report['results'].items():
+        for name, summary in results.items():
+            before = baseline.get('results', {}).get(group, {}).get(name)
+            if not before:
+                continue
+            p95_change = summary['p95'] / before['p95'] - 1 if before['p95'] else 0.0
+            throughput_change = summary['throughput'] / before['throughput'] - 1 if before['throughput'] else 0.0
+            regressed = p95_change > threshold or throughput_change < -threshold
+            marker = '🔴' if regressed else ('🟢' if p95_change < -threshold else '  ')
+            print(f"  {marker} {group}.{name:<22} p95 {p95_change:+7.1%}  throughput {throughput_change:+7.1%}")
+            if regressed:
+                regressions.append(f"{group}.{name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the photo organizer server and photo analyzer")
+    parser.add_argument('command', choices=('fixtures', 'server', 'analyzer', 'all'))
+    parser.add_argument('path', nargs='?', help="Where 'fixtures' creates the synthetic project")
+    parser.add_argument('--fixtures', help="Synthetic project to benchmark (generated in a temp folder if omitted)")
+    parser.add_argument('--photos', type=int, default=60, help="Staging photos to generate (default 60)")
+    parser.add_argument('--items', type=int, default=2000, help="Inventory rows to generate (default 2000)")
+    parser.add_argument('--size', default='x'.join(map(str, DEFAULT_PHOTO_SIZE)), help="Photo size, WxH")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per server scenario (default 200)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent keep-alive clients (default 8)")
+    parser.add_argument('--repeat', type=int, default=3, help="Passes over the photos per analyzer stage")
+    parser.add_argument('--only', help="Comma-separated scenarios/stages to run")
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="Baseline JSON to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="Record this run as the baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before a benchmark counts as regressed (default 0.25)")
+    parser.add_argument('--json', help="Also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    size = tuple(int(part) for part in args.size.lower().split('x'))
+
+    if args.command == 'fixtures':
+        if not args.path:
+            parser.error("fixtures needs a destination folder")
+        print(f"🧪 Generating {args.photos} photos and {args.items} inventory rows in {args.path}...")
+        config = build_fixtures(args.path, args.photos, args.items, size)
+        if not config['realHeic']:
+            print("💡 pillow-heif isn't installed: .heic fixtures are JPEG-encoded")
+        print("✅ Fixtures ready")
+        return
+
+    temp_fixtures = None
+    fixture_path = args.fixtures
+    if fixture_path is None:
+        temp_fixtures = fixture_path = tempfile.mkdtemp(prefix='depop_bench_')
+        print(f"🧪 Generating fixtures ({args.photos} photos, {args.items} items)...")
+        build_fixtures(fixture_path, args.photos, args.items, size)
+
+    only = set(args.only.split(',')) if args.only else None
+    report = {
+        'recordedAt': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'config': {**fixture_config(fixture_path), 'requests': args.requests,
+                   'concurrency': args.concurrency, 'repeat': args.repeat},
+        'results': {},
+    }
+    try:
+        if args.command in ('server', 'all'):
+            scenarios = [name for name in SERVER_SCENARIOS if only is None or name in only]
+            print(f"🌐 Server: {args.requests} requests per scenario, {args.concurrency} clients")
+            report['results']['server'] = server_benchmarks(fixture_path, args.requests, args.concurrency, scenarios)
+            print_results('Server endpoints', report['results']['server'])
+        if args.command in ('analyzer', 'all'):
+            stages = [name for name in ANALYZER_STAGES if only is None or name in only]
+            report['results']['analyzer'] = analyzer_benchmarks(fixture_path, args.repeat, stages)
+            print_results('Analyzer stages', report['results']['analyzer'])
+    finally:
+        if temp_fixtures:
+            shutil.rmtree(temp_fixtures, ignore_errors=True)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+    if args.save_baseline:
+        save_baseline(args.baseline, report)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\n💡 No baseline at {args.baseline} yet - record one with --save-baseline")
+        return
+    regressions = compare(report, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressed: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Change feed for the photo organizer server
+Mutations (items saved, edited or deleted; photos appearing in or leaving
+staging) are published here and streamed to every open browser tab over
+/api/events as Server-Sent Events, so pages patch their state instead of
+re-downloading the lists. Recent events are kept so a tab that reconnects with
+Last-Event-ID catches up; if it was away too long it's told to reload.
+"""
+
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+# Events kept for reconnecting clients
+EVENT_HISTORY = 500
+# A subscriber that falls this far behind is dropped (it reconnects and catches up)
+SUBSCRIBER_QUEUE_SIZE = 1000
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15
+
+
+class Subscription:
+    """One client's queue of events"""
+
+    def __init__(self, feed):
+        self.feed = feed
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def next_event(self, timeout=HEARTBEAT_SECONDS):
+        """Next event dict, or None after timeout seconds of silence"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+
+class EventFeed:
+    """Thread-safe publish/subscribe of numbered change events"""
+
+    def __init__(self, history=EVENT_HISTORY):
+        # IDs continue from the start time, so IDs from before a restart are always too old
+        first_id = int(time.time() * 1000)
+        self._ids = itertools.count(first_id)
+        self.last_id = first_id - 1
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        """Send an event to every subscriber; returns its ID"""
+        with self._lock:
+            event = {'id': next(self._ids), 'type': event_type, 'data': data, 'time': time.time()}
+            self.last_id = event['id']
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                subscription.overflowed = True
+        return event['id']
+
+    def subscribe(self, last_event_id=None, max_subscribers=None):
+        """Start a Subscription; returns (subscription, missed events or None if they're gone)
+
+        With last_event_id, the events after it are returned for replay. None
+        means some were already dropped from the history (or came from before a
+        server restart), so the client should reload everything.
+        Returns None instead if max_subscribers are already subscribed.
+        """
+        subscription = Subscription(self)
+        with self._lock:
+            if max_subscribers is not None and len(self._subscribers) >= max_subscribers:
+                return None
+            self._subscribers.add(subscription)
+            if last_event_id is None:
+                return subscription, []
+            oldest = self._history[0]['id'] if self._history else self.last_id + 1
+            if last_event_id > self.last_id or oldest > last_event_id + 1:
+                return subscription, None
+            return subscription, [event for event in self._history if event['id'] > last_event_id]
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_event(event):
+    """An event as a text/event-stream message"""
+    return (
+        f"id: {event['id']}\n"
+        f"event: {event['type']}\n"
+        f"data: {json.dumps(event['data'])}\n\n"
+    ).encode('utf-8')
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Image payloads for AI vision requests
+Photos are rotated upright (EXIF orientation), shrunk to a long edge and
+re-encoded as JPEG under a byte budget, so a 12MP HEIC goes out as a few
+hundred KB. Several photos of one item can be tiled into a single image.
+Encoding runs in a process pool and the results are cached on disk, keyed by
+source file + settings.
+"""
+
+import hashlib
+import io
+import math
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+from photo_cache import DerivativeCache, init_decode_worker
+
+PAYLOAD_MAX_EDGE = 1568            # px; larger images are scaled down by the APIs anyway
+PAYLOAD_MAX_BYTES = 1024 * 1024
+PAYLOAD_QUALITIES = (85, 75, 65, 55, 45)
+MIN_PAYLOAD_EDGE = 512             # stop shrinking here even if still over budget
+MAX_TILED_PHOTOS = 4               # tiles are a 2x2 grid at most
+PAYLOAD_CACHE_MAX_BYTES = 256 * 1024 * 1024
+PAYLOAD_MEDIA_TYPE = 'image/jpeg'
+
+
+def load_upright(source_path, max_edge):
+    """Open a photo, apply its EXIF orientation and shrink it to fit max_edge"""
+    with Image.open(source_path) as img:
+        img.draft('RGB', (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    return img
+
+
+def encode_under_budget(img, max_bytes):
+    """JPEG-encode img at the best quality that fits max_bytes, shrinking it if needed"""
+    while True:
+        for quality in PAYLOAD_QUALITIES:
+            buffer = io.BytesIO()
+            img.save(buffer, format='JPEG', quality=quality, optimize=True)
+            if buffer.tell() <= max_bytes:
+                return buffer.getvalue()
+        if max(img.size) <= MIN_PAYLOAD_EDGE:
+            return buffer.getvalue()  # best effort
+        img = img.resize((max(1, img.width * 3 // 4), max(1, img.height * 3 // 4)), Image.Resampling.LANCZOS)
+
+
+def render_payload(source_path, max_edge=PAYLOAD_MAX_EDGE, max_bytes=PAYLOAD_MAX_BYTES):
+    """Payload bytes for one photo (runs in the process pool)"""
+    return encode_under_budget(load_upright(source_path, max_edge), max_bytes)
+
+
+def render_tiled_payload(source_paths, max_edge=PAYLOAD_MAX_EDGE, max_bytes=PAYLOAD_MAX_BYTES):
+    """One payload showing up to MAX_TILED_PHOTOS photos in a grid (runs in the process pool)"""
+    source_paths = list(source_paths)[:MAX_TILED_PHOTOS]
+    columns = 1 if len(source_paths) == 1 else 2
+    rows = math.ceil(len(source_paths) / columns)
+    cell = max_edge // columns
+
+    sheet = Image.new('RGB', (cell * columns, cell * rows), 'white')
+    for index, source_path in enumerate(source_paths):
+        tile = load_upright(source_path, cell)
+        left = (index % columns) * cell + (cell - tile.width) // 2
+        top = (index // columns) * cell + (cell - tile.height) // 2
+        sheet.paste(tile, (left, top))
+    return encode_under_budget(sheet, max_bytes)
+
+
+class PayloadPreparer:
+    """Prepares (and caches) request payloads in a process pool, ahead of the calls that need them"""
+
+    def __init__(self, cache_dir, max_edge=PAYLOAD_MAX_EDGE, max_bytes=PAYLOAD_MAX_BYTES,
+                 workers=None, tile=False):
+        self.cache = DerivativeCache(cache_dir, max_bytes=PAYLOAD_CACHE_MAX_BYTES)
+        self.max_edge = max_edge
+        self.max_bytes = max_bytes
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.tile = tile
+        self._pool = None
+        self._inflight = {}  # cache key -> Future for bytes
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, cache_dir):
+        """Settings from DEPOP_VISION_MAX_EDGE, DEPOP_VISION_MAX_BYTES and DEPOP_VISION_TILE=1"""
+        return cls(
+            cache_dir,
+            max_edge=int(os.environ.get('DEPOP_VISION_MAX_EDGE', PAYLOAD_MAX_EDGE)),
+            max_bytes=int(os.environ.get('DEPOP_VISION_MAX_BYTES', PAYLOAD_MAX_BYTES)),
+            tile=os.environ.get('DEPOP_VISION_TILE') == '1'
+        )
+
+    def _jobs(self, image_paths):
+        """(cache key, render function, source) for each payload these photos need"""
+        params = {'maxEdge': self.max_edge, 'maxBytes': self.max_bytes}
+        if self.tile and len(image_paths) > 1:
+            keys = [self.cache.key_for(path, **params) for path in image_paths[:MAX_TILED_PHOTOS]]
+            key = hashlib.sha1(('tile|' + '|'.join(keys)).encode('utf-8')).hexdigest()
+            return [(key, render_tiled_payload, [str(path) for path in image_paths])]
+        return [(self.cache.key_for(path, **params), render_payload, str(path)) for path in image_paths]
+
+    def submit(self, image_paths):
+        """Start preparing payloads for one item's photos; returns a Future per payload"""
+        futures = []
+        for key, render, source in self._jobs(list(image_paths)):
+            cached = self.cache.get(key)
+            if cached is not None:
+                future = Future()
+                future.set_result(cached.read_bytes())
+                futures.append(future)
+                continue
+
+            with self._lock:
+                future = self._inflight.get(key)
+                if future is None:
+                    if self._pool is None:
+                        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_decode_worker)
+                    future = self._pool.submit(render, source, self.max_edge, self.max_bytes)
+                    future.add_done_callback(lambda done, key=key: self._store(key, done))
+                    self._inflight[key] = future
+            futures.append(future)
+        return futures
+
+    def _store(self, key, future):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+
+    def prepare(self, image_paths):
+        """Payloads for one item's photos as [(bytes, media type)], waiting for any still encoding"""
+        return [(future.result(), PAYLOAD_MEDIA_TYPE) for future in self.submit(image_paths)]
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,766 @@
+#!/usr/bin/env python3
+"""
+Inventory storage for the Depop organizer
+By default data/inventory_tracker.csv is kept parsed in memory, keyed by
+Item_ID with secondary indexes on Status, Category and Brand. The file is only
+re-read when its mtime or size changes, so lookups don't re-parse the whole CSV.
+Writes go to an append-only journal next to the CSV, which is folded back into
+the CSV in the background.
+
+If data/inventory.db exists the SQLite backend is used instead: single-row
+UPDATE/DELETE in transactions, with the CSV produced on demand.
+
+Both backends keep a RevisionLog, so callers can ask which items changed or
+were deleted since a revision they've already seen.
+
+    python3 inventory_store.py import [project_path]   # CSV -> inventory.db
+    python3 inventory_store.py export [project_path]   # inventory.db -> CSV
+"""
+
+import contextlib
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process journal lock
+    fcntl = None
+
+from metrics import histogram
+from revisions import RevisionLog, row_fingerprint
+
+# Column order written by the web organizer
+INVENTORY_FIELDNAMES = ['Item_ID', 'Brand', 'Category', 'Subcategory', 'Title', 'Description',
+                        'Style', 'Source', 'Age', 'Size', 'Color', 'Condition',
+                        'Purchase_Price', 'Target_Price', 'Actual_Sale_Price',
+                        'Parcel_Size', 'International_Shipping', 'City',
+                        'Photo_1', 'Photo_2', 'Photo_3', 'Photo_4',
+                        'Hashtags', 'Status', 'Date_Added', 'Date_Listed', 'Date_Sold',
+                        'Likes', 'Views', 'Notes', 'Depop_Folder']
+
+ITEM_ID_PREFIX = 'DP'
+
+INVENTORY_DB_NAME = 'inventory.db'
+
+# CSV storage: rewrite inventory_tracker.csv once the journal has this many records
+JOURNAL_COMPACT_THRESHOLD = 200
+
+csv_load_seconds = histogram('depop_inventory_csv_load_seconds',
+                             'Time to parse the inventory CSV and replay its journal (count = parses)')
+
+
+def parse_item_number(item_id):
+    """Return the number in an ID like DP012, or None if it isn't one"""
+    if not item_id or not item_id.startswith(ITEM_ID_PREFIX):
+        return None
+    try:
+        return int(item_id[len(ITEM_ID_PREFIX):])
+    except ValueError:
+        return None
+
+
+def index_key(value):
+    """Normalise a Status/Category/Brand value for index lookups"""
+    return (value or '').strip().lower()
+
+
+def category_key(category):
+    """Index categories by their top level, e.g. 'Tops > T-shirts' -> 'tops'"""
+    return index_key((category or '').split(' > ')[0])
+
+
+class InventoryIndex:
+    """Process-wide, thread-safe view of the inventory CSV
+
+    Writes don't rewrite the CSV. Each save/edit/delete appends one record to
+    inventory_tracker.journal (an upsert or a delete tombstone) and readers fold
+    the journal over the CSV snapshot. Once the journal passes
+    JOURNAL_COMPACT_THRESHOLD records a background thread rewrites the CSV and
+    empties the journal. Replaying a record twice gives the same result, so a
+    crash during compaction can't lose or duplicate items, and a crash while
+    appending only loses the half-written last line.
+
+    Rows are plain dicts as produced by csv.DictReader. Callers must treat
+    returned rows as read-only and go through update()/delete() to change them.
+    """
+
+    def __init__(self, csv_path, compact_threshold=None):
+        self.csv_path = Path(csv_path)
+        self.journal_path = self.csv_path.with_suffix('.journal')
+        # flock()ed by every process appending to or compacting the journal
+        self.lock_path = self.csv_path.with_suffix('.lock')
+        self.compact_threshold = compact_threshold or JOURNAL_COMPACT_THRESHOLD
+        self.fieldnames = list(INVENTORY_FIELDNAMES)
+        self.load_count = 0
+        self._lock = threading.RLock()
+        self._csv_signature = None  # (mtime_ns, size) of the snapshot we last loaded
+        self._journal_offset = 0    # bytes of the journal already applied
+        self._journal_records = 0
+        self._compacting = False
+        self._rows = {}             # seq -> row, in file order
+        self._next_seq = 0
+        self._seqs_by_id = {}       # Item_ID -> [seq, ...]
+        self._by_status = {}        # key -> {seq: row}
+        self._by_category = {}
+        self._by_brand = {}
+        self._max_id_number = 0
+        self._revisions = RevisionLog()
+
+    # ---- loading -------------------------------------------------------
+
+    def _file_signature(self, path):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self):
+        """Pick up changes on disk: reload if the CSV changed, else apply new journal records"""
+        with self._lock:
+            signature = self._file_signature(self.csv_path)
+            if signature != self._csv_signature or not self.load_count:
+                self._load(signature)
+                return
+
+            journal_size = self._file_signature(self.journal_path)
+            journal_size = journal_size[1] if journal_size else 0
+            if journal_size < self._journal_offset:
+                # Another process compacted the journal away
+                self._load(signature)
+            elif journal_size > self._journal_offset:
+                self._apply_journal_tail()
+
+    def _load(self, signature):
+        started = time.perf_counter()
+        self._rows = {}
+        self._seqs_by_id = {}
+        self._by_status = {}
+        self._by_category = {}
+        self._by_brand = {}
+        self._max_id_number = 0
+        self.fieldnames = list(INVENTORY_FIELDNAMES)
+
+        if signature is not None:
+            with open(self.csv_path, 'r', encoding='utf-8', newline='') as file:
+                reader = csv.DictReader(file)
+                for row in reader:
+                    self._add_row(row)
+                if reader.fieldnames:
+                    self.fieldnames = list(reader.fieldnames)
+
+        self._csv_signature = signature
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._apply_journal_tail()
+        self.load_count += 1
+        # A reload (the CSV changed on disk) only bumps revisions for rows that differ
+        self._revisions.sync({
+            item_id: row_fingerprint(self._rows[seqs[-1]]) for item_id, seqs in self._seqs_by_id.items()
+        })
+        csv_load_seconds.observe(time.perf_counter() - started)
+
+    def _apply_journal_tail(self):
+        """Apply journal records appended since the last read"""
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, 'rb') as file:
+            file.seek(self._journal_offset)
+            for line in file:
+                if not line.endswith(b'\n'):
+                    break  # Torn write from a crash (or a writer still going); skip it
+                self._journal_offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply_record(record)
+                self._journal_records += 1
+
+    # ---- in-memory row bookkeeping -------------------------------------
+
+    def _add_row(self, row):
+        seq = self._next_seq
+        self._next_seq += 1
+        self._rows[seq] = row
+        self._seqs_by_id.setdefault(row.get('Item_ID', ''), []).append(seq)
+        self._index_row(seq, row)
+        number = parse_item_number(row.get('Item_ID'))
+        if number is not None and number > self._max_id_number:
+            self._max_id_number = number
+        return seq
+
+    def _index_row(self, seq, row):
+        self._by_status.setdefault(index_key(row.get('Status')), {})[seq] = row
+        self._by_category.setdefault(category_key(row.get('Category')), {})[seq] = row
+        self._by_brand.setdefault(index_key(row.get('Brand')), {})[seq] = row
+
+    def _unindex_row(self, seq, row):
+        self._by_status.get(index_key(row.get('Status')), {}).pop(seq, None)
+        self._by_category.get(category_key(row.get('Category')), {}).pop(seq, None)
+        self._by_brand.get(index_key(row.get('Brand')), {}).pop(seq, None)
+
+    def _apply_record(self, record):
+        """Fold one journal record into the in-memory rows"""
+        if record.get('op') == 'batch':
+            for child in record.get('records', []):
+                self._apply_record(child)
+            return
+
+        item_id = record.get('id', '')
+        seqs = self._seqs_by_id.get(item_id, [])
+
+        if record.get('op') == 'delete':
+            for seq in self._seqs_by_id.pop(item_id, []):
+                self._unindex_row(seq, self._rows.pop(seq))
+            self._revisions.remove(item_id)
+            if parse_item_number(item_id) == self._max_id_number:
+                numbers = (parse_item_number(i) for i in self._seqs_by_id)
+                self._max_id_number = max((n for n in numbers if n is not None), default=0)
+        elif record.get('op') == 'upsert':
+            changes = record.get('row', {})
+            if not seqs:
+                row = {name: '' for name in self.fieldnames}
+                row.update(changes)
+                row['Item_ID'] = item_id
+                self._add_row(row)
+            for seq in seqs:
+                row = self._rows[seq]
+                self._unindex_row(seq, row)
+                row.update(changes)
+                self._index_row(seq, row)
+            seqs = self._seqs_by_id[item_id]
+            self._revisions.touch(item_id, row_fingerprint(self._rows[seqs[-1]]))
+
+    # ---- reads ---------------------------------------------------------
+
+    def count(self):
+        """Number of rows in the inventory"""
+        with self._lock:
+            self.refresh()
+            return len(self._rows)
+
+    def rows(self):
+        """All rows in file order"""
+        with self._lock:
+            self.refresh()
+            return list(self._rows.values())
+
+    def get(self, item_id):
+        """Row for item_id, or None"""
+        with self._lock:
+            self.refresh()
+            seqs = self._seqs_by_id.get(item_id)
+            return self._rows[seqs[-1]] if seqs else None
+
+    def by_status(self, status):
+        with self._lock:
+            self.refresh()
+            return list(self._by_status.get(index_key(status), {}).values())
+
+    def by_category(self, category):
+        with self._lock:
+            self.refresh()
+            return list(self._by_category.get(category_key(category), {}).values())
+
+    def by_brand(self, brand):
+        with self._lock:
+            self.refresh()
+            return list(self._by_brand.get(index_key(brand), {}).values())
+
+    def max_id_number(self):
+        """Highest DPxxx number in use (0 for an empty inventory)"""
+        with self._lock:
+            self.refresh()
+            return self._max_id_number
+
+    def revision(self):
+        """Current revision; bumped by every change to an item"""
+        with self._lock:
+            self.refresh()
+            return self._revisions.revision
+
+    def changes_since(self, since):
+        """(revision, changed rows, deleted Item_IDs) after revision since, or None if it's too old"""
+        with self._lock:
+            self.refresh()
+            changes = self._revisions.changes_since(since)
+            if changes is None:
+                return None
+            changed, deleted = changes
+            rows = [self._rows[self._seqs_by_id[item_id][-1]] for item_id in changed]
+            return self._revisions.revision, rows, deleted
+
+    # ---- writes --------------------------------------------------------
+
+    def append(self, row):
+        """Add a new row (one journal upsert)"""
+        with self._lock:
+            self.refresh()
+            stored = {name: row.get(name, '') for name in self.fieldnames}
+            self._write_record({'op': 'upsert', 'id': stored.get('Item_ID', ''), 'row': stored})
+            return self._check_applied(stored.get('Item_ID', ''), stored)
+
+    def append_many(self, rows):
+        """Add several new rows as one journal record, so they land all together or not at all"""
+        with self._lock:
+            self.refresh()
+            stored = [{name: row.get(name, '') for name in self.fieldnames} for row in rows]
+            if stored:
+                self._write_record({
+                    'op': 'batch',
+                    'records': [{'op': 'upsert', 'id': row.get('Item_ID', ''), 'row': row} for row in stored]
+                })
+            return [self._check_applied(row.get('Item_ID', ''), row) for row in stored]
+
+    def update(self, item_id, changes):
+        """Merge changes into every row with item_id (one journal upsert); returns the updated row"""
+        with self._lock:
+            self.refresh()
+            if item_id not in self._seqs_by_id:
+                raise KeyError(item_id)
+            changes = {name: value for name, value in changes.items() if name in self.fieldnames}
+            self._write_record({'op': 'upsert', 'id': item_id, 'row': changes})
+            return self._check_applied(item_id, changes)
+
+    def delete(self, item_id):
+        """Remove every row with item_id (one journal tombstone); returns the removed rows"""
+        with self._lock:
+            self.refresh()
+            removed = [self._rows[seq] for seq in self._seqs_by_id.get(item_id, [])]
+            if removed:
+                self._write_record({'op': 'delete', 'id': item_id})
+                if item_id in self._seqs_by_id:
+                    raise RuntimeError(f"Inventory journal delete of {item_id} wasn't applied")
+            return removed
+
+    def _check_applied(self, item_id, values):
+        """The row for item_id after a write, raising if the write didn't land"""
+        row = self.get(item_id)
+        if row is None or any(row.get(name) != value for name, value in values.items()):
+            raise RuntimeError(f"Inventory journal record for {item_id} wasn't applied")
+        return row
+
+    @contextlib.contextmanager
+    def _journal_lock(self):
+        """Exclusive lock on the journal, shared with other processes (e.g. photo_analyzer.py)"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _repair_journal_tail(self):
+        """Cut off a torn last line (a writer crashed mid-append) so new records start on a fresh line
+
+        Only called under the journal lock, when no other writer can be mid-append.
+        """
+        try:
+            file = open(self.journal_path, 'r+b')
+        except FileNotFoundError:
+            return
+        with file:
+            end = file.seek(0, os.SEEK_END)
+            if not end:
+                return
+            file.seek(end - 1)
+            if file.read(1) == b'\n':
+                return
+            # Walk back to the last complete line
+            position = end
+            while position > 0:
+                start = max(0, position - 64 * 1024)
+                file.seek(start)
+                newline = file.read(position - start).rfind(b'\n')
+                if newline >= 0:
+                    position = start + newline + 1
+                    break
+                position = start
+            file.truncate(position)
+            file.flush()
+            os.fsync(file.fileno())
+        print(f"⚠️  Dropped an incomplete record at the end of {self.journal_path.name}")
+
+    def _write_record(self, record):
+        """Append one record to the journal, fsync it, then fold it into memory"""
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._journal_lock():
+            # Another process may have compacted since our last read, leaving our
+            # journal offset pointing past the end of the emptied journal
+            self.refresh()
+            if self._csv_signature is None:
+                # Start a snapshot with just the header so the CSV always exists
+                self._write_snapshot()
+
+            self._repair_journal_tail()
+            with open(self.journal_path, 'a', encoding='utf-8') as file:
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+
+            # Reads our record back along with anything other processes appended
+            self._apply_journal_tail()
+        if self._journal_records >= self.compact_threshold and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self.compact, name='inventory-compactor', daemon=True).start()
+
+    # ---- compaction ----------------------------------------------------
+
+    def compact(self):
+        """Rewrite the CSV from the folded rows and empty the journal"""
+        with self._lock:
+            try:
+                # Holding the journal lock, no other process can append between
+                # reading the journal and emptying it
+                with self._journal_lock():
+                    self.refresh()
+                    if not self._journal_records:
+                        return
+                    self._write_snapshot()
+                    with open(self.journal_path, 'w', encoding='utf-8'):
+                        pass
+                    self._journal_offset = 0
+                    self._journal_records = 0
+            finally:
+                self._compacting = False
+
+    def _write_snapshot(self):
+        """Write all rows to the CSV via a temp file so a crash can't truncate it"""
+        tmp_path = self.csv_path.with_name(f'{self.csv_path.name}.tmp')
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=self.fieldnames, restval='', extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self._rows.values())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.csv_path)
+        self._csv_signature = self._file_signature(self.csv_path)
+
+
+class SqliteInventory:
+    """SQLite-backed inventory with the same interface as InventoryIndex
+
+    Every CSV column is stored as TEXT in the items table, in header order, so
+    import/export round-trips losslessly. Underscore-prefixed columns hold
+    normalised copies of Status/Category/Brand and the DP number for the indexes.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._create_schema()
+        self.fieldnames = self._read_fieldnames()
+        self._revisions = RevisionLog()
+        self._data_version = None
+        self._sync_revisions()
+
+    def _create_schema(self):
+        columns = ', '.join(f'"{name}" TEXT' for name in INVENTORY_FIELDNAMES)
+        with self._conn:
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS items ('
+                f'_row INTEGER PRIMARY KEY AUTOINCREMENT, '
+                f'_status_key TEXT, _category_key TEXT, _brand_key TEXT, _item_number INTEGER, '
+                f'{columns})'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_items_item_id ON items("Item_ID")')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_items_status ON items(_status_key)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_items_category ON items(_category_key)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_items_brand ON items(_brand_key)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_items_number ON items(_item_number)')
+
+    def _read_fieldnames(self):
+        info = self._conn.execute('PRAGMA table_info(items)').fetchall()
+        return [col['name'] for col in info if not col['name'].startswith('_')]
+
+    def _ensure_columns(self, names):
+        """Add TEXT columns for CSV headers the table doesn't have yet"""
+        for name in names:
+            if name and name not in self.fieldnames and not name.startswith('_'):
+                self._conn.execute(f'ALTER TABLE items ADD COLUMN "{name}" TEXT')
+                self.fieldnames.append(name)
+
+    def _derived_columns(self, row):
+        return {
+            '_status_key': index_key(row.get('Status')),
+            '_category_key': category_key(row.get('Category')),
+            '_brand_key': index_key(row.get('Brand')),
+            '_item_number': parse_item_number(row.get('Item_ID')),
+        }
+
+    def _to_row(self, record):
+        return {name: (record[name] if record[name] is not None else '') for name in self.fieldnames}
+
+    def _select(self, where='', params=()):
+        with self._lock:
+            cursor = self._conn.execute(f'SELECT * FROM items {where} ORDER BY _row', params)
+            return [self._to_row(record) for record in cursor]
+
+    def _insert(self, row):
+        values = {name: row.get(name) for name in self.fieldnames}
+        values.update(self._derived_columns(row))
+        names = list(values)
+        columns = ', '.join(f'"{name}"' for name in names)
+        placeholders = ', '.join('?' for _ in names)
+        self._conn.execute(
+            f'INSERT INTO items ({columns}) VALUES ({placeholders})',
+            [values[name] for name in names]
+        )
+
+    # ---- reads ---------------------------------------------------------
+
+    def _sync_revisions(self):
+        """Diff every row into the revision log (at startup, and when another process wrote)"""
+        with self._lock:
+            self._data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            self._revisions.sync({row['Item_ID']: row_fingerprint(row) for row in self._select()})
+
+    def _track(self, item_id):
+        """Record our own write to item_id (data_version only counts other connections' writes)"""
+        row = self.get(item_id)
+        if row is None:
+            self._revisions.remove(item_id)
+        else:
+            self._revisions.touch(item_id, row_fingerprint(row))
+
+    def refresh(self):
+        """Nothing to do: every read goes to the database"""
+
+    def compact(self):
+        """Nothing to do: SQLite writes in place"""
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+
+    def rows(self):
+        return self._select()
+
+    def get(self, item_id):
+        rows = self._select('WHERE "Item_ID" = ?', (item_id,))
+        return rows[-1] if rows else None
+
+    def by_status(self, status):
+        return self._select('WHERE _status_key = ?', (index_key(status),))
+
+    def by_category(self, category):
+        return self._select('WHERE _category_key = ?', (category_key(category),))
+
+    def by_brand(self, brand):
+        return self._select('WHERE _brand_key = ?', (index_key(brand),))
+
+    def max_id_number(self):
+        with self._lock:
+            value = self._conn.execute('SELECT MAX(_item_number) FROM items').fetchone()[0]
+            return value or 0
+
+    def revision(self):
+        with self._lock:
+            if self._conn.execute('PRAGMA data_version').fetchone()[0] != self._data_version:
+                self._sync_revisions()
+            return self._revisions.revision
+
+    def changes_since(self, since):
+        """(revision, changed rows, deleted Item_IDs) after revision since, or None if it's too old"""
+        with self._lock:
+            revision = self.revision()
+            changes = self._revisions.changes_since(since)
+            if changes is None:
+                return None
+            changed, deleted = changes
+            rows = [row for row in (self.get(item_id) for item_id in changed) if row is not None]
+            return revision, rows, deleted
+
+    # ---- writes --------------------------------------------------------
+
+    def append(self, row):
+        with self._lock:
+            with self._conn:
+                self._insert(row)
+            self._track(row.get('Item_ID', ''))
+        return {name: row.get(name, '') for name in self.fieldnames}
+
+    def append_many(self, rows):
+        """Insert several rows in one transaction"""
+        with self._lock:
+            with self._conn:
+                for row in rows:
+                    self._insert(row)
+            for row in rows:
+                self._track(row.get('Item_ID', ''))
+        return [{name: row.get(name, '') for name in self.fieldnames} for row in rows]
+
+    def update(self, item_id, changes):
+        """Update the row(s) for item_id in one statement; returns the updated row"""
+        changes = {name: value for name, value in changes.items() if name in self.fieldnames}
+        with self._lock, self._conn:
+            current = self.get(item_id)
+            if current is None:
+                raise KeyError(item_id)
+            current.update(changes)
+            values = dict(changes)
+            values.update(self._derived_columns(current))
+            assignments = ', '.join(f'"{name}" = ?' for name in values)
+            self._conn.execute(
+                f'UPDATE items SET {assignments} WHERE "Item_ID" = ?',
+                [*values.values(), item_id]
+            )
+        with self._lock:
+            self._track(item_id)
+        return current
+
+    def delete(self, item_id):
+        """Delete the row(s) for item_id; returns the removed rows"""
+        with self._lock, self._conn:
+            removed = self._select('WHERE "Item_ID" = ?', (item_id,))
+            if removed:
+                self._conn.execute('DELETE FROM items WHERE "Item_ID" = ?', (item_id,))
+        with self._lock:
+            self._track(item_id)
+        return removed
+
+    # ---- CSV import / export -------------------------------------------
+
+    def import_csv(self, csv_path):
+        """Replace the table contents with the rows of an inventory CSV; returns the row count"""
+        with open(csv_path, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.DictReader(file)
+            rows = list(reader)
+            header = list(reader.fieldnames or INVENTORY_FIELDNAMES)
+
+        with self._lock, self._conn:
+            self._ensure_columns(header)
+            self._conn.execute('DELETE FROM items')
+            for row in rows:
+                self._insert(row)
+        self._sync_revisions()
+        return len(rows)
+
+    def export_csv(self, csv_path):
+        """Write the inventory out as a CSV (via a temp file); returns the row count"""
+        csv_path = Path(csv_path)
+        rows = self.rows()
+        tmp_path = csv_path.with_name(f'{csv_path.name}.tmp')
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=self.fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_path, csv_path)
+        return len(rows)
+
+
+# Columns searched by the free-text filter
+SEARCH_FIELDS = ('Item_ID', 'Brand', 'Title', 'Description', 'Category', 'Subcategory',
+                 'Color', 'Size', 'Hashtags', 'Notes')
+
+
+def inventory_filter(status=None, category=None, brand=None,
+                     date_from=None, date_to=None, text=None):
+    """Predicate for one row matching every given filter (see filter_inventory)"""
+    needle = (text or '').strip().lower()
+
+    def matches(row):
+        if status and index_key(row.get('Status')) != index_key(status):
+            return False
+        if category and category_key(row.get('Category')) != category_key(category):
+            return False
+        if brand and index_key(row.get('Brand')) != index_key(brand):
+            return False
+        date_added = row.get('Date_Added') or ''
+        if date_from and date_added < date_from:
+            return False
+        if date_to and date_added > date_to:
+            return False
+        if needle and not any(needle in (row.get(field) or '').lower() for field in SEARCH_FIELDS):
+            return False
+        return True
+
+    return matches
+
+
+def filter_inventory(store, status=None, category=None, brand=None,
+                     date_from=None, date_to=None, text=None):
+    """Rows matching every given filter (in store order)
+
+    Status, Category and Brand use the store's indexes: the smallest matching
+    index list is the candidate set and the other filters are checked per row.
+    Dates compare Date_Added as YYYY-MM-DD strings, inclusive.
+    """
+    candidates = None
+    for lookup, value in ((store.by_status, status), (store.by_category, category), (store.by_brand, brand)):
+        if not value:
+            continue
+        rows = lookup(value)
+        if candidates is None or len(rows) < len(candidates):
+            candidates = rows
+    if candidates is None:
+        candidates = store.rows()
+
+    matches = inventory_filter(status, category, brand, date_from, date_to, text)
+    return [row for row in candidates if matches(row)]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_inventory_store(csv_path):
+    """Return the shared inventory store for csv_path (one per file per process)
+
+    Uses SQLite when an inventory.db sits next to the CSV, otherwise the
+    in-memory CSV index.
+    """
+    csv_path = Path(csv_path)
+    key = str(csv_path.resolve())
+    with _stores_lock:
+        if key not in _stores:
+            db_path = csv_path.with_name(INVENTORY_DB_NAME)
+            if db_path.exists():
+                _stores[key] = SqliteInventory(db_path)
+            else:
+                _stores[key] = InventoryIndex(csv_path)
+        return _stores[key]
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('import', 'export'):
+        print("Usage: python3 inventory_store.py import|export [project_path]")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    project_path = Path(sys.argv[2] if len(sys.argv) > 2 else "/Users/emilywebster/Dev/Depop_Selling")
+    csv_path = project_path / "data" / "inventory_tracker.csv"
+    db_path = project_path / "data" / INVENTORY_DB_NAME
+
+    if command == 'import':
+        if not csv_path.exists():
+            print(f"❌ No inventory CSV at {csv_path}")
+            sys.exit(1)
+        # Fold journaled saves, edits and deletes into the CSV first, or they'd be left behind
+        InventoryIndex(csv_path).compact()
+        count = SqliteInventory(db_path).import_csv(csv_path)
+        print(f"✅ Imported {count} items into {db_path}")
+        print("💡 The organizer and photo analyzer will now use the database")
+    else:
+        if not db_path.exists():
+            print(f"❌ No inventory database at {db_path}")
+            sys.exit(1)
+        count = SqliteInventory(db_path).export_csv(csv_path)
+        print(f"✅ Exported {count} items to {csv_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Background jobs with progress for the photo organizer server
+Slow work (placing a saved item's photos) runs on a small worker pool while the
+HTTP response returns straight away with a job ID; the browser polls
+/api/jobs/<id> for progress and errors.
+"""
+
+import itertools
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Finished jobs are kept this long (and at most this many) for polling
+JOB_RETENTION_SECONDS = 3600
+MAX_FINISHED_JOBS = 200
+
+
+class Job:
+    """One unit of background work and its progress"""
+
+    def __init__(self, job_id, kind, total, info):
+        self.id = job_id
+        self.kind = kind
+        self.total = total
+        self.done = 0
+        self.status = 'queued'  # queued -> running -> done | failed
+        self.info = info
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def advance(self, steps=1):
+        """Record progress (called from the worker)"""
+        with self._lock:
+            self.done = min(self.total, self.done + steps)
+
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'done': self.done,
+                'total': self.total,
+                'progress': round(self.done / self.total, 2) if self.total else (1.0 if self.finished() else 0.0),
+                'result': self.result,
+                'error': self.error,
+                'createdAt': self.created_at,
+                'finishedAt': self.finished_at,
+                **self.info,
+            }
+
+
+class JobQueue:
+    """Runs submitted jobs on a thread pool and keeps their status for polling"""
+
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()  # job ID -> Job, oldest first
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def submit(self, kind, total, work, **info):
+        """Queue work(job) and return the Job; work's return value becomes job.result"""
+        with self._lock:
+            self._prune_locked()
+            job = Job(f'{kind}-{next(self._ids)}', kind, total, info)
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, work)
+        return job
+
+    def _run(self, job, work):
+        job.status = 'running'
+        try:
+            result = work(job)
+            status = 'done'
+        except Exception as e:
+            result = None
+            status = 'failed'
+            job.error = str(e)
+            print(f"❌ Job {job.id} failed: {e}")
+            traceback.print_exc()
+        with job._lock:
+            # finished_at first: a job that looks finished always has one (pruning compares it)
+            job.finished_at = time.time()
+            job.result = result
+            if status == 'done':
+                job.done = job.total
+            job.status = status
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Every job still kept, oldest first"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def pending_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished())
+
+    def _prune_locked(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        finished = [job for job in self._jobs.values() if job.finished()]
+        excess = len(finished) - MAX_FINISHED_JOBS
+        for job in finished:
+            if excess > 0 or (job.finished_at is not None and job.finished_at < cutoff):
+                del self._jobs[job.id]
+                excess -= 1
+
+    def shutdown(self, wait=True):
+        """Stop taking jobs; by default let queued ones finish first"""
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Stand-in vision model server for testing the photo analyzer without an API key
+Answers POST /analyze with a canned analysis after a fixed latency, and can
+return 429s at random to exercise the retry logic.
+
+    python3 mock_vision_server.py [--port 8765] [--latency 1.5] [--fail-rate 0.1]
+    DEPOP_VISION_BACKEND=local python3 photo_analyzer.py
+"""
+
+import argparse
+import hashlib
+import http.server
+import json
+import random
+import socketserver
+import threading
+import time
+
+CATEGORIES = ['tops', 'dresses', 'bottoms', 'outerwear', 'shoes', 'accessories']
+BRANDS = ['Zara', 'Nike', 'Levi\'s', 'H&M', 'Topshop', 'Unknown']
+COLORS = ['Black', 'White', 'Blue', 'Red', 'Green', 'Beige']
+
+
+class MockVisionHandler(http.server.BaseHTTPRequestHandler):
+    latency = 1.5
+    fail_rate = 0.0
+    requests_served = 0
+    counter_lock = threading.Lock()
+
+    def do_POST(self):
+        if self.path != '/analyze':
+            self.send_error(404)
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(self.latency)
+
+        with self.counter_lock:
+            MockVisionHandler.requests_served += 1
+
+        if random.random() < self.fail_rate:
+            self.send_error(429, "Rate limited (simulated)")
+            return
+
+        # Same image -> same answer, so reruns are comparable
+        digest = hashlib.sha1(''.join(image['data'] for image in body.get('images', [])).encode()).digest()
+        analysis = {
+            'item_type': 'top',
+            'category': CATEGORIES[digest[0] % len(CATEGORIES)],
+            'brand': BRANDS[digest[1] % len(BRANDS)],
+            'color': COLORS[digest[2] % len(COLORS)],
+            'size': 'M',
+            'condition': 'Very Good',
+            'material': 'Cotton',
+            'style': 'casual',
+            'unique_features': [],
+            'suggested_price_range': '12-25',
+            'confidence': 0.8,
+            'image_quality': 'Good',
+        }
+        payload = json.dumps(analysis).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadedMockServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock vision model server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=1.5, help='seconds per request')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of requests answered with 429')
+    args = parser.parse_args()
+
+    MockVisionHandler.latency = args.latency
+    MockVisionHandler.fail_rate = args.fail_rate
+
+    with ThreadedMockServer(('', args.port), MockVisionHandler) as httpd:
+        print(f"🤖 Mock vision server on http://localhost:{args.port}/analyze "
+              f"({args.latency}s latency, {args.fail_rate:.0%} simulated 429s)")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print(f"\n🛑 Stopped after {MockVisionHandler.requests_served} requests")
+
+
+if __name__ == "__main__":
+    main()
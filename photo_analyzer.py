@@ -2,8 +2,13 @@
 """
 Depop Photo Analyzer
 Analyzes photos in the staging folder and helps populate inventory with AI assessments.
+
+    python3 photo_analyzer.py                                  # confirm each photo interactively
+    python3 photo_analyzer.py --batch --manifest items.csv     # no prompts: details from a manifest
+    python3 photo_analyzer.py --batch --min-confidence 0.85    # no prompts: accept confident AI results
 """
 
+import argparse
 import os
 import csv
 import json
@@ -15,11 +20,67 @@ from io import BytesIO
 from PIL import Image
 import re
 
-# You'll need to install: pip install pillow requests openai anthropic
-# Choose one of these AI services (comment out the ones you don't want to use)
+from analysis_cache import AnalysisCache
+from image_payload import PayloadPreparer
+from inventory_store import get_inventory_store
+from vision_backends import ConcurrentAnalyzer
+
+# AI analysis is optional: set DEPOP_VISION_BACKEND=anthropic|openai|local to use a model
+# (pip install anthropic / openai); see vision_backends.py for the other settings.
+
+# While you confirm one photo, this many upcoming photos are decoded and analyzed
+# in the background so their results are ready when you get to them
+ANALYZE_AHEAD = int(os.environ.get('DEPOP_ANALYZE_AHEAD', 3))
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic'}
+CATEGORIES = ('tops', 'dresses', 'bottoms', 'outerwear', 'shoes', 'accessories')
+
+# Fields a confirmation (interactive or manifest) fills in; a manifest row with all
+# of REQUIRED_DETAILS needs no AI call
+CONFIRMED_FIELDS = ('brand', 'category', 'item_type', 'size', 'color', 'condition',
+                    'purchase_price', 'target_price', 'material', 'notes')
+REQUIRED_DETAILS = ('brand', 'category', 'item_type', 'size', 'color', 'condition')
+
+
+def load_manifest(manifest_path):
+    """Read batch confirmations from CSV or JSON into {photo filename: {field: value}}
+    
+    CSV needs a 'filename' column plus any of CONFIRMED_FIELDS (and optionally 'skip').
+    JSON can be a list of such objects or an object keyed by filename.
+    """
+    manifest_path = Path(manifest_path)
+    if manifest_path.suffix.lower() == '.json':
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if isinstance(data, dict):
+            data = [{'filename': name, **entry} for name, entry in data.items()]
+    else:
+        with open(manifest_path, 'r', encoding='utf-8', newline='') as file:
+            data = list(csv.DictReader(file))
+    
+    manifest = {}
+    for entry in data:
+        entry = {key.strip().lower(): str(value).strip() for key, value in entry.items() if key and value is not None}
+        if entry.get('filename'):
+            manifest[entry['filename']] = entry
+    return manifest
+
+
+def manifest_skips(entry):
+    """True if a manifest entry asks for its photo to be skipped (skip=1/y/yes/true)"""
+    return bool(entry) and str(entry.get('skip', '')).strip().lower() in ('1', 'y', 'yes', 'true')
+
+
+def parse_confidence(value):
+    """An analysis' confidence as a float; anything non-numeric (e.g. 'high') counts as 0"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
 
 class PhotoAnalyzer:
-    def __init__(self, project_path):
+    def __init__(self, project_path, vision=None):
         self.project_path = Path(project_path)
         self.staging_path = self.project_path / "photos" / "staging"
         self.category_path = self.project_path / "photos" / "by_category"
@@ -29,28 +90,28 @@ class PhotoAnalyzer:
         # Create staging folder if it doesn't exist
         self.staging_path.mkdir(parents=True, exist_ok=True)
         
+        # Same storage as the web organizer (CSV, or SQLite if data/inventory.db exists)
+        self.inventory = get_inventory_store(self.inventory_path)
+        
         # Load existing inventory to get next ID
         self.next_item_id = self._get_next_item_id()
         
         # Load hashtag bank for recommendations
         self.hashtag_bank = self._load_hashtag_bank()
+        
+        # AI vision backend, called concurrently within rate limits; answers are
+        # cached by photo contents so reruns don't pay for the same photo twice,
+        # and upload payloads are encoded (and cached) in a process pool
+        self.vision = vision or ConcurrentAnalyzer.from_env(
+            cache=AnalysisCache(self.project_path / "cache" / "analysis"),
+            payloads=PayloadPreparer.from_env(self.project_path / "cache" / "payloads")
+        )
 
     def _get_next_item_id(self):
         """Get the next available item ID by checking existing inventory."""
-        if not self.inventory_path.exists():
-            return 1
-        
         max_id = 0
         try:
-            with open(self.inventory_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row['Item_ID'].startswith('DP'):
-                        try:
-                            id_num = int(row['Item_ID'][2:])  # Remove 'DP' prefix
-                            max_id = max(max_id, id_num)
-                        except ValueError:
-                            continue
+            max_id = self.inventory.max_id_number()
         except Exception as e:
             print(f"Error reading inventory: {e}")
         
@@ -76,36 +137,17 @@ class PhotoAnalyzer:
     def analyze_photo_with_ai(self, image_path):
         """
         Analyze a photo using AI vision.
-        This is a template - you'll need to implement with your preferred AI service.
+        Uses the backend from DEPOP_VISION_BACKEND; the default template backend
+        returns placeholder values that you fill in manually.
         """
-        # This is where you'd call Claude, GPT-4 Vision, or another AI service
-        # For now, we'll return a template structure that you can fill in manually
-        
         try:
-            # Load and analyze image
+            # Load image for basic details we can get without AI
             with Image.open(image_path) as img:
                 width, height = img.size
-                
-            # Basic analysis we can do without AI
-            filename = Path(image_path).name
             
-            # Template analysis - replace with actual AI call
-            analysis = {
-                "item_type": "Unknown",  # AI would determine: dress, top, jeans, etc.
-                "category": "Unknown",   # maps to folder structure
-                "brand": "Unknown",      # AI would read tags/logos
-                "color": "Unknown",      # AI would identify primary color
-                "size": "Unknown",       # AI would read size tags
-                "condition": "Good",     # AI would assess wear/condition
-                "material": "Unknown",   # AI might identify fabric
-                "style": "Unknown",      # casual, formal, vintage, etc.
-                "unique_features": [],   # special details AI notices
-                "suggested_price_range": "15-35",  # based on brand/type
-                "confidence": 0.7,       # how confident AI is
-                "image_quality": "Good", # suitable for listing?
-                "filename": filename,
-                "dimensions": f"{width}x{height}"
-            }
+            analysis = self.vision.analyze(image_path)
+            analysis["filename"] = Path(image_path).name
+            analysis["dimensions"] = f"{width}x{height}"
             
             return analysis
             
@@ -113,6 +155,16 @@ class PhotoAnalyzer:
             print(f"Error analyzing {image_path}: {e}")
             return None
 
+    def analyze_ahead(self, image_files, index, pending_analyses):
+        """Make sure image_files[index] and the ANALYZE_AHEAD photos after it are being analyzed
+        
+        pending_analyses maps photo path -> Future for its analysis; new ones are added.
+        """
+        for image_path in image_files[index:index + ANALYZE_AHEAD + 1]:
+            if image_path not in pending_analyses:
+                self.vision.prefetch(image_path)
+                pending_analyses[image_path] = self.vision.submit_call(self.analyze_photo_with_ai, image_path)
+
     def get_user_confirmation(self, analysis, image_path):
         """Interactive process to confirm/edit AI analysis."""
         print(f"\n{'='*60}")
@@ -210,15 +262,26 @@ class PhotoAnalyzer:
         return new_filename
 
     def add_to_inventory(self, confirmed_details, photo_filename):
-        """Add new item to inventory CSV."""
+        """Add new item to inventory (CSV or SQLite)."""
+        # Re-read: the organizer may have added items while this session was running
+        self.next_item_id = self._get_next_item_id()
         item_id = f"DP{self.next_item_id:03d}"
         
-        # Prepare row data
+        # Write to the inventory (writes headers if the CSV is new)
+        self.inventory.append(self.build_inventory_row(confirmed_details, photo_filename, item_id))
+        
+        self.next_item_id += 1
+        return item_id
+
+    def build_inventory_row(self, confirmed_details, photo_filename, item_id):
+        """Inventory row for a confirmed item."""
+        # Prepare row data (the shared 31-column layout has no Item_Type column,
+        # so the item type goes in Subcategory like the web organizer does)
         row_data = {
             'Item_ID': item_id,
             'Brand': confirmed_details['brand'],
             'Category': confirmed_details['category'].title(),
-            'Item_Type': confirmed_details['item_type'].title(),
+            'Subcategory': confirmed_details['item_type'].title(),
             'Size': confirmed_details['size'],
             'Color': confirmed_details['color'].title(),
             'Condition': confirmed_details['condition'],
@@ -240,30 +303,17 @@ class PhotoAnalyzer:
             'Views': '0',
             'Notes': confirmed_details.get('notes', '')
         }
-        
-        # Check if CSV exists and has headers
-        file_exists = self.inventory_path.exists()
-        
-        # Write to CSV
-        with open(self.inventory_path, 'a', newline='', encoding='utf-8') as file:
-            fieldnames = list(row_data.keys())
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            
-            # Write headers if file is new
-            if not file_exists or os.path.getsize(self.inventory_path) == 0:
-                writer.writeheader()
-            
-            writer.writerow(row_data)
-        
-        self.next_item_id += 1
-        return item_id
+        return row_data
+
+    def staging_image_files(self):
+        """Photos waiting in the staging folder, in name order."""
+        return sorted(f for f in self.staging_path.iterdir()
+                      if f.is_file() and f.suffix.lower() in IMAGE_EXTENSIONS)
 
     def process_staging_photos(self):
         """Main function to process all photos in staging folder."""
         # Get all image files in staging
-        image_extensions = {'.jpg', '.jpeg', '.png', '.heic', '.HEIC'}
-        image_files = [f for f in self.staging_path.iterdir() 
-                      if f.is_file() and f.suffix.lower() in image_extensions]
+        image_files = self.staging_image_files()
         
         if not image_files:
             print("No photos found in staging folder!")
@@ -273,12 +323,44 @@ class PhotoAnalyzer:
         
         processed_items = []
         
-        for image_path in image_files:
+        pending_analyses = {}
+        try:
+            self._confirm_photos(image_files, pending_analyses, processed_items)
+        finally:
+            # Stopped early (quit, Ctrl-C, Ctrl-D) or not: drop analyses nobody will read
+            for future in pending_analyses.values():
+                future.cancel()
+        
+        # Make sure inventory_tracker.csv includes everything we just added
+        self.inventory.compact()
+        
+        # Summary
+        print(f"\n{'='*60}")
+        print(f"PROCESSING COMPLETE")
+        print(f"{'='*60}")
+        print(f"Items processed: {len(processed_items)}")
+        if self.vision.cache is not None:
+            print(f"AI calls: {self.vision.calls} ({self.vision.cache_hits} photos answered from cache)")
+        for item in processed_items:
+            print(f"  {item['item_id']}: {item['brand']} {item['item_type']} -> {item['filename']}")
+        print(f"\nAll items added to inventory tracker!")
+        print(f"Photos organized in category folders.")
+        print(f"Ready to create listings using the templates!")
+
+    def _confirm_photos(self, image_files, pending_analyses, processed_items):
+        """The interactive loop: confirm each photo's details, then file it and add its row"""
+        for index, image_path in enumerate(image_files):
             try:
                 print(f"\nProcessing: {image_path.name}")
                 
-                # Analyze photo with AI
-                analysis = self.analyze_photo_with_ai(image_path)
+                # Keep this photo and the next few analyzing while you type
+                self.analyze_ahead(image_files, index, pending_analyses)
+                
+                # Wait for this photo's AI analysis (usually finished already)
+                future = pending_analyses.pop(image_path)
+                if not future.done():
+                    print("⏳ Waiting for AI analysis...")
+                analysis = future.result()
                 if not analysis:
                     print(f"Failed to analyze {image_path.name}, skipping...")
                     continue
@@ -287,7 +369,10 @@ class PhotoAnalyzer:
                 confirmed_details = self.get_user_confirmation(analysis, image_path)
                 
                 # Ask if user wants to process this item
-                process = input(f"\nProcess this item? (y/n) [y]: ").strip().lower()
+                process = input(f"\nProcess this item? (y/n/q to stop) [y]: ").strip().lower()
+                if process in ['q', 'quit']:
+                    print("Stopping - the remaining photos stay in staging.")
+                    break
                 if process in ['n', 'no']:
                     print("Skipping this item...")
                     continue
@@ -307,39 +392,184 @@ class PhotoAnalyzer:
                 
                 print(f"✅ Successfully processed {item_id}: {confirmed_details['brand']} {confirmed_details['item_type']}")
                 
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 print("\nProcessing interrupted by user.")
                 break
             except Exception as e:
                 print(f"Error processing {image_path.name}: {e}")
                 continue
+
+    def process_staging_photos_batch(self, manifest=None, min_confidence=None, report_path=None):
+        """Process the whole staging folder without prompts and return a report dict.
         
-        # Summary
-        print(f"\n{'='*60}")
-        print(f"PROCESSING COMPLETE")
-        print(f"{'='*60}")
-        print(f"Items processed: {len(processed_items)}")
-        for item in processed_items:
-            print(f"  {item['item_id']}: {item['brand']} {item['item_type']} -> {item['filename']}")
-        print(f"\nAll items added to inventory tracker!")
-        print(f"Photos organized in category folders.")
-        print(f"Ready to create listings using the templates!")
+        Each photo's details come from its manifest entry (filling gaps from the AI
+        analysis), or, with min_confidence, from an AI analysis at least that confident.
+        Anything else stays in staging marked 'needs_review'. All analyses run in
+        parallel and the inventory rows are written in one go.
+        """
+        started = datetime.now()
+        manifest = manifest or {}
+        image_files = self.staging_image_files()
+        print(f"Found {len(image_files)} photos to process in batch mode...")
+        
+        # Analyze everything that the manifest doesn't fully describe, all at once
+        needs_ai = [
+            image_path for image_path in image_files
+            if not manifest_skips(manifest.get(image_path.name))
+            and (image_path.name in manifest or min_confidence is not None)
+            and not all(manifest.get(image_path.name, {}).get(field) for field in REQUIRED_DETAILS)
+        ]
+        for image_path in needs_ai:
+            self.vision.prefetch(image_path)
+        analyses = {
+            image_path: self.vision.submit_call(self.analyze_photo_with_ai, image_path)
+            for image_path in needs_ai
+        }
+        
+        results = []
+        accepted = []
+        for image_path in image_files:
+            entry = manifest.get(image_path.name)
+            result = {'filename': image_path.name, 'source': 'manifest' if entry else 'ai'}
+            results.append(result)
+            
+            if manifest_skips(entry):
+                result.update(status='skipped', reason='skip set in manifest')
+                continue
+            if entry is None and min_confidence is None:
+                result.update(status='skipped', reason='not in manifest')
+                continue
+            
+            analysis = None
+            if image_path in analyses:
+                analysis = analyses[image_path].result()
+                if analysis is None:
+                    result.update(status='error', reason='AI analysis failed')
+                    continue
+                result['confidence'] = analysis.get('confidence')
+            
+            if entry is None:
+                confidence = parse_confidence(analysis.get('confidence'))
+                if confidence < min_confidence:
+                    result.update(status='needs_review', reason=f'confidence {confidence:.2f} below {min_confidence}')
+                    continue
+            
+            # Manifest values win; the AI analysis fills in anything left blank
+            confirmed = {field: '' for field in CONFIRMED_FIELDS}
+            if analysis:
+                confirmed.update({field: str(analysis.get(field, '')) for field in CONFIRMED_FIELDS if field in analysis})
+            if entry:
+                confirmed.update({field: entry[field] for field in CONFIRMED_FIELDS if entry.get(field)})
+            
+            if confirmed['category'].lower() not in CATEGORIES:
+                result.update(status='needs_review', reason=f"unknown category '{confirmed['category']}'")
+                continue
+            accepted.append((image_path, confirmed, result))
+        
+        # Move the accepted photos, then write all their inventory rows at once
+        moved = []
+        for image_path, confirmed, result in accepted:
+            try:
+                new_filename = self.move_and_rename_photo(image_path, confirmed)
+            except OSError as e:
+                result.update(status='error', reason=f'could not move photo: {e}')
+                continue
+            moved.append((image_path, confirmed, result, new_filename))
+        
+        # The organizer may have saved items since this run started, so take IDs
+        # from the store now rather than from the count read at startup
+        self.next_item_id = self._get_next_item_id()
+        rows = []
+        for image_path, confirmed, result, new_filename in moved:
+            item_id = f"DP{self.next_item_id:03d}"
+            self.next_item_id += 1
+            rows.append(self.build_inventory_row(confirmed, new_filename, item_id))
+            result.update(
+                status='added',
+                itemId=item_id,
+                newFilename=new_filename,
+                category=confirmed['category'].lower(),
+                brand=confirmed['brand'],
+                itemType=confirmed['item_type']
+            )
+        
+        try:
+            self.inventory.append_many(rows)
+        except Exception as e:
+            # Put the photos back in staging so a rerun of the manifest finds them
+            print(f"❌ Couldn't write the inventory rows, moving {len(moved)} photos back to staging: {e}")
+            for image_path, confirmed, result, new_filename in moved:
+                moved_path = self.category_path / confirmed['category'].lower() / new_filename
+                reason = f'inventory write failed: {e}'
+                try:
+                    shutil.move(str(moved_path), str(image_path))
+                except OSError as move_error:
+                    reason += f' (photo left at {moved_path}: {move_error})'
+                for key in ('itemId', 'newFilename', 'category', 'brand', 'itemType'):
+                    result.pop(key, None)
+                result.update(status='error', reason=reason)
+        else:
+            self.inventory.compact()
+        
+        finished = datetime.now()
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        report = {
+            'startedAt': started.isoformat(timespec='seconds'),
+            'finishedAt': finished.isoformat(timespec='seconds'),
+            'durationSeconds': round((finished - started).total_seconds(), 2),
+            'stagingPhotos': len(image_files),
+            'added': counts.get('added', 0),
+            'needsReview': counts.get('needs_review', 0),
+            'skipped': counts.get('skipped', 0),
+            'errors': counts.get('error', 0),
+            'minConfidence': min_confidence,
+            'aiCalls': self.vision.calls,
+            'aiCacheHits': self.vision.cache_hits,
+            'items': results,
+        }
+        
+        if report_path:
+            report_path = Path(report_path)
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(report_path, 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=2)
+        return report
 
 def main():
-    # Set up the analyzer
-    project_path = "/Users/emilywebster/Dev/Depop_Selling"
-    analyzer = PhotoAnalyzer(project_path)
+    parser = argparse.ArgumentParser(description='Organize staging photos and add them to the inventory')
+    parser.add_argument('--project', default="/Users/emilywebster/Dev/Depop_Selling", help='project folder')
+    parser.add_argument('--batch', action='store_true', help='no prompts (needs --manifest and/or --min-confidence)')
+    parser.add_argument('--manifest', help='CSV or JSON with details per photo filename')
+    parser.add_argument('--min-confidence', type=float, help='accept AI results at least this confident (0-1)')
+    parser.add_argument('--report', help='where to write the JSON batch report')
+    args = parser.parse_args()
+    
+    if args.batch:
+        if not args.manifest and args.min_confidence is None:
+            parser.error('--batch needs --manifest and/or --min-confidence')
+        run_batch(args)
+        return
     
+    # Set up the analyzer
+    analyzer = PhotoAnalyzer(args.project)
+    try:
+        run_interactive(analyzer)
+    finally:
+        # Don't wait on analyses still running for photos that won't be confirmed
+        analyzer.vision.shutdown(wait=False)
+
+def run_interactive(analyzer):
+    """Prompted run: confirm each staging photo's details in turn"""
     print("Depop Photo Analyzer")
     print("===================")
-    print(f"Project: {project_path}")
+    print(f"Project: {analyzer.project_path}")
     print(f"Staging folder: {analyzer.staging_path}")
     print(f"Next Item ID: DP{analyzer.next_item_id:03d}")
     
     # Check if staging folder has photos
-    image_extensions = {'.jpg', '.jpeg', '.png', '.heic', '.HEIC'}
-    image_files = [f for f in analyzer.staging_path.iterdir() 
-                  if f.is_file() and f.suffix.lower() in image_extensions]
+    image_files = analyzer.staging_image_files()
     
     if not image_files:
         print(f"\nNo photos found in {analyzer.staging_path}")
@@ -357,5 +587,28 @@ def main():
     # Process photos
     analyzer.process_staging_photos()
 
+def run_batch(args):
+    """Headless run for --batch: process staging and write the JSON report"""
+    analyzer = PhotoAnalyzer(args.project)
+    manifest = load_manifest(args.manifest) if args.manifest else None
+    report_path = args.report or (
+        analyzer.project_path / "data" / "batch_reports" / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    
+    print("Depop Photo Analyzer (batch mode)")
+    print("=================================")
+    try:
+        report = analyzer.process_staging_photos_batch(manifest, args.min_confidence, report_path)
+    finally:
+        analyzer.vision.shutdown()
+    
+    print(f"\n✅ Added {report['added']} items in {report['durationSeconds']}s "
+          f"({report['aiCalls']} AI calls, {report['aiCacheHits']} from cache)")
+    if report['needsReview']:
+        print(f"👀 {report['needsReview']} photos need review (left in staging)")
+    if report['errors']:
+        print(f"❌ {report['errors']} photos failed")
+    print(f"📄 Report: {report_path}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
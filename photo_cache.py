@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+On-disk cache for rendered photo previews (HEIC -> JPEG etc.)
+Entries are keyed by source path + mtime + size + render params, so editing or
+replacing a photo automatically misses the old entry.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image
+
+
+class DerivativeCache:
+    """Content-keyed cache of rendered files with a size cap and LRU eviction"""
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, suffix='.jpg'):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Lock held while that key is being rendered
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._total_bytes = 0
+        self._load_existing()
+
+    def _load_existing(self):
+        """Rebuild the LRU order from files left by a previous run (oldest mtime first)"""
+        if not self.cache_dir.exists():
+            return
+        found = []
+        for entry in self.cache_dir.glob(f'*/*{self.suffix}'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            found.append((stat.st_mtime, entry.stem, stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def key_for(self, source_path, **params):
+        """Build a cache key from the source file identity and render params"""
+        source_path = Path(source_path)
+        stat = source_path.stat()
+        param_str = ','.join(f'{k}={params[k]}' for k in sorted(params))
+        raw = f'{source_path.resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{param_str}'
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        """Location of a cache entry (sharded by the first two hex chars)"""
+        return self.cache_dir / key[:2] / f'{key}{self.suffix}'
+
+    def get(self, key):
+        """Return the cached file path for key, or None on a miss"""
+        path = self.path_for(key)
+        with self._lock:
+            if key not in self._entries or not path.exists():
+                if key in self._entries:
+                    self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            # Persist recency so the LRU order survives a restart
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key, data):
+        """Store rendered bytes under key and return the cached file path"""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial image
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict_locked(keep=key)
+        return path
+
+    def get_or_render(self, source_path, render, **params):
+        """Return a cached path for source_path, calling render(source_path, **params) on a miss
+
+        Concurrent misses for the same key wait for a single render instead of
+        decoding the same photo several times.
+        """
+        key = self.key_for(source_path, **params)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                # Another thread may have rendered it while we waited
+                path = self.path_for(key)
+                with self._lock:
+                    if key in self._entries and path.exists():
+                        self._entries.move_to_end(key)
+                        return path
+                return self.put(key, render(source_path, **params))
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is key_lock and not key_lock.locked():
+                    del self._inflight[key]
+
+    def discard(self, key):
+        """Remove one entry; returns True if it was cached"""
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is not None:
+                self._total_bytes -= size
+        try:
+            self.path_for(key).unlink()
+        except FileNotFoundError:
+            pass
+        return size is not None
+
+    def clear(self):
+        """Remove every entry; returns how many there were"""
+        with self._lock:
+            keys = list(self._entries)
+        for key in keys:
+            self.discard(key)
+        return len(keys)
+
+    def _evict_locked(self, keep=None):
+        """Drop least recently used entries until the cache fits under max_bytes"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                break
+            self._entries.pop(key)
+            self._total_bytes -= size
+            try:
+                self.path_for(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """Return entry count, size and hit/miss counters"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+def init_decode_worker():
+    """Process pool initializer: make sure HEIC decoding is available in the worker"""
+    try:
+        from pillow_heif import register_heif_opener
+        register_heif_opener()
+    except ImportError:
+        pass
+
+
+def render_jpeg_preview(source_path, max_size=800, quality=75):
+    """Decode an image, shrink it to fit max_size and encode it as JPEG bytes
+
+    For JPEG sources Pillow's draft mode lets the decoder scale by 1/2, 1/4 or
+    1/8 while decoding, so a grid thumbnail never decodes all 12 megapixels.
+    max_size=None keeps the full resolution.
+    """
+    return render_jpeg_preview_timed(source_path, max_size, quality)[0]
+
+
+def render_jpeg_preview_timed(source_path, max_size=800, quality=75):
+    """render_jpeg_preview that also returns {'decode', 'resize', 'encode'} seconds
+
+    Runs in the decode pool, so the timings travel back with the bytes.
+    """
+    started = time.perf_counter()
+    with Image.open(source_path) as img:
+        if max_size:
+            # No-op for formats without decode-time scaling (PNG, HEIC)
+            img.draft('RGB', (max_size, max_size))
+        img.load()
+        decoded = time.perf_counter()
+
+        # Convert to RGB if necessary
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Resize for web display
+        if max_size:
+            img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        resized = time.perf_counter()
+
+        jpeg_buffer = io.BytesIO()
+        img.save(jpeg_buffer, format='JPEG', quality=quality, optimize=True)
+        encoded = time.perf_counter()
+
+    timings = {'decode': decoded - started, 'resize': resized - decoded, 'encode': encoded - resized}
+    return jpeg_buffer.getvalue(), timings
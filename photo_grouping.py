@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Suggest how staging photos group into items
+Photos are put in capture order (EXIF DateTimeOriginal, else file mtime) and a
+new item starts wherever the next photo looks like a different shoot: a long
+gap in capture time, different colours, and no perceptual-hash match.
+Features come from small thumbnails decoded in batches and are cached per file.
+"""
+
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from photo_hashes import DEFAULT_MAX_DISTANCE, get_hash_index
+from staging_index import StagingIndex, get_staging_index
+
+FEATURE_THUMB_SIZE = 64     # histograms come from a 64x64 thumbnail
+HISTOGRAM_LEVELS = 8        # per RGB channel -> 512 bins
+FEATURE_BATCH_SIZE = 64
+
+# Splitting rules between two consecutive photos
+QUICK_GAP_SECONDS = 20          # taken this close together -> same item (e.g. a label close-up)
+SAME_ITEM_GAP_SECONDS = 120     # within this gap, similar colours -> same item
+MAX_GAP_SECONDS = 600           # longer than this -> always a new item (unless a burst duplicate)
+MIN_COLOUR_SIMILARITY = 0.55
+STRONG_COLOUR_SIMILARITY = 0.8  # this similar -> same item whatever the gap
+
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+
+def load_group_features(path):
+    """Read capture time and a small RGB thumbnail; runs in the decode pool
+
+    Returns (capture timestamp or None, thumbnail bytes).
+    """
+    with Image.open(path) as img:
+        capture_time = None
+        try:
+            exif = img.getexif()
+            value = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+            if value:
+                capture_time = datetime.strptime(str(value).strip('\x00 '), '%Y:%m:%d %H:%M:%S').timestamp()
+        except (ValueError, TypeError, OSError):
+            pass
+
+        img.draft('RGB', (FEATURE_THUMB_SIZE * 2, FEATURE_THUMB_SIZE * 2))
+        thumb = img.convert('RGB').resize((FEATURE_THUMB_SIZE, FEATURE_THUMB_SIZE), Image.Resampling.BILINEAR)
+        return capture_time, thumb.tobytes()
+
+
+def _safe_load_group_features(path):
+    try:
+        return load_group_features(path)
+    except Exception as e:
+        print(f"⚠️  Could not read {path}: {e}")
+        return None
+
+
+def colour_histograms(thumbnails):
+    """Normalised 512-bin RGB histograms for a batch of thumbnail byte strings"""
+    count = len(thumbnails)
+    pixels = np.frombuffer(b''.join(thumbnails), dtype=np.uint8).reshape(count, -1, 3)
+    levels = pixels // (256 // HISTOGRAM_LEVELS)
+    bins = (levels[..., 0].astype(np.int64) * HISTOGRAM_LEVELS + levels[..., 1]) * HISTOGRAM_LEVELS + levels[..., 2]
+    bin_count = HISTOGRAM_LEVELS ** 3
+    bins += np.arange(count)[:, None] * bin_count
+    histograms = np.bincount(bins.ravel(), minlength=count * bin_count).reshape(count, bin_count)
+    return (histograms / pixels.shape[1]).astype(np.float32)
+
+
+class PhotoGrouper:
+    """Proposes item groups for the photos in staging"""
+
+    def __init__(self, project_path):
+        project_path = Path(project_path)
+        self.staging = get_staging_index(project_path / 'photos' / 'staging')
+        self.hashes = get_hash_index(project_path)
+        self._lock = threading.Lock()
+        self._features = {}  # name -> {'mtime', 'bytes', 'captureTime', 'histogram'}
+
+    def refresh(self, photos, map_fn=map, limit=None):
+        """Compute features for new or changed photos and drop removed ones
+
+        With limit, at most that many photos are decoded; returns how many are left.
+        """
+        names = {photo['name'] for photo in photos}
+        for name in [name for name in self._features if name not in names]:
+            del self._features[name]
+
+        todo = [
+            photo for photo in photos
+            if (self._features.get(photo['name'], {}).get('mtime'), self._features.get(photo['name'], {}).get('bytes'))
+            != (photo['mtime'], photo['bytes'])
+        ]
+        pending = max(0, len(todo) - limit) if limit is not None else 0
+        if limit is not None:
+            todo = todo[:limit]
+        for start in range(0, len(todo), FEATURE_BATCH_SIZE):
+            batch = todo[start:start + FEATURE_BATCH_SIZE]
+            paths = [str(self.staging.staging_path / photo['name']) for photo in batch]
+            loaded = [(photo, result) for photo, result in zip(batch, map_fn(_safe_load_group_features, paths)) if result]
+            if not loaded:
+                continue
+            histograms = colour_histograms([thumb for _, (_, thumb) in loaded])
+            for (photo, (capture_time, _)), histogram in zip(loaded, histograms):
+                self._features[photo['name']] = {
+                    'mtime': photo['mtime'],
+                    'bytes': photo['bytes'],
+                    'captureTime': capture_time if capture_time is not None else photo['mtime'],
+                    'histogram': histogram,
+                }
+        return pending
+
+    def link(self, previous, current):
+        """Why two consecutive photos belong to the same item, as (reason, score), or None"""
+        prev_hashes = self.hashes.hashes_for(f"staging/{previous['name']}")
+        cur_hashes = self.hashes.hashes_for(f"staging/{current['name']}")
+        if prev_hashes and cur_hashes:
+            distance = max(bin(a ^ b).count('1') for a, b in zip(prev_hashes, cur_hashes))
+            if distance <= DEFAULT_MAX_DISTANCE:
+                return 'burst', 1.0
+
+        prev_features = self._features[previous['name']]
+        cur_features = self._features[current['name']]
+        gap = abs(cur_features['captureTime'] - prev_features['captureTime'])
+        if gap > MAX_GAP_SECONDS:
+            return None
+        if gap <= QUICK_GAP_SECONDS:
+            return 'time', 0.9
+
+        similarity = float(np.minimum(prev_features['histogram'], cur_features['histogram']).sum())
+        if similarity >= STRONG_COLOUR_SIMILARITY:
+            return 'colour', similarity
+        if gap <= SAME_ITEM_GAP_SECONDS and similarity >= MIN_COLOUR_SIMILARITY:
+            return 'time+colour', similarity
+        return None
+
+    def suggest(self, map_fn=map, limit=None):
+        """Return (proposed groups, number of photos still waiting to be analysed)
+
+        Groups are [{photos, startTime, confidence, reasons}] in capture order. With
+        limit, at most that many new photos are decoded per step (hashes, then
+        features) and photos still pending are left out of the groups; call again
+        until nothing is pending.
+        """
+        with self._lock:
+            photos, _, _ = self.staging.list_photos('name')
+            photos = [self.staging.get(photo['name']) for photo in photos]
+            photos = [photo for photo in photos if photo]
+
+            _, hashes_pending = self.hashes.scan(map_fn, limit)
+            features_pending = self.refresh(photos, map_fn, limit)
+
+            ordered = sorted(
+                (photo for photo in photos if photo['name'] in self._features),
+                key=lambda photo: (self._features[photo['name']]['captureTime'], photo['name'])
+            )
+
+            groups = []
+            for photo in ordered:
+                link = self.link(groups[-1]['members'][-1], photo) if groups else None
+                if link is None:
+                    groups.append({'members': [photo], 'links': []})
+                else:
+                    groups[-1]['members'].append(photo)
+                    groups[-1]['links'].append(link)
+
+            suggestions = [
+                {
+                    'photos': [StagingIndex.public_photo(photo) for photo in group['members']],
+                    'startTime': datetime.fromtimestamp(
+                        self._features[group['members'][0]['name']]['captureTime']
+                    ).strftime('%Y-%m-%d %H:%M:%S'),
+                    'confidence': round(min((score for _, score in group['links']), default=1.0), 2),
+                    'reasons': sorted({reason for reason, _ in group['links']}),
+                }
+                for group in groups
+            ]
+            return suggestions, max(hashes_pending, features_pending)
+
+
+_groupers = {}
+_groupers_lock = threading.Lock()
+
+
+def get_photo_grouper(project_path):
+    """Return the shared PhotoGrouper for a project"""
+    key = str(Path(project_path).resolve())
+    with _groupers_lock:
+        if key not in _groupers:
+            _groupers[key] = PhotoGrouper(project_path)
+        return _groupers[key]
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Perceptual hashes for finding near-duplicate photos
+Every photo in photos/staging and photos/by_category gets a 64-bit dHash and
+pHash. Hashes are cached by path + mtime + size, so a rescan only decodes new or
+changed files. Photos within a small Hamming distance on both hashes are grouped
+into duplicate clusters (burst frames, or a catalogued photo imported again).
+
+Run as a batch job: python3 photo_hashes.py [project_path]
+"""
+
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+from PIL import Image
+
+from photo_cache import init_decode_worker
+from staging_index import IMAGE_EXTENSIONS
+
+HASH_SIZE = 8          # 8x8 bits -> 64-bit hashes
+PHASH_SAMPLE = 32      # pHash takes the DCT of a 32x32 greyscale thumbnail
+DEFAULT_MAX_DISTANCE = 10
+HASH_BATCH_SIZE = 64
+HAMMING_CHUNK = 512    # rows compared at once when looking for pairs
+
+# Bits set in each byte value, for vectorized popcounts
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II matrix, so coeffs = D @ pixels @ D.T"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_SAMPLE)
+
+
+def load_hash_pixels(path):
+    """Decode a photo into the greyscale thumbnails the hashes are built from
+
+    Runs in the decode pool; returns (32x32 bytes, 9x8 bytes).
+    """
+    with Image.open(path) as img:
+        # JPEGs decode straight at 1/8 scale
+        img.draft('L', (PHASH_SAMPLE * 2, PHASH_SAMPLE * 2))
+        grey = img.convert('L')
+        phash_pixels = grey.resize((PHASH_SAMPLE, PHASH_SAMPLE), Image.Resampling.LANCZOS)
+        dhash_pixels = grey.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS)
+        return phash_pixels.tobytes(), dhash_pixels.tobytes()
+
+
+def _pack_bits(bits):
+    """(N, 64) booleans -> (N,) uint64"""
+    return np.packbits(bits, axis=1).view('>u8').astype(np.uint64).ravel()
+
+
+def hash_batch(pixels):
+    """Compute (dhashes, phashes) as uint64 arrays for a list of load_hash_pixels() results"""
+    count = len(pixels)
+    large = np.frombuffer(b''.join(p for p, _ in pixels), dtype=np.uint8)
+    large = large.reshape(count, PHASH_SAMPLE, PHASH_SAMPLE).astype(np.float64)
+    small = np.frombuffer(b''.join(d for _, d in pixels), dtype=np.uint8)
+    small = small.reshape(count, HASH_SIZE, HASH_SIZE + 1).astype(np.int16)
+
+    # dHash: is each pixel brighter than its left neighbour?
+    dhashes = _pack_bits((small[:, :, 1:] > small[:, :, :-1]).reshape(count, -1))
+
+    # pHash: low-frequency DCT coefficients above/below their median (DC term excluded)
+    coeffs = _DCT @ large @ _DCT.T
+    low = coeffs[:, :HASH_SIZE, :HASH_SIZE].reshape(count, -1)
+    medians = np.median(low[:, 1:], axis=1)
+    phashes = _pack_bits(low > medians[:, None])
+    return dhashes, phashes
+
+
+def hamming(a, b):
+    """Element-wise Hamming distance between broadcastable uint64 arrays"""
+    x = np.ascontiguousarray(np.bitwise_xor(a, b))
+    return _POPCOUNT[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+
+class PhotoHashIndex:
+    """Cached perceptual hashes for staging and category photos, with duplicate lookups"""
+
+    def __init__(self, photos_path, cache_path):
+        self.photos_path = Path(photos_path)
+        self.cache_path = Path(cache_path)
+        self._lock = threading.RLock()
+        self._entries = self._load_cache()  # relative path -> {mtimeNs, size, dhash, phash}
+        self._arrays = None                 # (keys, dhashes, phashes), rebuilt after scans
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(f'{self.cache_path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def _photo_files(self):
+        """Relative path -> stat for every staging and by_category photo"""
+        found = {}
+        folders = [self.photos_path / 'staging']
+        category_root = self.photos_path / 'by_category'
+        if category_root.exists():
+            folders.extend(sorted(p for p in category_root.iterdir() if p.is_dir()))
+        for folder in folders:
+            if not folder.exists():
+                continue
+            for file_path in folder.iterdir():
+                if file_path.suffix.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                try:
+                    stat = file_path.stat()
+                except FileNotFoundError:
+                    continue
+                found[file_path.relative_to(self.photos_path).as_posix()] = stat
+        return found
+
+    def scan(self, map_fn=map, limit=None):
+        """Hash new or changed photos and forget deleted ones; returns (hashed, still pending)
+
+        map_fn(load_hash_pixels, paths) does the decoding, e.g. a process pool's map.
+        With limit, at most that many photos are decoded; the rest are left for the
+        next scan and counted as pending.
+        """
+        with self._lock:
+            files = self._photo_files()
+            stale = [key for key in self._entries if key not in files]
+            for key in stale:
+                del self._entries[key]
+
+            todo = [
+                key for key, stat in files.items()
+                if self._entries.get(key, {}).get('mtimeNs') != stat.st_mtime_ns
+                or self._entries[key].get('size') != stat.st_size
+            ]
+            pending = max(0, len(todo) - limit) if limit is not None else 0
+            if limit is not None:
+                todo = todo[:limit]
+
+            hashed = 0
+            for start in range(0, len(todo), HASH_BATCH_SIZE):
+                batch = todo[start:start + HASH_BATCH_SIZE]
+                paths = [str(self.photos_path / key) for key in batch]
+                decoded = []
+                for key, result in zip(batch, map_fn(_safe_load_hash_pixels, paths)):
+                    if result is None:
+                        continue
+                    decoded.append((key, result))
+                if not decoded:
+                    continue
+                dhashes, phashes = hash_batch([result for _, result in decoded])
+                for (key, _), dhash, phash in zip(decoded, dhashes, phashes):
+                    stat = files[key]
+                    self._entries[key] = {
+                        'mtimeNs': stat.st_mtime_ns,
+                        'size': stat.st_size,
+                        'dhash': int(dhash),
+                        'phash': int(phash),
+                    }
+                hashed += len(decoded)
+
+            if hashed or stale or self._arrays is None:
+                self._arrays = self._build_arrays()
+            if hashed or stale:
+                self._save_cache()
+            return hashed, pending
+
+    def _build_arrays(self):
+        keys = sorted(self._entries)
+        dhashes = np.array([self._entries[key]['dhash'] for key in keys], dtype=np.uint64)
+        phashes = np.array([self._entries[key]['phash'] for key in keys], dtype=np.uint64)
+        return keys, dhashes, phashes
+
+    def count(self):
+        with self._lock:
+            return len(self._entries)
+
+    def hashes_for(self, key):
+        """(dhash, phash) for a photo path relative to photos/, or None if not hashed"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return (entry['dhash'], entry['phash']) if entry else None
+
+    def nearest(self, dhash, phash, max_distance=DEFAULT_MAX_DISTANCE):
+        """Photos within max_distance of the given hashes, closest first: [(key, distance)]"""
+        with self._lock:
+            keys, dhashes, phashes = self._arrays or self._build_arrays()
+        if not keys:
+            return []
+        d_dist = hamming(dhashes, np.uint64(dhash))
+        p_dist = hamming(phashes, np.uint64(phash))
+        distance = np.maximum(d_dist, p_dist)
+        matches = np.nonzero(distance <= max_distance)[0]
+        matches = matches[np.argsort(distance[matches], kind='stable')]
+        return [(keys[i], int(distance[i])) for i in matches]
+
+    def duplicate_pairs(self, max_distance=DEFAULT_MAX_DISTANCE):
+        """All pairs (i, j, distance) with i < j whose dHash and pHash are both within max_distance"""
+        with self._lock:
+            keys, dhashes, phashes = self._arrays or self._build_arrays()
+        pairs = []
+        for start in range(0, len(keys), HAMMING_CHUNK):
+            block = slice(start, start + HAMMING_CHUNK)
+            d_dist = hamming(dhashes[block, None], dhashes[None, :])
+            p_dist = hamming(phashes[block, None], phashes[None, :])
+            distance = np.maximum(d_dist, p_dist)
+            rows, cols = np.nonzero(distance <= max_distance)
+            upper = cols > rows + start
+            for row, col in zip(rows[upper], cols[upper]):
+                pairs.append((row + start, int(col), int(distance[row, col])))
+        return keys, pairs
+
+    def clusters(self, max_distance=DEFAULT_MAX_DISTANCE):
+        """Groups of two or more near-identical photos, largest first"""
+        keys, pairs = self.duplicate_pairs(max_distance)
+
+        # Union-find over the matching pairs
+        parent = list(range(len(keys)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        closest = {}
+        for i, j, distance in pairs:
+            parent[find(i)] = find(j)
+            closest[i] = min(closest.get(i, distance), distance)
+            closest[j] = min(closest.get(j, distance), distance)
+
+        groups = {}
+        for i in closest:
+            groups.setdefault(find(i), []).append(i)
+
+        clusters = []
+        for members in groups.values():
+            photos = [describe_photo(keys[i], closest[i]) for i in sorted(members, key=lambda i: keys[i])]
+            sources = {photo['source'] for photo in photos}
+            if sources == {'staging'}:
+                kind = 'burst'
+            elif sources == {'category'}:
+                kind = 'catalogue'
+            else:
+                kind = 'reimport'  # a staging photo that's already in by_category
+            clusters.append({'kind': kind, 'photos': photos})
+        clusters.sort(key=lambda cluster: (-len(cluster['photos']), cluster['photos'][0]['path']))
+        return clusters
+
+
+def _safe_load_hash_pixels(path):
+    try:
+        return load_hash_pixels(path)
+    except Exception as e:
+        print(f"⚠️  Could not hash {path}: {e}")
+        return None
+
+
+def describe_photo(key, distance=None):
+    """Photo dict for a path relative to photos/, with the URL the organizer serves it from"""
+    parts = key.split('/')
+    if parts[0] == 'staging':
+        photo = {'source': 'staging', 'name': parts[-1], 'url': f'/api/photo/{quote(parts[-1])}'}
+    else:
+        photo = {
+            'source': 'category',
+            'category': parts[1],
+            'name': parts[-1],
+            'url': f'/api/category-photo/{quote(parts[1])}/{quote(parts[-1])}'
+        }
+    photo['path'] = key
+    if distance is not None:
+        photo['distance'] = distance
+    return photo
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_hash_index(project_path):
+    """Return the shared PhotoHashIndex for a project (hashes cached in cache/photo_hashes.json)"""
+    project_path = Path(project_path)
+    key = str(project_path.resolve())
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = PhotoHashIndex(project_path / 'photos', project_path / 'cache' / 'photo_hashes.json')
+        return _indexes[key]
+
+
+def main():
+    project_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path.cwd()
+    index = get_hash_index(project_path)
+
+    print("🔍 Hashing photos...")
+    with ProcessPoolExecutor(initializer=init_decode_worker) as pool:
+        hashed, _ = index.scan(lambda fn, paths: pool.map(fn, paths, chunksize=8))
+    print(f"✅ {index.count()} photos indexed ({hashed} newly hashed)")
+
+    clusters = index.clusters()
+    if not clusters:
+        print("🎉 No near-duplicates found")
+        return
+
+    labels = {'burst': 'Burst frames', 'reimport': 'Already catalogued', 'catalogue': 'Duplicate in catalogue'}
+    print(f"\n📸 {len(clusters)} duplicate groups:")
+    for cluster in clusters:
+        print(f"\n{labels[cluster['kind']]}:")
+        for photo in cluster['photos']:
+            print(f"   {photo['path']} (distance {photo['distance']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Place photos into by_category/ and ready_for_depop/ without copying the bytes
+Reflinks (copy-on-write clones on APFS, Btrfs, XFS) share storage until one side
+is edited, and a plain copy is the fallback. Hardlinks are opt-in: they share the
+inode, so editing a photo in place in any of the three folders changes it in all
+of them.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import shutil
+import sys
+from pathlib import Path
+
+# Strategies tried, in order, for each placement setting. A strategy the filesystem
+# doesn't support falls through to the next one. 'auto' leaves out hardlinks because
+# a hardlinked photo edited in place is edited everywhere.
+PLACEMENT_STRATEGIES = ('reflink', 'hardlink', 'copy')
+PLACEMENT_CHAINS = {
+    'auto': ('reflink', 'copy'),
+    'reflink': ('reflink', 'copy'),
+    'hardlink': ('hardlink', 'copy'),
+    'copy': ('copy',),
+}
+DEFAULT_PLACEMENT = 'auto'
+
+# Errors meaning "this strategy can't work here" (other device, filesystem without
+# clones, too many links), as opposed to real failures like a full disk, a missing
+# permission or an existing destination, which are raised instead of retried.
+UNSUPPORTED_ERRNOS = {
+    'reflink': {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS},
+    'hardlink': {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EPERM, errno.EMLINK},
+    'copy': set(),
+}
+# Read size for copies
+COPY_CHUNK = 1024 * 1024
+
+# Linux ioctl that clones a whole file (same as `cp --reflink`)
+FICLONE = 0x40049409
+
+_clonefile = None
+if sys.platform == 'darwin':
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        _clonefile = _libc.clonefile
+        _clonefile.argtypes = (ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32)
+        _clonefile.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        _clonefile = None
+
+
+def strategy_chain(strategy):
+    """Strategies to try, in order, for a placement setting"""
+    if strategy not in PLACEMENT_CHAINS and strategy not in (None, ''):
+        raise ValueError(f"Unknown placement strategy: {strategy}")
+    return PLACEMENT_CHAINS[strategy or DEFAULT_PLACEMENT]
+
+
+def reflink(source, destination):
+    """Clone source to destination sharing its data blocks; raises OSError if unsupported"""
+    if _clonefile is not None:
+        if _clonefile(os.fsencode(source), os.fsencode(destination), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(destination))
+        return
+
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported on this platform")
+
+    with open(source, 'rb') as src, open(destination, 'xb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.unlink(destination)
+            raise
+    shutil.copystat(source, destination)
+
+
+def hardlink(source, destination):
+    """Hardlink destination to source; raises OSError across devices"""
+    os.link(source, destination)
+
+
+def copy(source, destination):
+    """Copy source's bytes and timestamps to destination, which must not exist yet"""
+    with open(source, 'rb') as src, open(destination, 'xb') as dst:
+        try:
+            shutil.copyfileobj(src, dst, COPY_CHUNK)
+        except BaseException:
+            dst.close()
+            os.unlink(destination)
+            raise
+    shutil.copystat(source, destination)
+
+
+_PLACERS = {
+    'reflink': reflink,
+    'hardlink': hardlink,
+    'copy': copy,
+}
+
+
+def unique_path(folder, filename, reserved=()):
+    """folder/filename, or folder/stem_N.ext if that name is already taken
+
+    Paths in reserved count as taken, for placements that are planned but not done yet.
+    """
+    folder = Path(folder)
+    path = folder / filename
+    counter = 1
+    while path.exists() or path in reserved:
+        path = folder / f"{Path(filename).stem}_{counter}{Path(filename).suffix}"
+        counter += 1
+    return path
+
+
+def place_file(source, destination, strategy=DEFAULT_PLACEMENT):
+    """Put source at destination using the cheapest strategy that works
+
+    Returns the strategy that was used ('reflink', 'hardlink' or 'copy'). Never
+    overwrites: an existing destination raises FileExistsError, as does any error
+    other than the strategy being unsupported here.
+    """
+    for name in strategy_chain(strategy):
+        try:
+            _PLACERS[name](source, destination)
+            return name
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_ERRNOS[name]:
+                raise
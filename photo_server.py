@@ -7,17 +7,36 @@ Serves photos from the staging folder and handles photo organization
 import http.server
 import socketserver
 import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import os
 import shutil
 import csv
+from bisect import bisect_left, bisect_right
+from collections import deque
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse, quote, unquote
 import base64
+import functools
 import mimetypes
 from PIL import Image
 import io
 
+from event_feed import EventFeed, format_event
+from job_queue import JobQueue
+from metrics import REGISTRY, callback_metric, counter, gauge, histogram
+from photo_cache import DerivativeCache, init_decode_worker, render_jpeg_preview_timed
+from photo_grouping import get_photo_grouper
+from photo_hashes import DEFAULT_MAX_DISTANCE, get_hash_index
+from photo_placement import DEFAULT_PLACEMENT, place_file, strategy_chain, unique_path
+from request_tracing import RequestTracer, add_span, span
+from inventory_store import filter_inventory, get_inventory_store, inventory_filter, parse_item_number
+from staging_index import decode_cursor, encode_cursor, get_staging_index
+from static_assets import COMPRESS_MIN_BYTES, choose_encoding, compress, compressible, get_organizer_assets
+
 # Register HEIC plugin
 try:
     from pillow_heif import register_heif_opener
@@ -26,29 +45,357 @@ try:
 except ImportError:
     print("❌ HEIC support not available - install pillow-heif")
 
+PROJECT_PATH = Path("/Users/emilywebster/Dev/Depop_Selling")
+
+# Previews rendered for the browser (shared by every request handler).
+# Without a size parameter HEIC files get the 800px preview and other formats
+# are sent as-is.
+PREVIEW_MAX_SIZE = 800
+PREVIEW_QUALITY = 75
+
+# Renditions requested with ?size=<preset>: (max edge in px, JPEG quality).
+# A max edge of None keeps the full resolution ("full" sends JPG/PNG originals).
+PREVIEW_SIZES = {
+    'grid': (400, 70),
+    'modal': (1600, 82),
+    'full': (None, 90),
+}
+# ?w=<pixels> is rounded up to one of these so the cache doesn't fill with near-duplicates
+PREVIEW_WIDTHS = (160, 320, 480, 640, 800, 1200, 1600, 2048)
+preview_cache = DerivativeCache(PROJECT_PATH / "cache" / "previews", max_bytes=512 * 1024 * 1024)
+
+# Image decoding runs in a fixed-size process pool so conversions use every core
+# without blocking the request threads. At most DECODE_QUEUE_LIMIT renders are
+# queued or running at once, which keeps peak memory bounded.
+DECODE_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+DECODE_QUEUE_LIMIT = DECODE_WORKERS * 2
+MAX_CONCURRENT_REQUESTS = 32
+# Connections are kept alive (HTTP/1.1) so thumbnails and API calls reuse them;
+# a connection idle for this long is closed to free its slot
+KEEP_ALIVE_TIMEOUT = 15
+decode_pool = None  # created by run_server()
+decode_slots = threading.BoundedSemaphore(DECODE_QUEUE_LIMIT)
+
+# How saved photos are placed into by_category/ and ready_for_depop/:
+# 'auto' (reflink, else copy), 'reflink', 'hardlink' or 'copy'. Reflinks and
+# hardlinks store each photo once instead of three times; hardlinked copies also
+# share edits, so they're only used when asked for.
+PHOTO_PLACEMENT = os.environ.get('DEPOP_PHOTO_PLACEMENT', DEFAULT_PLACEMENT)
+# Photos placed at once by /api/save-items
+PLACEMENT_WORKERS = 8
+
+# New photos decoded per /api/duplicates or /api/suggested-groups request; the
+# response's pending count says how many are left for the next request
+ANALYSIS_PHOTOS_PER_REQUEST = 200
+
+# Sort orders /api/completed-items accepts, mapped to the key used for each row
+COMPLETED_SORT_KEYS = {
+    'id': lambda row: parse_item_number(row.get('Item_ID')) or 0,
+    'dateAdded': lambda row: row.get('Date_Added') or '',
+    'brand': lambda row: (row.get('Brand') or '').lower(),
+    'targetPrice': lambda row: parse_price(row.get('Target_Price')),
+}
+
+def parse_price(value):
+    """Turn a price like '£12.50' into a float (-1 when missing, so it sorts first)"""
+    try:
+        return float(str(value or '').strip().lstrip('£$€') or -1)
+    except ValueError:
+        return -1.0
+
+# Requests run on several threads, so handlers that rewrite the CSV take this lock
+inventory_lock = threading.RLock()
+
+# Saving a new item writes its row, then places its photos on this queue and
+# returns a job ID at once. Until a job finishes, its item ID and destination
+# paths are listed here (guarded by inventory_lock): the item reports placing,
+# can't be deleted yet, and later saves don't reuse its paths.
+PLACEMENT_JOB_WORKERS = 2
+placement_jobs = JobQueue(max_workers=PLACEMENT_JOB_WORKERS)
+pending_item_ids = set()
+pending_placements = set()
+
+# Changes to staging and the inventory, streamed to open pages by /api/events.
+# Each stream holds one of the MAX_CONCURRENT_REQUESTS slots, so they're capped.
+change_feed = EventFeed()
+MAX_EVENT_STREAMS = 8
+
+# Request metrics for /api/metrics, labelled by route with file names collapsed
+# so every photo doesn't get its own series
+ROUTES = {'/', '/photo_organizer.html', '/api/photos', '/api/stats', '/api/completed-items',
+          '/api/export-csv', '/api/duplicates', '/api/suggested-groups', '/api/jobs', '/api/events',
+          '/api/metrics', '/api/save-item', '/api/save-items'}
+ROUTE_PREFIXES = ('/api/photo/', '/api/category-photo/', '/api/jobs/', '/api/delete-item/',
+                  '/api/open-folder/', '/static/')
+http_requests = counter('depop_http_requests_total', 'HTTP requests handled', ('route', 'method', 'status'))
+http_request_seconds = histogram('depop_http_request_duration_seconds', 'Time to handle a request', ('route', 'method'))
+http_response_bytes = counter('depop_http_response_bytes_total', 'Bytes sent, including headers', ('route',))
+http_in_flight = gauge('depop_http_requests_in_flight', 'Requests being handled right now')
+preview_render_seconds = histogram(
+    'depop_preview_render_seconds', 'Preview rendering time per phase (in the decode pool)', ('phase', 'format')
+)
+placement_bytes = counter('depop_photo_placement_bytes_total', 'Bytes of photos placed', ('method',))
+placement_seconds = counter('depop_photo_placement_seconds_total', 'Time spent placing photos', ('method',))
+# Slow-request log, sampled profiles and X-Depop-Trace (see request_tracing.py);
+# off unless DEPOP_SLOW_REQUEST_MS, DEPOP_PROFILE_SAMPLE or DEPOP_TRACE_HEADER is set
+request_tracer = None  # created by run_server()
+callback_metric('depop_preview_cache_hits_total', 'Preview cache hits',
+                lambda: preview_cache.stats()['hits'], kind='counter')
+callback_metric('depop_preview_cache_misses_total', 'Preview cache misses',
+                lambda: preview_cache.stats()['misses'], kind='counter')
+callback_metric('depop_preview_cache_hit_ratio', 'Preview cache hits / lookups since start',
+                lambda: preview_cache_hit_ratio())
+callback_metric('depop_preview_cache_bytes', 'Size of the preview cache on disk',
+                lambda: preview_cache.stats()['bytes'])
+callback_metric('depop_placement_jobs_pending', 'Photo placement jobs queued or running',
+                lambda: placement_jobs.pending_count())
+callback_metric('depop_event_streams', 'Open /api/events streams', lambda: change_feed.subscriber_count())
+
+def preview_cache_hit_ratio():
+    stats = preview_cache.stats()
+    return stats['hits'] / max(1, stats['hits'] + stats['misses'])
+
+def route_label(path):
+    """Route a request path is counted under"""
+    route = urlparse(path).path
+    for prefix in ROUTE_PREFIXES:
+        if route.startswith(prefix):
+            return prefix + '*'
+    return route if route in ROUTES else 'other'
+
+def safe_join(directory, *names):
+    """directory / names, or None if a name could step outside it (decoded '/', '\\' or '..')"""
+    for name in names:
+        if not name or '/' in name or '\\' in name or '..' in name or '\0' in name:
+            return None
+    return directory.joinpath(*names)
+
+def place_photo(source, destination):
+    """place_file with PHOTO_PLACEMENT, recording bytes and time for copy throughput"""
+    started = time.perf_counter()
+    method = place_file(source, destination, PHOTO_PLACEMENT)
+    placement_seconds.inc(time.perf_counter() - started, method=method)
+    placement_bytes.inc(os.path.getsize(destination), method=method)
+    return method
+
+def remove_placed_photos(placements, item_folder):
+    """Undo an item's photo placement (category copies and its item folder)"""
+    for _, category_new_path, _ in placements:
+        if category_new_path.exists():
+            category_new_path.unlink()
+    if item_folder is not None and item_folder.exists():
+        shutil.rmtree(item_folder)
+
+def release_placements(item_id, placements):
+    """Stop reserving a new item's ID and destination paths"""
+    with inventory_lock:
+        pending_item_ids.discard(item_id)
+        for _, category_new_path, item_new_path in placements:
+            pending_placements.discard(category_new_path)
+            pending_placements.discard(item_new_path)
+
+def place_item_photos(job, inventory, item, item_folder, placements):
+    """Placement job for one new item, whose inventory row is already written
+    
+    If a placement fails, the item's files and its row are removed again (and
+    open pages told it was deleted).
+    """
+    item_id = item['id']
+    placement = {}
+    try:
+        for old_path, category_new_path, item_new_path in placements:
+            for destination in (category_new_path, item_new_path):
+                method = place_photo(old_path, destination)
+                placement[method] = placement.get(method, 0) + 1
+                job.advance()
+    except Exception:
+        remove_placed_photos(placements, item_folder)
+        with inventory_lock:
+            inventory.delete(item_id)
+            change_feed.publish('item.deleted', {'id': item_id, 'freedPhotos': [photo['name'] for photo in item['photos']]})
+        raise
+    finally:
+        release_placements(item_id, placements)
+    
+    if placement:
+        print(f"📎 Placed photos for {item_id}: " + ", ".join(f"{count} {method}" for method, count in placement.items()))
+    change_feed.publish('item.updated', dict(item, placing=False))
+    return {'itemId': item_id, 'placement': placement}
+
+def render_in_pool(render, source_path, **params):
+    """Run render(source_path, **params) in the decode pool, or inline if no pool is running"""
+    if decode_pool is None:
+        return render(source_path, **params)
+    with decode_slots:
+        return decode_pool.submit(render, str(source_path), **params).result()
+
+def map_in_pool(fn, items):
+    """map(fn, items) over the decode pool, or inline if no pool is running
+    
+    Like a thumbnail render, each photo in flight holds a decode slot, and at most
+    DECODE_WORKERS are in flight at once, so a big scan shares the pool with
+    thumbnails instead of queueing ahead of them.
+    """
+    if decode_pool is None:
+        return map(fn, items)
+    return _map_in_pool(fn, items)
+
+def _map_in_pool(fn, items):
+    in_flight = deque()
+    try:
+        for item in items:
+            if len(in_flight) >= DECODE_WORKERS:
+                yield in_flight.popleft().result()
+            decode_slots.acquire()
+            try:
+                future = decode_pool.submit(fn, str(item))
+            except BaseException:
+                decode_slots.release()
+                raise
+            future.add_done_callback(lambda _: decode_slots.release())
+            in_flight.append(future)
+        while in_flight:
+            yield in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+class CountingWriter:
+    """Wraps a handler's wfile to count the bytes sent"""
+    
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_written = 0
+    
+    def write(self, data):
+        self.bytes_written += len(data)
+        with span('write'):
+            return self.raw.write(data)
+    
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+class ThreadedPhotoServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """HTTP server that handles each connection on its own thread, up to a fixed limit"""
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, *args, max_concurrent=MAX_CONCURRENT_REQUESTS, **kwargs):
+        self.request_slots = threading.BoundedSemaphore(max_concurrent)
+        super().__init__(*args, **kwargs)
+    
+    def process_request(self, request, client_address):
+        # Wait for a free slot instead of spawning unbounded threads
+        self.request_slots.acquire()
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self.request_slots.release()
+            raise
+    
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.request_slots.release()
+
 class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
+    # Persistent connections: every response must carry a Content-Length (or close the connection)
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Headers and body go out as separate writes; with Nagle's algorithm the body
+    # waits for the client's delayed ACK (~40ms) on every keep-alive response
+    disable_nagle_algorithm = True
+    
     def __init__(self, *args, **kwargs):
-        self.project_path = Path("/Users/emilywebster/Dev/Depop_Selling")
+        self.project_path = PROJECT_PATH
         self.staging_path = self.project_path / "photos" / "staging"
         self.category_path = self.project_path / "photos" / "by_category"
         self.ready_for_depop_path = self.project_path / "photos" / "ready_for_depop"
         self.inventory_path = self.project_path / "data" / "inventory_tracker.csv"
+        # Shared across requests: CSV index, or SQLite if data/inventory.db exists
+        self.inventory = get_inventory_store(self.inventory_path)
+        # Shared across requests: cached staging listing, re-scanned when the folder changes
+        self.staging = get_staging_index(self.staging_path)
+        # Shared across requests: the organizer page split into compressed, fingerprinted parts
+        self.static_assets = get_organizer_assets(self.project_path / "photo_organizer.html")
         super().__init__(*args, **kwargs)
     
+    # ---- request metrics ------------------------------------------------
+    
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
+    
+    def parse_request(self):
+        # The request line has arrived: start timing (not while the connection sat idle)
+        self.request_started = time.perf_counter()
+        self.response_status = None
+        self.request_parsed = False
+        http_in_flight.inc()
+        if not super().parse_request():
+            return False
+        self.request_parsed = True
+        # Event streams stay open for as long as the page does, so they'd always look slow
+        if request_tracer is not None and request_tracer.enabled and not self.path.startswith('/api/events'):
+            self.trace = request_tracer.start(self.command, self.path, route_label(self.path), self.headers)
+        return True
+    
+    def send_response(self, code, message=None):
+        self.response_status = code
+        super().send_response(code, message)
+    
+    def end_headers(self):
+        if self.trace is not None and self.trace.requested:
+            self.send_header('Server-Timing', self.trace.server_timing())
+        super().end_headers()
+    
+    def handle_one_request(self):
+        self.request_started = None
+        self.trace = None
+        bytes_before = self.wfile.bytes_written
+        try:
+            super().handle_one_request()
+        finally:
+            if self.trace is not None:
+                request_tracer.finish(self.trace, self.response_status or 0, self.wfile.bytes_written - bytes_before)
+            if self.request_started is not None:
+                http_in_flight.dec()
+                # A malformed request may have no path (or still the previous request's)
+                route = route_label(self.path) if self.request_parsed else 'bad_request'
+                method = self.command or ''
+                http_request_seconds.observe(time.perf_counter() - self.request_started, route=route, method=method)
+                http_requests.inc(route=route, method=method, status=self.response_status or 0)
+                http_response_bytes.inc(self.wfile.bytes_written - bytes_before, route=route)
+    
     def do_GET(self):
-        if self.path == '/':
-            self.path = '/photo_organizer.html'
+        # Route on the path without any ?query
+        route = urlparse(self.path).path
         
-        if self.path == '/api/photos':
+        if route in ('/', '/photo_organizer.html') or route.startswith('/static/'):
+            self.serve_static_asset(route)
+        elif route == '/api/photos':
             self.serve_photos_list()
         elif self.path.startswith('/api/photo/'):
             self.serve_photo_file()
         elif self.path.startswith('/api/category-photo/'):
             self.serve_category_photo_file()
-        elif self.path == '/api/stats':
+        elif route == '/api/stats':
             self.serve_stats()
-        elif self.path == '/api/completed-items':
+        elif route == '/api/completed-items':
             self.serve_completed_items()
+        elif route == '/api/export-csv':
+            self.serve_inventory_csv()
+        elif route == '/api/duplicates':
+            self.serve_duplicates()
+        elif route == '/api/suggested-groups':
+            self.serve_suggested_groups()
+        elif route == '/api/jobs' or route.startswith('/api/jobs/'):
+            self.serve_jobs(route)
+        elif route == '/api/events':
+            self.serve_events()
+        elif route == '/api/metrics':
+            self.send_body(REGISTRY.render().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
         elif self.path.startswith('/api/open-folder/'):
             self.handle_open_folder()
         else:
@@ -56,108 +403,126 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
     
     def do_POST(self):
         print(f"🔧 POST request received: {self.path}")
-        if self.path == '/api/save-item':
+        # Route on the path without any ?query, like do_GET
+        route = urlparse(self.path).path
+        if route == '/api/save-item':
             print("🔧 Routing to handle_save_item")
-            self.handle_save_item()
+            with inventory_lock:
+                self.handle_save_item()
+        elif route == '/api/save-items':
+            # Takes inventory_lock itself around ID allocation and the row write, so
+            # other saves aren't held up while the batch's photos are placed
+            self.handle_save_items()
         else:
             print(f"🔧 Unknown POST path: {self.path}")
-            self.send_error(404)
+            self.send_error(404)  # also closes the connection, since the body wasn't read
     
     def do_DELETE(self):
-        if self.path.startswith('/api/delete-item/'):
-            self.handle_delete_item()
+        if urlparse(self.path).path.startswith('/api/delete-item/'):
+            with inventory_lock:
+                self.handle_delete_item()
         else:
             self.send_error(404)
     
     def serve_photos_list(self):
-        """Return list of photos in staging folder"""
+        """Return list of photos in staging folder
+        
+        Optional query params: sort=name|modified|size, order=asc|desc, limit=N and
+        cursor=<nextCursor from the previous page>. With limit or cursor the
+        response is {photos, total, nextCursor}; otherwise it's the plain list.
+        """
         try:
-            photos = []
-            image_extensions = {'.jpg', '.jpeg', '.png', '.heic', '.HEIC'}
-            
-            if self.staging_path.exists():
-                for file_path in self.staging_path.iterdir():
-                    if file_path.is_file() and file_path.suffix.lower() in image_extensions:
-                        stat = file_path.stat()
-                        photos.append({
-                            'id': str(hash(file_path.name)),
-                            'name': file_path.name,
-                            'size': f"{stat.st_size / 1024 / 1024:.1f} MB",
-                            'modified': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M'),
-                            'url': f'/api/photo/{file_path.name}'
-                        })
-            
-            # Sort photos by filename (chronological for IMG_XXXX format)
-            photos.sort(key=lambda x: x['name'])
-            
-            self.send_json_response(photos)
+            query = parse_qs(urlparse(self.path).query)
+            sort = query.get('sort', ['name'])[0]
+            descending = query.get('order', ['asc'])[0] == 'desc'
+            cursor = query.get('cursor', [None])[0]
+            limit = query.get('limit', [''])[0]
+            limit = int(limit) if limit.isdigit() else None
+            since = query.get('since', [''])[0]
+            
+            # Read before listing, so a change made meanwhile can only make the ETag stale, never too new
+            revision = self.staging.revision()
+            etag = f'W/"photos-{revision}"'
+            if self.send_list_not_modified(etag):
+                return
+            headers = self.list_headers(etag, revision)
+            
+            if since.isdigit():
+                changes = self.staging.changes_since(int(since))
+                if changes is not None:
+                    revision, photos, removed = changes
+                    self.send_json_response({
+                        'revision': revision,
+                        'full': False,
+                        'photos': photos,
+                        'deleted': removed
+                    }, headers=headers)
+                    return
+            
+            # Sorted by filename by default (chronological for IMG_XXXX format)
+            try:
+                photos, next_cursor, total = self.staging.list_photos(
+                    sort=sort, descending=descending, cursor=cursor, limit=limit
+                )
+            except ValueError as e:
+                self.send_json_response({'success': False, 'error': str(e)}, status_code=400)
+                return
+            
+            if since:
+                # Too old to send a delta (e.g. from before a restart): the whole list instead
+                self.send_json_response({
+                    'revision': revision,
+                    'full': True,
+                    'photos': photos,
+                    'deleted': []
+                }, headers=headers)
+            elif limit is None and cursor is None:
+                self.send_json_response(photos, headers=headers)
+            else:
+                self.send_json_response({
+                    'photos': photos,
+                    'total': total,
+                    'nextCursor': next_cursor,
+                    'revision': revision
+                }, headers=headers)
         except Exception as e:
             self.send_error(500, f"Error loading photos: {str(e)}")
     
     def serve_photo_file(self):
         """Serve individual photo files, converting HEIC to JPEG"""
         try:
-            filename = self.path.split('/')[-1]
-            file_path = self.staging_path / filename
+            filename = unquote(urlparse(self.path).path.split('/')[-1])
+            file_path = safe_join(self.staging_path, filename)
             
-            if not file_path.exists():
+            if file_path is None or not file_path.exists():
                 self.send_error(404, "Photo not found")
                 return
             
-            # Check if it's a HEIC file that needs conversion
-            if file_path.suffix.upper() in ['.HEIC', '.HEIF']:
+            # HEIC always needs conversion; other formats only when a smaller size is asked for
+            rendition = self.get_requested_rendition(file_path)
+            etag, last_modified = self.photo_validators(file_path, rendition)
+            if self.send_not_modified_if_fresh(etag, last_modified):
+                return
+            
+            if rendition is not None:
                 try:
-                    # Convert HEIC to JPEG with smaller size for web
-                    with Image.open(file_path) as img:
-                        # Convert to RGB if necessary
-                        if img.mode != 'RGB':
-                            img = img.convert('RGB')
-                        
-                        # Resize for web display (max 800px)
-                        img.thumbnail((800, 800), Image.Resampling.LANCZOS)
-                        
-                        # Create JPEG in memory
-                        jpeg_buffer = io.BytesIO()
-                        img.save(jpeg_buffer, format='JPEG', quality=75, optimize=True)
-                        jpeg_data = jpeg_buffer.getvalue()
-                        
-                        # Send JPEG response
-                        self.send_response(200)
-                        self.send_header('Content-Type', 'image/jpeg')
-                        self.send_header('Content-Length', str(len(jpeg_data)))
-                        self.send_header('Cache-Control', 'max-age=3600')  # Cache for 1 hour
-                        self.end_headers()
-                        
-                        # Write data in chunks to prevent timeout
-                        chunk_size = 8192
-                        for i in range(0, len(jpeg_data), chunk_size):
-                            chunk = jpeg_data[i:i + chunk_size]
-                            self.wfile.write(chunk)
-                            
-                        return
-                        
+                    # Render a JPEG at the requested size (or reuse an earlier one)
+                    preview_path = self.get_preview(file_path, *rendition)
                 except Exception as convert_error:
-                    print(f"Error converting HEIC {filename}: {convert_error}")
+                    print(f"Error converting {filename}: {convert_error}")
                     # Return a simple error response instead of falling back
-                    self.send_response(500)
-                    self.send_header('Content-Type', 'text/plain')
-                    self.end_headers()
-                    self.wfile.write(b"HEIC conversion failed")
+                    self.send_body(b"Photo conversion failed", 'text/plain', status_code=500)
                     return
+                
+                self.send_file(preview_path, 'image/jpeg', etag, last_modified)
+                return
             
             # Serve original file (JPG, PNG, etc.)
             content_type, _ = mimetypes.guess_type(str(file_path))
             if content_type is None:
                 content_type = 'application/octet-stream'
             
-            self.send_response(200)
-            self.send_header('Content-Type', content_type)
-            self.send_header('Content-Length', str(file_path.stat().st_size))
-            self.send_header('Cache-Control', 'max-age=3600')  # Cache for 1 hour
-            self.end_headers()
-            
-            with open(file_path, 'rb') as f:
-                shutil.copyfileobj(f, self.wfile)
+            self.send_file(file_path, content_type, etag, last_modified)
                 
         except (BrokenPipeError, ConnectionResetError):
             # Client disconnected, ignore
@@ -172,15 +537,18 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
     def serve_category_photo_file(self):
         """Serve photos from category folders, converting HEIC to JPEG"""
         try:
-            # Parse path like /api/category-photo/tops/IMG_3058_1.HEIC
-            path_parts = self.path.split('/')
+            # Parse path like /api/category-photo/tops/IMG_3058_1.HEIC?size=grid
+            path_parts = urlparse(self.path).path.split('/')
             if len(path_parts) < 5:
                 self.send_error(400, "Invalid category photo path")
                 return
             
             category = unquote(path_parts[3])
             filename = unquote(path_parts[4])
-            file_path = self.category_path / category / filename
+            file_path = safe_join(self.category_path, category, filename)
+            if file_path is None:
+                self.send_error(404, "Category photo not found")
+                return
             
             print(f"Looking for photo: {file_path}")
             print(f"Category: '{category}'")
@@ -191,55 +559,30 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_error(404, "Category photo not found")
                 return
             
-            # Check if it's a HEIC file that needs conversion
-            if file_path.suffix.upper() in ['.HEIC', '.HEIF']:
+            # HEIC always needs conversion; other formats only when a smaller size is asked for
+            rendition = self.get_requested_rendition(file_path)
+            etag, last_modified = self.photo_validators(file_path, rendition)
+            if self.send_not_modified_if_fresh(etag, last_modified):
+                return
+            
+            if rendition is not None:
                 try:
-                    # Convert HEIC to JPEG with smaller size for web
-                    with Image.open(file_path) as img:
-                        # Convert to RGB if necessary
-                        if img.mode != 'RGB':
-                            img = img.convert('RGB')
-                        
-                        # Resize for web display (max 800px)
-                        img.thumbnail((800, 800), Image.Resampling.LANCZOS)
-                        
-                        # Create JPEG in memory
-                        jpeg_buffer = io.BytesIO()
-                        img.save(jpeg_buffer, format='JPEG', quality=75, optimize=True)
-                        jpeg_data = jpeg_buffer.getvalue()
-                        
-                        # Send JPEG response
-                        self.send_response(200)
-                        self.send_header('Content-Type', 'image/jpeg')
-                        self.send_header('Content-Length', str(len(jpeg_data)))
-                        self.send_header('Cache-Control', 'max-age=3600')  # Cache for 1 hour
-                        self.end_headers()
-                        
-                        # Write data in chunks to prevent timeout
-                        chunk_size = 8192
-                        for i in range(0, len(jpeg_data), chunk_size):
-                            chunk = jpeg_data[i:i + chunk_size]
-                            self.wfile.write(chunk)
-                        
-                        return
+                    # Render a JPEG at the requested size (or reuse an earlier one)
+                    preview_path = self.get_preview(file_path, *rendition)
                 except Exception as e:
-                    print(f"Error converting HEIC from category: {e}")
+                    print(f"Error converting photo from category: {e}")
                     self.send_error(500, f"Error converting HEIC: {str(e)}")
                     return
+                
+                self.send_file(preview_path, 'image/jpeg', etag, last_modified)
+                return
             
             # Serve original file (JPG, PNG, etc.)
             content_type, _ = mimetypes.guess_type(str(file_path))
             if content_type is None:
                 content_type = 'application/octet-stream'
             
-            self.send_response(200)
-            self.send_header('Content-Type', content_type)
-            self.send_header('Content-Length', str(file_path.stat().st_size))
-            self.send_header('Cache-Control', 'max-age=3600')  # Cache for 1 hour
-            self.end_headers()
-            
-            with open(file_path, 'rb') as f:
-                shutil.copyfileobj(f, self.wfile)
+            self.send_file(file_path, content_type, etag, last_modified)
                 
         except (BrokenPipeError, ConnectionResetError):
             # Client disconnected, ignore
@@ -251,26 +594,175 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
                 # Client disconnected while sending error, ignore
                 pass
     
+    def get_requested_rendition(self, file_path):
+        """Work out the rendition asked for with ?size=<preset> or ?w=<pixels>
+        
+        Returns (max_size, quality), or None when the original file should be sent.
+        """
+        is_heic = file_path.suffix.upper() in ['.HEIC', '.HEIF']
+        query = parse_qs(urlparse(self.path).query)
+        
+        size = query.get('size', [''])[0].lower()
+        if size in PREVIEW_SIZES:
+            max_size, quality = PREVIEW_SIZES[size]
+            if max_size is None and not is_heic:
+                return None  # Browsers can show JPG/PNG originals directly
+            return max_size, quality
+        
+        width = query.get('w', [''])[0]
+        if width.isdigit():
+            max_size = next((w for w in PREVIEW_WIDTHS if w >= int(width)), PREVIEW_WIDTHS[-1])
+            return max_size, PREVIEW_QUALITY
+        
+        if is_heic:
+            return PREVIEW_MAX_SIZE, PREVIEW_QUALITY
+        return None
+    
+    def get_preview(self, file_path, max_size, quality):
+        """Return the path of a cached JPEG rendition, rendering it on a cache miss"""
+        def render(path, **params):
+            started = time.perf_counter()
+            data, timings = render_in_pool(render_jpeg_preview_timed, path, **params)
+            source_format = Path(path).suffix.lower().lstrip('.')
+            for phase, seconds in timings.items():
+                preview_render_seconds.observe(seconds, phase=phase, format=source_format)
+                add_span(phase, seconds)
+            # Queued behind other renders, plus moving the bytes between processes
+            add_span('pool_wait', time.perf_counter() - started - sum(timings.values()))
+            return data
+        
+        return preview_cache.get_or_render(file_path, render, max_size=max_size, quality=quality)
+    
+    def photo_validators(self, file_path, rendition):
+        """Return (ETag, mtime) for a photo response
+        
+        The strong ETag combines the source file identity with the rendition params,
+        so it can be checked without rendering anything.
+        """
+        stat = file_path.stat()
+        tag = f"{stat.st_ino:x}-{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        if rendition is not None:
+            max_size, quality = rendition
+            tag += f"-{max_size or 'full'}q{quality}"
+        return f'"{tag}"', stat.st_mtime
+    
+    def send_not_modified_if_fresh(self, etag, last_modified):
+        """Send 304 Not Modified and return True if the client's cached copy is current"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            # If-None-Match wins over If-Modified-Since when both are sent
+            client_tags = [tag.strip() for tag in if_none_match.split(',')]
+            fresh = '*' in client_tags or etag in client_tags or f'W/{etag}' in client_tags
+        else:
+            fresh = False
+            if_modified_since = self.headers.get('If-Modified-Since')
+            if if_modified_since:
+                try:
+                    fresh = int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+                except (TypeError, ValueError):
+                    fresh = False
+        
+        if not fresh:
+            return False
+        
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(last_modified, usegmt=True))
+        self.send_header('Cache-Control', 'max-age=3600')
+        self.end_headers()
+        return True
+    
+    def parse_range_header(self, file_size, etag):
+        """Parse a single-range Range header
+        
+        Returns (start, end) inclusive, None to send the whole file, or 'invalid'
+        for an unsatisfiable range.
+        """
+        range_header = self.headers.get('Range')
+        if not range_header or not range_header.startswith('bytes='):
+            return None
+        
+        # If-Range: only honour the range if the client's copy is still current
+        if_range = self.headers.get('If-Range')
+        if if_range and if_range.strip() != etag:
+            return None
+        
+        spec = range_header[len('bytes='):].strip()
+        if ',' in spec:
+            return None  # Multiple ranges aren't worth supporting here; send the whole file
+        
+        start_str, _, end_str = spec.partition('-')
+        try:
+            if start_str:
+                start = int(start_str)
+                end = int(end_str) if end_str else file_size - 1
+            else:
+                # Suffix range: the last N bytes
+                suffix_length = int(end_str)
+                if suffix_length == 0:
+                    return 'invalid'
+                start = max(0, file_size - suffix_length)
+                end = file_size - 1
+        except ValueError:
+            return None
+        
+        if start >= file_size or start > end:
+            return 'invalid'
+        return start, min(end, file_size - 1)
+    
+    def send_file(self, file_path, content_type, etag=None, last_modified=None):
+        """Send a file from disk as the response body, honouring Range requests"""
+        file_size = file_path.stat().st_size
+        byte_range = self.parse_range_header(file_size, etag)
+        
+        if byte_range == 'invalid':
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{file_size}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        if byte_range is None:
+            start, end = 0, file_size - 1
+            self.send_response(200)
+        else:
+            start, end = byte_range
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{file_size}')
+        
+        length = end - start + 1
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        if etag:
+            self.send_header('ETag', etag)
+        if last_modified is not None:
+            self.send_header('Last-Modified', formatdate(last_modified, usegmt=True))
+        self.send_header('Cache-Control', 'max-age=3600')  # Cache for 1 hour
+        self.end_headers()
+        
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(64 * 1024, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+    
     def serve_stats(self):
         """Return current stats"""
         try:
-            # Count photos in staging
-            staging_count = 0
-            image_extensions = {'.jpg', '.jpeg', '.png', '.heic', '.HEIC'}
+            # Count photos in staging (from the cached listing)
+            staging_count = self.staging.count()
             
-            if self.staging_path.exists():
-                staging_count = len([f for f in self.staging_path.iterdir() 
-                                   if f.is_file() and f.suffix.lower() in image_extensions])
-            
-            # Count completed items from CSV
+            # Count completed items from the inventory index
             completed_count = 0
-            if self.inventory_path.exists():
-                try:
-                    with open(self.inventory_path, 'r', encoding='utf-8') as file:
-                        reader = csv.DictReader(file)
-                        completed_count = sum(1 for row in reader)
-                except:
-                    pass
+            try:
+                completed_count = self.inventory.count()
+            except Exception:
+                pass
             
             stats = {
                 'totalPhotos': staging_count,
@@ -283,51 +775,210 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
             self.send_error(500, f"Error getting stats: {str(e)}")
     
     def serve_completed_items(self):
-        """Return list of completed items from CSV"""
+        """Return list of completed items from the inventory
+        
+        Optional query params filter and page on the server:
+        status, category, brand, dateFrom/dateTo (Date_Added, YYYY-MM-DD), q (text search),
+        sort=id|dateAdded|brand|targetPrice, order=asc|desc, limit=N, cursor=<nextCursor>
+        and includeUsedPhotos=1. With any of them the response is
+        {items, total, inventoryTotal, nextCursor, revision[, usedPhotos]}; without them
+        it's the plain list of every item.
+        
+        since=<revision> returns {revision, full: false, items, deleted}: the items
+        changed after that revision that match the filters, and the IDs deleted (or
+        no longer matching). If the revision is too old the full first page is sent
+        with full: true.
+        """
         try:
-            items = []
-            if self.inventory_path.exists():
-                with open(self.inventory_path, 'r', encoding='utf-8') as file:
-                    reader = csv.DictReader(file)
-                    for row in reader:
-                        # Convert CSV row to the format expected by the client
-                        photos = []
-                        category = row.get('Category', '').lower()
-                        for i in range(1, 5):  # Photo_1 through Photo_4
-                            photo_col = f'Photo_{i}'
-                            if row.get(photo_col):
-                                photo_filename = row[photo_col]
-                                # Construct proper photo object with URL pointing to category folder
-                                photos.append({
-                                    'id': str(hash(photo_filename)),
-                                    'name': photo_filename,
-                                    'url': f'/api/category-photo/{quote(category)}/{quote(photo_filename)}'
-                                })
-                        
-                        item = {
-                            'id': row['Item_ID'],
-                            'brand': row.get('Brand', ''),
-                            'category': row.get('Category', ''),
-                            'itemType': row.get('Item_Type', ''),
-                            'size': row.get('Size', ''),
-                            'color': row.get('Color', ''),
-                            'condition': row.get('Condition', ''),
-                            'purchasePrice': row.get('Purchase_Price', ''),
-                            'targetPrice': row.get('Target_Price', ''),
-                            'notes': row.get('Notes', ''),
-                            'photos': photos,
-                            'dateAdded': row.get('Date_Added', ''),
-                            'hashtags': row.get('Hashtags', ''),
-                            'title': row.get('Title', ''),
-                            'description': row.get('Description', ''),
-                            'depopFolder': row.get('Depop_Folder', '')
-                        }
-                        items.append(item)
+            query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+            
+            # Read before listing, so a change made meanwhile can only make the ETag stale, never too new
+            revision = self.inventory.revision()
+            etag = f'W/"items-{revision}"'
+            if self.send_list_not_modified(etag):
+                return
+            headers = self.list_headers(etag, revision)
+            
+            if not query:
+                items = [self.inventory_row_to_item(row) for row in self.inventory.rows()]
+                self.send_json_response(items, headers=headers)
+                return
+            
+            filters = dict(
+                status=query.get('status'),
+                category=query.get('category'),
+                brand=query.get('brand'),
+                date_from=query.get('dateFrom'),
+                date_to=query.get('dateTo'),
+                text=query.get('q')
+            )
+            
+            if query.get('since', '').isdigit():
+                changes = self.inventory.changes_since(int(query['since']))
+                if changes is not None:
+                    revision, rows, deleted = changes
+                    matches = inventory_filter(**filters)
+                    self.send_json_response({
+                        'revision': revision,
+                        'full': False,
+                        'items': [self.inventory_row_to_item(row) for row in rows if matches(row)],
+                        'deleted': sorted(deleted) + sorted(row['Item_ID'] for row in rows if not matches(row)),
+                        'inventoryTotal': self.inventory.count()
+                    }, headers=headers)
+                    return
+            
+            sort = query.get('sort', 'id')
+            if sort not in COMPLETED_SORT_KEYS:
+                self.send_json_response({'success': False, 'error': f'Unknown sort: {sort}'}, status_code=400)
+                return
+            descending = query.get('order', 'asc') == 'desc'
+            limit = int(query['limit']) if query.get('limit', '').isdigit() else None
+            
+            rows = filter_inventory(self.inventory, **filters)
+            
+            # Keyset pagination on (sort value, Item_ID) so edits between pages don't shift them
+            sort_key = COMPLETED_SORT_KEYS[sort]
+            keyed = sorted(
+                (((sort_key(row), row.get('Item_ID') or ''), row) for row in rows),
+                key=lambda pair: pair[0]
+            )
+            
+            start = 0
+            if query.get('cursor'):
+                try:
+                    position = tuple(decode_cursor(query['cursor']))
+                except ValueError as e:
+                    self.send_json_response({'success': False, 'error': str(e)}, status_code=400)
+                    return
+                keys = [key for key, _ in keyed]
+                if descending:
+                    # Everything sorting before the cursor comes after it when reversed
+                    start = len(keys) - bisect_left(keys, position)
+                else:
+                    start = bisect_right(keys, position)
+            
+            if descending:
+                keyed.reverse()
             
-            self.send_json_response(items)
+            end = len(keyed) if limit is None else min(len(keyed), start + limit)
+            response = {
+                'items': [self.inventory_row_to_item(row) for _, row in keyed[start:end]],
+                'total': len(keyed),
+                'inventoryTotal': self.inventory.count(),
+                'nextCursor': encode_cursor(*keyed[end - 1][0]) if start < end < len(keyed) else None,
+                'revision': revision
+            }
+            if 'since' in query:
+                response.update(full=True, deleted=[])
+            
+            if query.get('includeUsedPhotos') == '1':
+                # Photo usage across the whole inventory, so the grid can grey out used photos
+                response['usedPhotos'] = sorted({
+                    row[f'Photo_{i}'] for row in self.inventory.rows()
+                    for i in range(1, 5) if row.get(f'Photo_{i}')
+                })
+            
+            self.send_json_response(response, headers=headers)
         except Exception as e:
             self.send_error(500, f"Error loading completed items: {str(e)}")
     
+    def serve_duplicates(self):
+        """Return clusters of near-duplicate photos across staging and by_category
+        
+        Only photos added or changed since the last scan are decoded and hashed,
+        at most ANALYSIS_PHOTOS_PER_REQUEST per request; pending says how many are
+        left (ask again until it's 0). ?maxDistance=N sets the Hamming distance
+        (out of 64 bits) that still counts as a duplicate.
+        """
+        try:
+            query = parse_qs(urlparse(self.path).query)
+            max_distance = int(query.get('maxDistance', [DEFAULT_MAX_DISTANCE])[0])
+            
+            hash_index = get_hash_index(self.project_path)
+            hashed, pending = hash_index.scan(map_in_pool, ANALYSIS_PHOTOS_PER_REQUEST)
+            clusters = hash_index.clusters(max_distance)
+            
+            self.send_json_response({
+                'clusters': clusters,
+                'photosIndexed': hash_index.count(),
+                'newlyHashed': hashed,
+                'pending': pending,
+                'maxDistance': max_distance
+            })
+        except ValueError as e:
+            self.send_json_response({'success': False, 'error': str(e)}, status_code=400)
+        except Exception as e:
+            self.send_error(500, f"Error finding duplicates: {str(e)}")
+    
+    def serve_suggested_groups(self):
+        """Return proposed photo groups (one per item) for the staging photos
+        
+        Groups follow capture order; see photo_grouping for how items are split.
+        Each request analyses at most ANALYSIS_PHOTOS_PER_REQUEST new photos; while
+        pending is above 0 the groups leave out the rest, so ask again.
+        """
+        try:
+            groups, pending = get_photo_grouper(self.project_path).suggest(map_in_pool, ANALYSIS_PHOTOS_PER_REQUEST)
+            self.send_json_response({
+                'groups': groups,
+                'photoCount': sum(len(group['photos']) for group in groups),
+                'pending': pending
+            })
+        except Exception as e:
+            self.send_error(500, f"Error suggesting groups: {str(e)}")
+    
+    def inventory_row_to_item(self, row):
+        """Convert an inventory row to the format expected by the client"""
+        # Convert CSV row to the format expected by the client
+        photos = []
+        category = self.category_folder_for(row.get('Category', '')).name
+        for i in range(1, 5):  # Photo_1 through Photo_4
+            photo_col = f'Photo_{i}'
+            if row.get(photo_col):
+                photo_filename = row[photo_col]
+                # Construct proper photo object with URL pointing to category folder
+                photos.append({
+                    'id': str(hash(photo_filename)),
+                    'name': photo_filename,
+                    'url': f'/api/category-photo/{quote(category)}/{quote(photo_filename)}'
+                })
+        
+        return {
+            'id': row['Item_ID'],
+            'brand': row.get('Brand', ''),
+            'category': row.get('Category', ''),
+            'itemType': row.get('Item_Type', ''),
+            'size': row.get('Size', ''),
+            'color': row.get('Color', ''),
+            'condition': row.get('Condition', ''),
+            'purchasePrice': row.get('Purchase_Price', ''),
+            'targetPrice': row.get('Target_Price', ''),
+            'notes': row.get('Notes', ''),
+            'photos': photos,
+            'dateAdded': row.get('Date_Added', ''),
+            'hashtags': row.get('Hashtags', ''),
+            'title': row.get('Title', ''),
+            'description': row.get('Description', ''),
+            'depopFolder': row.get('Depop_Folder', ''),
+            # Saved, but its photos are still being placed by a background job
+            'placing': row['Item_ID'] in pending_item_ids
+        }
+    
+    def serve_inventory_csv(self):
+        """Download the inventory as a CSV (works for both CSV and SQLite storage)"""
+        try:
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=self.inventory.fieldnames, restval='', extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self.inventory.rows())
+            body = buffer.getvalue().encode('utf-8')
+            
+            self.send_body(body, 'text/csv; charset=utf-8', headers={
+                'Content-Disposition': 'attachment; filename="inventory_tracker.csv"'
+            })
+        except Exception as e:
+            self.send_error(500, f"Error exporting inventory: {str(e)}")
+    
     def handle_save_item(self):
         """Save a completed item to inventory (create new or update existing)"""
         try:
@@ -343,6 +994,7 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
                 # Update existing item
                 item_id = data['itemId']
                 self.update_inventory_item(data, item_id)
+                change_feed.publish('item.updated', self.inventory_row_to_item(self.inventory.get(item_id)))
                 response = {
                     'success': True,
                     'itemId': item_id,
@@ -351,33 +1003,52 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
             else:
                 # Create new item
                 print("🔧 Creating new item")
-                next_id = self.get_next_item_id()
-                print(f"🔧 Next ID: {next_id}")
+                with inventory_lock:
+                    next_id = self.get_next_item_id()
+                    print(f"🔧 Next ID: {next_id}")
+                    
+                    # Create item-specific folder for Depop uploads
+                    item_folder, folder_name = self.create_item_folder(
+                        next_id, 
+                        data.get('title', ''), 
+                        data.get('brand', ''), 
+                        data.get('color', '')
+                    )
+                    
+                    # Decide where each photo goes now; the copies happen in the background
+                    placements = []
+                    try:
+                        for photo_name in data['photos'][:4]:  # Max 4 photos
+                            old_path = safe_join(self.staging_path, photo_name)
+                            if old_path is not None and old_path.exists():
+                                placements.append((old_path, *self.plan_photo_placement(old_path, data['category'], item_folder, pending_placements)))
+                        
+                        # The row is written now, so the item is listed (and exported) straight
+                        # away; it reports placing: true until its job finishes
+                        photo_filenames = [category_new_path.name for _, category_new_path, _ in placements]
+                        self.add_to_inventory(data, photo_filenames, next_id, folder_name)
+                    except Exception:
+                        release_placements(next_id, placements)
+                        remove_placed_photos(placements, item_folder)
+                        raise
+                    pending_item_ids.add(next_id)
+                    item = self.inventory_row_to_item(self.inventory.get(next_id))
+                    change_feed.publish('item.created', item)
                 
-                # Create item-specific folder for Depop uploads
-                item_folder, folder_name = self.create_item_folder(
-                    next_id, 
-                    data.get('title', ''), 
-                    data.get('brand', ''), 
-                    data.get('color', '')
+                # The job gets the store and paths, not this handler: it outlives the request
+                job = placement_jobs.submit(
+                    'placement',
+                    len(placements) * 2,
+                    functools.partial(place_item_photos, inventory=self.inventory, item=item,
+                                      item_folder=item_folder, placements=placements),
+                    itemId=next_id
                 )
                 
-                # Process and copy photos to both category and item folders
-                photo_filenames = []
-                
-                for i, photo_name in enumerate(data['photos'][:4]):  # Max 4 photos
-                    old_path = self.staging_path / photo_name
-                    if old_path.exists():
-                        new_filename = self.move_photo_dual(old_path, data['category'], item_folder, i + 1)
-                        photo_filenames.append(new_filename)
-                
-                # Add to inventory CSV (including folder name for tracking)
-                self.add_to_inventory(data, photo_filenames, next_id, folder_name)
-                
                 response = {
                     'success': True,
                     'itemId': next_id,
-                    'message': f'Item {next_id} saved successfully!'
+                    'jobId': job.id,
+                    'message': f'Item {next_id} saved - placing photos in the background'
                 }
             
             self.send_json_response(response)
@@ -392,54 +1063,267 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
                 'error': str(e)
             }, status_code=500)
     
+    def serve_jobs(self, route):
+        """Progress of background jobs: /api/jobs/<id> for one, /api/jobs for all kept jobs"""
+        job_id = route[len('/api/jobs/'):] if route.startswith('/api/jobs/') else ''
+        if not job_id:
+            self.send_json_response({
+                'jobs': [job.to_dict() for job in placement_jobs.jobs()],
+                'pending': placement_jobs.pending_count()
+            })
+            return
+        
+        job = placement_jobs.get(job_id)
+        if job is None:
+            self.send_json_response({'success': False, 'error': f'Job {job_id} not found'}, status_code=404)
+            return
+        self.send_json_response(job.to_dict())
+    
+    def serve_events(self):
+        """Stream change events to the page (Server-Sent Events) until it disconnects
+        
+        Event types: photo.added / photo.removed (staging), item.created /
+        item.updated / item.deleted (inventory) and resync (reload everything:
+        the events since the client's Last-Event-ID are no longer available).
+        """
+        last_event_id = self.headers.get('Last-Event-ID', '')
+        # Checked and added under the feed's lock, so simultaneous connects can't pass the cap
+        subscribed = change_feed.subscribe(int(last_event_id) if last_event_id.isdigit() else None,
+                                           max_subscribers=MAX_EVENT_STREAMS)
+        if subscribed is None:
+            self.send_json_response({'success': False, 'error': 'Too many open event streams'}, status_code=503)
+            return
+        subscription, missed = subscribed
+        try:
+            # The stream has no length, so it ends by closing the connection
+            self.close_connection = True
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            
+            self.wfile.write(b'retry: 3000\n\n')
+            if missed is None:
+                missed = [{'id': change_feed.last_id, 'type': 'resync', 'data': {}}]
+            for event in missed:
+                self.wfile.write(format_event(event))
+            
+            while not subscription.overflowed:
+                event = subscription.next_event()
+                # A comment line on quiet streams, so dead connections are noticed
+                self.wfile.write(b': keep-alive\n\n' if event is None else format_event(event))
+        except (BrokenPipeError, ConnectionResetError, TimeoutError):
+            pass
+        finally:
+            subscription.close()
+    
+    def handle_save_items(self):
+        """Save several new items in one request
+        
+        Body: {"items": [<same fields as /api/save-item>, ...]}. All photos are
+        placed concurrently and every row is written to the inventory in a single
+        transaction. Returns a result per item; an item whose photos can't be
+        placed is skipped and cleaned up. The saved items get consecutive IDs: a
+        failed item doesn't use one.
+        """
+        try:
+            content_length = int(self.headers['Content-Length'])
+            data = json.loads(self.rfile.read(content_length).decode('utf-8'))
+            items = data.get('items') if isinstance(data, dict) else data
+            if not isinstance(items, list) or not items:
+                self.send_json_response({'success': False, 'error': 'Expected a non-empty list of items'}, status_code=400)
+                return
+            
+            results = {}
+            plans = []
+            reserved_ids = []
+            
+            # Check every item before creating anything on disk
+            valid = []
+            for index, item in enumerate(items):
+                error = self.batch_item_error(item)
+                if error:
+                    results[index] = {'index': index, 'success': False, 'error': error}
+                else:
+                    valid.append((index, item))
+            
+            # Reserve a block of IDs (so single saves meanwhile take later ones) and plan
+            # every placement; the paths are claimed until the batch is done
+            with inventory_lock:
+                first_number = self.next_item_number()
+                for index, item in valid:
+                    item_id = f"DP{(first_number + len(plans)):03d}"
+                    pending_item_ids.add(item_id)
+                    reserved_ids.append(item_id)
+                    plan = {
+                        'index': index, 'item': item, 'itemId': item_id, 'folderName': None,
+                        'itemFolder': None, 'placements': [], 'methods': {}, 'errors': []
+                    }
+                    plans.append(plan)
+                    try:
+                        plan['itemFolder'], plan['folderName'] = self.create_item_folder(
+                            item_id, item.get('title', ''), item.get('brand', ''), item.get('color', '')
+                        )
+                        for photo_name in item.get('photos', [])[:4]:  # Max 4 photos
+                            old_path = safe_join(self.staging_path, photo_name)
+                            if old_path is not None and old_path.exists():
+                                plan['placements'].append(
+                                    (old_path, *self.plan_photo_placement(old_path, item['category'], plan['itemFolder'], pending_placements))
+                                )
+                    except Exception as e:
+                        plan['errors'].append(str(e))
+            
+            try:
+                self.place_batch(plans)
+                
+                for plan in plans:
+                    if plan['errors']:
+                        remove_placed_photos(plan['placements'], plan['itemFolder'])
+                        results[plan['index']] = {
+                            'index': plan['index'],
+                            'success': False,
+                            'error': f"Couldn't save item: {plan['errors'][0]}"
+                        }
+                
+                with inventory_lock:
+                    # Number only the items that were placed, so a failed item leaves no gap
+                    rows = []
+                    saved_plans = []
+                    for plan in plans:
+                        if plan['errors']:
+                            continue
+                        try:
+                            item_id = f"DP{(first_number + len(saved_plans)):03d}"
+                            self.renumber_batch_item(plan, item_id)
+                            photo_filenames = [category_new_path.name for _, category_new_path, _ in plan['placements']]
+                            rows.append(self.build_inventory_row(plan['item'], photo_filenames, item_id, plan['folderName']))
+                        except Exception as e:
+                            remove_placed_photos(plan['placements'], plan['itemFolder'])
+                            results[plan['index']] = {
+                                'index': plan['index'],
+                                'success': False,
+                                'error': f"Couldn't save item: {e}"
+                            }
+                            continue
+                        saved_plans.append(plan)
+                        results[plan['index']] = {
+                            'index': plan['index'],
+                            'success': True,
+                            'itemId': item_id,
+                            'placement': plan['methods']
+                        }
+                    
+                    # One transaction (one journal record) for the whole batch
+                    try:
+                        self.inventory.append_many(rows)
+                    except Exception:
+                        for plan in saved_plans:
+                            remove_placed_photos(plan['placements'], plan['itemFolder'])
+                        raise
+                    for row in rows:
+                        change_feed.publish('item.created', self.inventory_row_to_item(row))
+            finally:
+                for reserved_id, plan in zip(reserved_ids, plans):
+                    release_placements(reserved_id, plan['placements'])
+            
+            saved = sum(1 for result in results.values() if result['success'])
+            print(f"📦 Batch save: {saved} of {len(items)} items saved")
+            self.send_json_response({
+                'success': saved == len(items),
+                'saved': saved,
+                'failed': len(items) - saved,
+                'results': [results[index] for index in sorted(results)]
+            })
+        
+        except Exception as e:
+            print(f"🔧 ERROR in handle_save_items: {str(e)}")
+            self.send_json_response({
+                'success': False,
+                'error': str(e)
+            }, status_code=500)
+    
+    def place_batch(self, plans):
+        """Place every photo of every planned item concurrently, noting methods and errors per plan"""
+        with ThreadPoolExecutor(max_workers=PLACEMENT_WORKERS) as pool:
+            futures = [
+                (plan, pool.submit(place_photo, old_path, destination))
+                for plan in plans
+                if not plan['errors']
+                for old_path, category_new_path, item_new_path in plan['placements']
+                for destination in (category_new_path, item_new_path)
+            ]
+            for plan, future in futures:
+                try:
+                    method = future.result()
+                    plan['methods'][method] = plan['methods'].get(method, 0) + 1
+                except Exception as e:
+                    plan['errors'].append(str(e))
+    
+    def renumber_batch_item(self, plan, item_id):
+        """Give a placed batch item its final ID, renaming its folder if the ID changed"""
+        if item_id == plan['itemId']:
+            return
+        item = plan['item']
+        folder_name = self.generate_item_folder_name(item_id, item.get('title', ''), item.get('brand', ''), item.get('color', ''))
+        item_folder = self.ready_for_depop_path / folder_name
+        plan['itemFolder'].rename(item_folder)
+        plan['itemId'], plan['itemFolder'], plan['folderName'] = item_id, item_folder, folder_name
+    
+    def batch_item_error(self, item):
+        """Why an item in a /api/save-items batch can't be saved, or None if it can"""
+        if not isinstance(item, dict):
+            return 'Each item must be an object'
+        if item.get('itemId'):
+            return 'Batch saves only create new items; edit with /api/save-item'
+        if not isinstance(item.get('category'), str) or not item['category'].strip():
+            return 'Missing category'
+        photos = item.get('photos', [])
+        if not isinstance(photos, list) or not all(isinstance(name, str) for name in photos):
+            return 'photos must be a list of file names'
+        return None
+    
     def handle_delete_item(self):
         """Delete a completed item and its copied photos"""
         try:
             # Extract item ID from URL path
-            item_id = self.path.split('/')[-1]
+            item_id = unquote(urlparse(self.path).path.split('/')[-1])
             
-            if not self.inventory_path.exists():
+            if item_id in pending_item_ids:
                 self.send_json_response({
                     'success': False,
-                    'error': 'No inventory file found'
-                }, status_code=404)
+                    'error': f'Item {item_id} is still placing its photos; try again in a moment'
+                }, status_code=409)
                 return
             
-            # Read current CSV and find the item to delete
-            rows_to_keep = []
-            item_found = False
-            item_photos = []
-            item_category = ""
-            item_folder_name = ""
+            # Remove the item from the inventory store
+            removed_rows = self.inventory.delete(item_id)
             
-            with open(self.inventory_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row['Item_ID'] == item_id:
-                        item_found = True
-                        item_category = row['Category'].lower()
-                        item_folder_name = row.get('Depop_Folder', '')
-                        # Collect photo filenames to delete
-                        for i in range(1, 5):
-                            photo_col = f'Photo_{i}'
-                            if row.get(photo_col):
-                                item_photos.append(row[photo_col])
-                    else:
-                        rows_to_keep.append(row)
-            
-            if not item_found:
+            if not removed_rows:
                 self.send_json_response({
                     'success': False,
                     'error': f'Item {item_id} not found'
                 }, status_code=404)
                 return
             
+            item_photos = []
+            item_category = ""
+            item_folder_name = ""
+            for row in removed_rows:
+                item_category = row['Category']
+                item_folder_name = row.get('Depop_Folder', '')
+                # Collect photo filenames to delete
+                for i in range(1, 5):
+                    photo_col = f'Photo_{i}'
+                    if row.get(photo_col):
+                        item_photos.append(row[photo_col])
+            
             # Delete copied photos from category folder
-            category_folder = self.category_path / item_category
+            category_folder = self.category_folder_for(item_category)
             for photo_filename in item_photos:
                 photo_path = category_folder / photo_filename
                 if photo_path.exists():
-                    photo_path.unlink()  # Delete the file
+                    photo_path.unlink()  # Delete the file (only this link if it was hardlinked)
             
             # Delete item-specific folder from ready_for_depop directory
             if item_folder_name:
@@ -448,25 +1332,7 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
                     import shutil
                     shutil.rmtree(item_folder)  # Delete entire folder and contents
             
-            # Rewrite CSV without the deleted item
-            with open(self.inventory_path, 'w', newline='', encoding='utf-8') as file:
-                if rows_to_keep:
-                    fieldnames = list(rows_to_keep[0].keys())
-                    writer = csv.DictWriter(file, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(rows_to_keep)
-                else:
-                    # If no rows left, write just headers
-                    fieldnames = ['Item_ID', 'Brand', 'Category', 'Subcategory', 'Title', 'Description', 
-                                'Style', 'Source', 'Age', 'Size', 'Color', 'Condition',
-                                'Purchase_Price', 'Target_Price', 'Actual_Sale_Price',
-                                'Parcel_Size', 'International_Shipping', 'City',
-                                'Photo_1', 'Photo_2', 'Photo_3', 'Photo_4', 
-                                'Hashtags', 'Status', 'Date_Added', 'Date_Listed', 'Date_Sold', 
-                                'Likes', 'Views', 'Notes', 'Depop_Folder']
-                    writer = csv.DictWriter(file, fieldnames=fieldnames)
-                    writer.writeheader()
-            
+            change_feed.publish('item.deleted', {'id': item_id, 'freedPhotos': item_photos})
             self.send_json_response({
                 'success': True,
                 'message': f'Item {item_id} deleted successfully',
@@ -493,9 +1359,9 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
                 return
             
             # Construct full path to the folder
-            folder_path = self.ready_for_depop_path / folder_name
+            folder_path = safe_join(self.ready_for_depop_path, folder_name)
             
-            if not folder_path.exists():
+            if folder_path is None or not folder_path.exists():
                 self.send_json_response({
                     'success': False,
                     'error': f'Folder {folder_name} does not exist'
@@ -519,24 +1385,18 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
     
     def get_next_item_id(self):
         """Get the next available item ID"""
-        if not self.inventory_path.exists():
-            return "DP004"
-        
+        return f"DP{self.next_item_number():03d}"
+    
+    def next_item_number(self):
+        """Next free item number, after the inventory and any items still being placed"""
         max_id = 3  # Start from DP004
         try:
-            with open(self.inventory_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row['Item_ID'].startswith('DP'):
-                        try:
-                            id_num = int(row['Item_ID'][2:])  # Remove 'DP' prefix
-                            max_id = max(max_id, id_num)
-                        except ValueError:
-                            continue
+            max_id = max(max_id, self.inventory.max_id_number())
         except Exception:
             pass
         
-        return f"DP{(max_id + 1):03d}"
+        pending = (parse_item_number(item_id) for item_id in pending_item_ids)
+        return max([max_id, *(number for number in pending if number is not None)]) + 1
     
     def generate_filename(self, data):
         """Generate base filename from item data"""
@@ -585,66 +1445,31 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
         item_folder.mkdir(parents=True, exist_ok=True)
         return item_folder, folder_name
     
-    def move_photo(self, old_path, category, base_name, photo_number):
-        """Move photo to appropriate category folder keeping original filename"""
-        category_folder = self.category_path / category.lower()
-        category_folder.mkdir(parents=True, exist_ok=True)
+    def category_folder_for(self, category):
+        """by_category folder for a category ('Tops > T-shirts' is stored under 'tops')"""
+        return self.category_path / category.split(' > ')[0].lower()
+    
+    def plan_photo_placement(self, old_path, category, item_folder, reserved=None):
+        """Pick where a staging photo goes: (category folder path, item folder path)
         
-        # Keep the original filename
-        original_filename = old_path.name
-        new_path = category_folder / original_filename
-        
-        # Handle duplicate filenames by adding a number suffix before the extension
-        counter = 1
-        while new_path.exists():
-            name_part = old_path.stem
-            extension = old_path.suffix
-            duplicate_filename = f"{name_part}_{counter}{extension}"
-            new_path = category_folder / duplicate_filename
-            original_filename = duplicate_filename
-            counter += 1
-        
-        shutil.copy2(str(old_path), str(new_path))
-        return original_filename
-    
-    def move_photo_dual(self, old_path, category, item_folder, photo_number):
-        """Move photo to both category folder and item-specific folder"""
-        # Keep the original filename
-        original_filename = old_path.name
-        
-        # 1. Copy to category folder (existing functionality)
-        category_folder = self.category_path / category.lower()
+        Paths chosen are added to reserved, so photos planned together never collide.
+        """
+        category_folder = self.category_folder_for(category)
         category_folder.mkdir(parents=True, exist_ok=True)
+        reserved = set() if reserved is None else reserved
         
-        category_new_path = category_folder / original_filename
-        # Handle duplicate filenames in category folder
-        counter = 1
-        while category_new_path.exists():
-            name_part = old_path.stem
-            extension = old_path.suffix
-            duplicate_filename = f"{name_part}_{counter}{extension}"
-            category_new_path = category_folder / duplicate_filename
-            counter += 1
-        
-        shutil.copy2(str(old_path), str(category_new_path))
-        
-        # 2. Copy to item-specific folder
-        item_new_path = item_folder / original_filename
-        # Handle duplicate filenames in item folder
-        counter = 1
-        while item_new_path.exists():
-            name_part = old_path.stem
-            extension = old_path.suffix
-            duplicate_filename = f"{name_part}_{counter}{extension}"
-            item_new_path = item_folder / duplicate_filename
-            counter += 1
-        
-        shutil.copy2(str(old_path), str(item_new_path))
-        
-        return original_filename
+        # Keep the original filename when it's free, and use the same name in the item folder
+        category_new_path = unique_path(category_folder, old_path.name, reserved)
+        item_new_path = unique_path(item_folder, category_new_path.name, reserved)
+        reserved.update((category_new_path, item_new_path))
+        return category_new_path, item_new_path
     
     def add_to_inventory(self, data, photo_filenames, item_id, folder_name=None):
         """Add item to inventory CSV"""
+        self.inventory.append(self.build_inventory_row(data, photo_filenames, item_id, folder_name))
+    
+    def build_inventory_row(self, data, photo_filenames, item_id, folder_name=None):
+        """Inventory row for a new item from the organizer form data"""
         # Extract hashtags from description or generate them
         hashtags = self.extract_hashtags_from_description(data.get('description', '')) or self.generate_hashtags(data.get('category'), data.get('brand'))
         
@@ -686,71 +1511,41 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
             'Notes': data.get('notes', ''),
             'Depop_Folder': folder_name or ''
         }
-        
-        # Write to CSV
-        file_exists = self.inventory_path.exists()
-        
-        with open(self.inventory_path, 'a', newline='', encoding='utf-8') as file:
-            fieldnames = list(row_data.keys())
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            
-            if not file_exists:
-                writer.writeheader()
-            
-            writer.writerow(row_data)
+        return row_data
     
     def update_inventory_item(self, data, item_id):
-        """Update an existing item in the inventory CSV"""
-        if not self.inventory_path.exists():
-            raise Exception("Inventory file not found")
-        
-        # Read all rows
-        rows = []
-        updated = False
-        
-        with open(self.inventory_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            fieldnames = reader.fieldnames
-            
-            for row in reader:
-                if row['Item_ID'] == item_id:
-                    # Combine category and subcategory
-                    category_full = data.get('category', '')
-                    if data.get('subcategory'):
-                        category_full += f" > {data.get('subcategory')}"
-                    
-                    # Update this row with new data (but keep photos unchanged)
-                    row.update({
-                        'Brand': data.get('brand', ''),
-                        'Category': category_full,
-                        'Subcategory': data.get('subcategory', ''),
-                        'Title': data.get('title', ''),
-                        'Description': data.get('description', ''),
-                        'Style': data.get('style', ''),
-                        'Source': data.get('source', ''),
-                        'Age': data.get('age', ''),
-                        'Size': data.get('size', ''),
-                        'Color': data.get('color', ''),
-                        'Condition': data.get('condition', ''),
-                        'Purchase_Price': data.get('purchasePrice', ''),
-                        'Target_Price': data.get('targetPrice', ''),
-                        'Parcel_Size': data.get('parcelSize', ''),
-                        'International_Shipping': data.get('internationalShipping', 'No'),
-                        'City': data.get('city', ''),
-                        'Hashtags': self.extract_hashtags_from_description(data.get('description', '')),
-                        'Notes': data.get('notes', ''),
-                    })
-                    updated = True
-                rows.append(row)
-        
-        if not updated:
-            raise Exception(f"Item {item_id} not found")
+        """Update an existing item in the inventory"""
+        # Combine category and subcategory
+        category_full = data.get('category', '')
+        if data.get('subcategory'):
+            category_full += f" > {data.get('subcategory')}"
         
-        # Write back all rows
-        with open(self.inventory_path, 'w', encoding='utf-8', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
+        # Update the row with new data (but keep photos unchanged)
+        changes = {
+            'Brand': data.get('brand', ''),
+            'Category': category_full,
+            'Subcategory': data.get('subcategory', ''),
+            'Title': data.get('title', ''),
+            'Description': data.get('description', ''),
+            'Style': data.get('style', ''),
+            'Source': data.get('source', ''),
+            'Age': data.get('age', ''),
+            'Size': data.get('size', ''),
+            'Color': data.get('color', ''),
+            'Condition': data.get('condition', ''),
+            'Purchase_Price': data.get('purchasePrice', ''),
+            'Target_Price': data.get('targetPrice', ''),
+            'Parcel_Size': data.get('parcelSize', ''),
+            'International_Shipping': data.get('internationalShipping', 'No'),
+            'City': data.get('city', ''),
+            'Hashtags': self.extract_hashtags_from_description(data.get('description', '')),
+            'Notes': data.get('notes', ''),
+        }
+        
+        try:
+            self.inventory.update(item_id, changes)
+        except KeyError:
+            raise Exception(f"Item {item_id} not found")
     
     def extract_hashtags_from_description(self, description):
         """Extract hashtags from description text"""
@@ -786,30 +1581,121 @@ class PhotoOrganizerHandler(http.server.SimpleHTTPRequestHandler):
         
         return ' '.join(tags[:5])
     
-    def send_json_response(self, data, status_code=200):
-        """Send JSON response"""
+    def serve_static_asset(self, route):
+        """Serve the organizer page or one of its fingerprinted /static/ parts, precompressed"""
+        try:
+            asset = self.static_assets.get(route)
+        except OSError as e:
+            self.send_error(500, f"Error loading page: {str(e)}")
+            return
+        if asset is None:
+            self.send_error(404, "Asset not found")
+            return
+        
+        # Each encoding has its own ETag, so a cached gzip body never validates an identity request
+        body, encoding = asset.negotiate(self.headers.get('Accept-Encoding'))
+        etag = asset.etag(encoding)
+        if etag in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', asset.cache_control)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', asset.cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_body(self, body, content_type, status_code=200, headers=None):
+        """Send a complete response body, compressed if the client accepts it and it's worth it"""
+        encoding = None
+        if len(body) >= COMPRESS_MIN_BYTES and compressible(content_type):
+            encoding = choose_encoding(self.headers.get('Accept-Encoding'))
+            if encoding:
+                with span('compress'):
+                    body = compress(body, encoding)
+        
         self.send_response(status_code)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if compressible(content_type):
+            self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self.wfile.write(body)
+    
+    def send_list_not_modified(self, etag):
+        """Answer 304 if the client already has this revision of a list; returns True if it did"""
+        if etag not in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+            return False
+        self.send_response(304)
+        for name, value in self.list_headers(etag).items():
+            self.send_header(name, value)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        return True
+    
+    def list_headers(self, etag, revision=None):
+        """Headers for a revisioned list: revalidate every time (cheap: 304 while unchanged)"""
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if revision is not None:
+            headers['X-Revision'] = str(revision)
+        return headers
+    
+    def send_json_response(self, data, status_code=200, headers=None):
+        """Send JSON response"""
+        with span('json'):
+            body = json.dumps(data).encode('utf-8')
+        self.send_body(body, 'application/json', status_code,
+                       headers={'Access-Control-Allow-Origin': '*', **(headers or {})})
+
+def publish_staging_changes(added, removed):
+    for photo in added:
+        change_feed.publish('photo.added', photo)
+    for name in removed:
+        change_feed.publish('photo.removed', {'name': name})
 
 def run_server():
+    global decode_pool, request_tracer
     PORT = 8001
-    project_path = Path("/Users/emilywebster/Dev/Depop_Selling")
+    project_path = PROJECT_PATH
     
     print("🚀 Starting Depop Photo Organizer Server...")
     print("=" * 50)
     print(f"📂 Project: {project_path}")
     print(f"🌐 Server: http://localhost:{PORT}")
     print(f"📸 Photos: {project_path / 'photos' / 'staging'}")
+    print(f"🧵 Decode workers: {DECODE_WORKERS}")
+    print(f"📎 Photo placement: {' → '.join(strategy_chain(PHOTO_PLACEMENT))}")
+    request_tracer = RequestTracer(project_path / "logs")
+    if request_tracer.enabled:
+        print(f"🔬 Tracing: {request_tracer.describe()} ({project_path / 'logs'})")
     print("=" * 50)
     
     # Change to project directory
     os.chdir(str(project_path))
     
+    decode_pool = ProcessPoolExecutor(max_workers=DECODE_WORKERS, initializer=init_decode_worker)
+    
+    # Keep the staging listing current in the background so requests don't scan the folder,
+    # and tell open pages about photos added to or removed from staging
+    staging = get_staging_index(project_path / "photos" / "staging")
+    staging.add_listener(publish_staging_changes)
+    staging.start_watcher()
+    
     # Start server
-    with socketserver.TCPServer(("", PORT), PhotoOrganizerHandler) as httpd:
+    with decode_pool, ThreadedPhotoServer(("", PORT), PhotoOrganizerHandler) as httpd:
         print(f"✅ Server running at http://localhost:{PORT}")
         print("📱 Open this URL in your browser to use the photo organizer")
         print("🛑 Press Ctrl+C to stop the server")
@@ -818,6 +1704,11 @@ def run_server():
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
+            if placement_jobs.pending_count():
+                print(f"\n⏳ Finishing {placement_jobs.pending_count()} photo placement jobs...")
+            placement_jobs.shutdown(wait=True)
+            # Fold any journaled edits back into inventory_tracker.csv
+            get_inventory_store(project_path / "data" / "inventory_tracker.csv").compact()
             print("\n🛑 Server stopped.")
             print("✨ Thanks for using Depop Photo Organizer!")
 
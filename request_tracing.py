@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Opt-in request tracing and profiling for the photo organizer server
+When a request is slow, this says where the time went. Each traced request
+collects timing spans (decode, resize and encode in the decode pool, waiting for
+the pool, JSON encoding, compression, socket writes), and requests slower than
+DEPOP_SLOW_REQUEST_MS are logged with them to logs/slow_requests.log.
+DEPOP_PROFILE_SAMPLE profiles that fraction of requests with cProfile, keeping the
+newest dumps for each route in logs/profiles/<route>/. With DEPOP_TRACE_HEADER=1
+a single request can ask for a trace with an "X-Depop-Trace: 1" header (or
+"profile" to also profile it): the spans come back in a Server-Timing header,
+which browser dev tools show under Timing.
+
+Everything is off unless one of those is set; a disabled span is a thread-local
+lookup.
+
+    python3 request_tracing.py logs/profiles/api_photo    # merged profile of a route's dumps
+"""
+
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Requests slower than this (ms) are logged with their spans; 0 turns the log off
+SLOW_REQUEST_MS = float(os.environ.get('DEPOP_SLOW_REQUEST_MS', 0))
+# Fraction of requests profiled with cProfile (0.01 = 1 in 100); 0 turns sampling off
+PROFILE_SAMPLE = float(os.environ.get('DEPOP_PROFILE_SAMPLE', 0))
+# Honour X-Depop-Trace request headers
+TRACE_HEADER_ENABLED = os.environ.get('DEPOP_TRACE_HEADER', '') == '1'
+TRACE_HEADER = 'X-Depop-Trace'
+# Profile dumps kept per route (oldest deleted first)
+PROFILES_PER_ROUTE = 20
+
+_local = threading.local()
+_NO_SPAN = contextlib.nullcontext()
+# Only one request is profiled at a time: Python 3.12+ allows one active profiler per process
+_profile_lock = threading.Lock()
+
+
+class Trace:
+    """Timings collected for one request"""
+
+    def __init__(self, method, path, route, requested=False):
+        self.method = method
+        self.path = path
+        self.route = route
+        self.requested = requested  # asked for with the trace header
+        self.started = time.perf_counter()
+        self.spans = {}  # name -> [seconds, count]
+        self.profiler = None
+
+    def add(self, name, seconds):
+        span = self.spans.setdefault(name, [0.0, 0])
+        span[0] += seconds
+        span[1] += 1
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Server-Timing header value for the spans so far"""
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, (seconds, _) in self.spans.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ', '.join(parts)
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'started')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.trace.add(self.name, time.perf_counter() - self.started)
+
+
+def span(name):
+    """Context manager timing a phase of the current thread's traced request (no-op otherwise)"""
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name)
+
+
+def add_span(name, seconds):
+    """Record a phase timed elsewhere (e.g. in the decode pool) on the current traced request"""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+def route_slug(route):
+    """'/api/photo/*' -> 'api_photo', for folder names"""
+    return re.sub(r'[^a-zA-Z0-9]+', '_', route).strip('_') or 'root'
+
+
+class RequestTracer:
+    """Starts and finishes traces for the server's requests and writes the logs and profiles"""
+
+    def __init__(self, log_dir, slow_ms=SLOW_REQUEST_MS, profile_sample=PROFILE_SAMPLE,
+                 header_enabled=TRACE_HEADER_ENABLED):
+        self.log_dir = Path(log_dir)
+        self.slow_log_path = self.log_dir / "slow_requests.log"
+        self.profile_dir = self.log_dir / "profiles"
+        self.slow_ms = slow_ms
+        self.profile_sample = profile_sample
+        self.header_enabled = header_enabled
+        self.enabled = slow_ms > 0 or profile_sample > 0 or header_enabled
+        self._log_lock = threading.Lock()
+
+    def describe(self):
+        """One line saying what's switched on, for the startup banner"""
+        parts = []
+        if self.slow_ms > 0:
+            parts.append(f"slow requests > {self.slow_ms:g}ms logged")
+        if self.profile_sample > 0:
+            parts.append(f"profiling {self.profile_sample:.1%} of requests")
+        if self.header_enabled:
+            parts.append(f"{TRACE_HEADER} header honoured")
+        return ', '.join(parts) or 'off'
+
+    def start(self, method, path, route, headers):
+        """Begin tracing the current thread's request; returns the Trace"""
+        trace_header = headers.get(TRACE_HEADER, '').strip().lower() if self.header_enabled else ''
+        trace = Trace(method, path, route, requested=bool(trace_header))
+        sampled = self.profile_sample > 0 and random.random() < self.profile_sample
+        if (sampled or trace_header == 'profile') and _profile_lock.acquire(blocking=False):
+            trace.profiler = cProfile.Profile()
+            trace.profiler.enable()
+        _local.trace = trace
+        return trace
+
+    def finish(self, trace, status, bytes_sent):
+        """Stop tracing; log the request if it was slow or asked for, and save its profile"""
+        _local.trace = None
+        total_ms = trace.elapsed() * 1000
+        profile_path = None
+        if trace.profiler is not None:
+            trace.profiler.disable()
+            _profile_lock.release()
+            profile_path = self.save_profile(trace, total_ms)
+
+        slow = self.slow_ms > 0 and total_ms >= self.slow_ms
+        if not (slow or trace.requested):
+            return
+
+        spans = {name: {'ms': round(seconds * 1000, 2), 'count': count}
+                 for name, (seconds, count) in trace.spans.items()}
+        # Time outside every span: routing, inventory and staging lookups, waiting on locks
+        other_ms = total_ms - sum(span['ms'] for span in spans.values())
+        record = {
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'reason': 'slow' if slow else 'header',
+            'method': trace.method,
+            'path': trace.path,
+            'route': trace.route,
+            'status': status,
+            'bytes': bytes_sent,
+            'ms': round(total_ms, 2),
+            'spans': spans,
+            'otherMs': round(max(0.0, other_ms), 2),
+            'profile': str(profile_path) if profile_path else None,
+        }
+        breakdown = ', '.join(f"{name} {span['ms']:.0f}ms" for name, span in spans.items())
+        print(f"{'🐢' if slow else '🔬'} {trace.method} {trace.path} {total_ms:.0f}ms ({breakdown or 'no spans'})")
+        with self._log_lock:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.slow_log_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(record) + '\n')
+
+    def save_profile(self, trace, total_ms):
+        """Dump a request's profile under profiles/<route>/, keeping the newest PROFILES_PER_ROUTE"""
+        route_dir = self.profile_dir / route_slug(trace.route)
+        route_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        profile_path = route_dir / f"{stamp}-{trace.method}-{total_ms:.0f}ms.prof"
+        trace.profiler.dump_stats(profile_path)
+        for old in sorted(route_dir.glob('*.prof'))[:-PROFILES_PER_ROUTE]:
+            old.unlink(missing_ok=True)
+        return profile_path
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 request_tracing.py <profile folder or .prof files> [lines]")
+        sys.exit(1)
+
+    paths = []
+    for arg in sys.argv[1:]:
+        if arg.isdigit():
+            continue
+        path = Path(arg)
+        paths.extend(sorted(path.glob('*.prof')) if path.is_dir() else [path])
+    if not paths:
+        print("❌ No .prof files found")
+        sys.exit(1)
+
+    lines = next((int(arg) for arg in sys.argv[1:] if arg.isdigit()), 25)
+    print(f"📈 {len(paths)} profiles merged, by cumulative time:")
+    stats = pstats.Stats(*map(str, paths))
+    stats.strip_dirs().sort_stats('cumulative').print_stats(lines)
+
+
+if __name__ == "__main__":
+    main()
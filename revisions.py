@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Revision numbers for the organizer's lists
+Every change to a record (an inventory item, a staging photo) bumps its list's
+revision, and the log remembers the revision each record last changed or was
+deleted at. A client that has seen revision N asks for ?since=N and gets only
+what changed after it, and the revision doubles as the list's ETag.
+Revisions are in-memory; they start from the process start time so numbers
+from before a restart are recognisably too old and get a full list instead.
+"""
+
+import time
+
+_MISSING = object()
+
+
+class RevisionLog:
+    """Which keys of a collection changed or were deleted after a given revision
+
+    Not thread-safe by itself: the owning store calls it under its own lock.
+    """
+
+    def __init__(self):
+        self.base = int(time.time() * 1000)
+        self.revision = self.base
+        self._fingerprints = {}  # key -> fingerprint of its current contents
+        self._changed = {}       # key -> revision it last changed at
+        self._deleted = {}       # key -> revision it was deleted at
+        self._synced = False
+
+    def touch(self, key, fingerprint):
+        """Record key's current contents, bumping the revision if they changed"""
+        if self._fingerprints.get(key, _MISSING) == fingerprint:
+            return
+        self._fingerprints[key] = fingerprint
+        if not self._synced:
+            return  # still loading the initial contents
+        self.revision += 1
+        self._changed[key] = self.revision
+        self._deleted.pop(key, None)
+
+    def remove(self, key):
+        """Record that key was deleted"""
+        if self._fingerprints.pop(key, _MISSING) is _MISSING:
+            return
+        if not self._synced:
+            return
+        self.revision += 1
+        self._deleted[key] = self.revision
+        self._changed.pop(key, None)
+
+    def sync(self, snapshot):
+        """Diff a full {key: fingerprint} snapshot against what's known (e.g. after a reload)
+
+        The first sync records the initial contents without bumping the revision.
+        """
+        if not self._synced:
+            self._fingerprints = dict(snapshot)
+            self._synced = True
+            return
+        for key, fingerprint in snapshot.items():
+            self.touch(key, fingerprint)
+        for key in self._fingerprints.keys() - snapshot.keys():
+            self.remove(key)
+
+    def changes_since(self, since):
+        """(changed keys, deleted keys) after revision since
+
+        None if since isn't a revision from this log (from before a restart, or
+        not issued yet): the client needs the full list.
+        """
+        if since < self.base or since > self.revision:
+            return None
+        changed = [key for key, revision in self._changed.items() if revision > since]
+        deleted = [key for key, revision in self._deleted.items() if revision > since]
+        return changed, deleted
+
+
+def row_fingerprint(row):
+    """Cheap fingerprint of a row dict's contents"""
+    return hash(tuple(row.items()))
@@ -30,8 +30,8 @@ echo ""
 echo "Installing required Python packages..."
 echo "This may take a few minutes..."
 
-PACKAGES=("pillow")
-OPTIONAL_PACKAGES=("requests" "openai" "anthropic")
+PACKAGES=("pillow" "numpy")
+OPTIONAL_PACKAGES=("requests" "openai" "anthropic" "brotli")
 
 for package in "${PACKAGES[@]}"; do
     echo "Installing $package..."
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Cached listing of the photos/staging folder
+The folder is only re-scanned when its mtime changes (a file was added, removed
+or renamed). A background poller can do that check so request handlers never
+touch the filesystem, and listings are pre-formatted and pre-sorted for
+/api/photos pagination. Listeners are told which photos each re-scan added or
+removed, and a RevisionLog answers ?since=<revision> with just those changes.
+"""
+
+import base64
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from pathlib import Path
+
+from revisions import RevisionLog
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic'}
+
+# Sort orders /api/photos accepts, mapped to the key used for each photo
+SORT_KEYS = {
+    'name': lambda photo: photo['name'],
+    'modified': lambda photo: photo['mtime'],
+    'size': lambda photo: photo['bytes'],
+}
+
+
+def encode_cursor(sort_value, name):
+    """Opaque cursor pointing just after the photo with this sort value and name"""
+    raw = json.dumps([sort_value, name]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        sort_value, name = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return sort_value, name
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class StagingIndex:
+    """Thread-safe, cached index of the image files in the staging folder"""
+
+    def __init__(self, staging_path):
+        self.staging_path = Path(staging_path)
+        self.scan_count = 0
+        self._lock = threading.RLock()
+        self._dir_mtime = None
+        self._photos = {}   # name -> photo dict
+        self._sorted = {}   # sort name -> list of (sort value, name), ascending
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self._listeners = []
+        self._revisions = RevisionLog()
+
+    # ---- change detection ----------------------------------------------
+
+    def _current_dir_mtime(self):
+        try:
+            return self.staging_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self, force=False):
+        """Re-scan the folder if its mtime changed; returns True if it was re-scanned"""
+        with self._lock:
+            dir_mtime = self._current_dir_mtime()
+            if not force and self.scan_count and dir_mtime == self._dir_mtime:
+                return False
+            self._scan(dir_mtime)
+            return True
+
+    def _ensure_current(self):
+        # With the watcher running, reads trust the cached listing
+        if self._watcher is None or not self.scan_count:
+            self.refresh()
+
+    def _scan(self, dir_mtime):
+        photos = {}
+        if self.staging_path.exists():
+            for file_path in self.staging_path.iterdir():
+                if file_path.suffix.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                try:
+                    stat = file_path.stat()
+                except FileNotFoundError:
+                    continue
+                if not file_path.is_file():
+                    continue
+                photos[file_path.name] = {
+                    'id': str(hash(file_path.name)),
+                    'name': file_path.name,
+                    'size': f"{stat.st_size / 1024 / 1024:.1f} MB",
+                    'modified': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M'),
+                    'url': f'/api/photo/{file_path.name}',
+                    'mtime': stat.st_mtime,
+                    'bytes': stat.st_size,
+                }
+
+        previous = self._photos
+        first_scan = not self.scan_count
+        self._photos = photos
+        self._sorted = {
+            sort: sorted((key(photo), photo['name']) for photo in photos.values())
+            for sort, key in SORT_KEYS.items()
+        }
+        self._dir_mtime = dir_mtime
+        self.scan_count += 1
+        self._revisions.sync({name: (photo['mtime'], photo['bytes']) for name, photo in photos.items()})
+
+        if not first_scan and self._listeners:
+            added = [self.public_photo(photos[name]) for name in sorted(photos.keys() - previous.keys())]
+            removed = sorted(previous.keys() - photos.keys())
+            if added or removed:
+                for listener in self._listeners:
+                    listener(added, removed)
+
+    def add_listener(self, listener):
+        """Call listener(added photos, removed names) after each re-scan that changed the listing"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def start_watcher(self, interval=2.0):
+        """Poll the folder mtime in a background thread so reads never hit the disk"""
+        if self._watcher is not None:
+            return
+        self.refresh()
+
+        def watch():
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.refresh()
+                except OSError as e:
+                    print(f"Error scanning staging folder: {e}")
+
+        self._watcher = threading.Thread(target=watch, name='staging-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop_watching.set()
+        self._watcher = None
+
+    # ---- reads ---------------------------------------------------------
+
+    def count(self):
+        """Number of photos in staging"""
+        with self._lock:
+            self._ensure_current()
+            return len(self._photos)
+
+    def get(self, name):
+        with self._lock:
+            self._ensure_current()
+            return self._photos.get(name)
+
+    def revision(self):
+        """Current revision of the listing; bumped by every photo added, changed or removed"""
+        with self._lock:
+            self._ensure_current()
+            return self._revisions.revision
+
+    def changes_since(self, since):
+        """(revision, changed photos, removed names) after revision since, or None if it's too old"""
+        with self._lock:
+            self._ensure_current()
+            changes = self._revisions.changes_since(since)
+            if changes is None:
+                return None
+            changed, removed = changes
+            photos = [self.public_photo(self._photos[name]) for name in sorted(changed)]
+            return self._revisions.revision, photos, sorted(removed)
+
+    def list_photos(self, sort='name', descending=False, cursor=None, limit=None):
+        """Return (photos, next_cursor, total) for one page of the listing
+
+        The cursor is the position just after the last photo of the previous
+        page, so photos added or removed between calls don't shift pages.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort: {sort}")
+
+        with self._lock:
+            self._ensure_current()
+            ordered = self._sorted[sort]
+            photos = self._photos
+            total = len(ordered)
+
+        start = 0
+        if cursor:
+            position = tuple(decode_cursor(cursor))
+            if descending:
+                # Everything sorting before the cursor comes after it when reversed
+                start = total - bisect_left(ordered, position)
+            else:
+                start = bisect_right(ordered, position)
+
+        if descending:
+            ordered = ordered[::-1]
+
+        end = total if limit is None else min(total, start + limit)
+        page = [self.public_photo(photos[name]) for _, name in ordered[start:end]]
+        next_cursor = encode_cursor(*ordered[end - 1]) if end < total and end > start else None
+        return page, next_cursor, total
+
+    @staticmethod
+    def public_photo(photo):
+        """Photo dict as sent to the browser (without the raw sort fields)"""
+        return {key: photo[key] for key in ('id', 'name', 'size', 'modified', 'url')}
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_staging_index(staging_path):
+    """Return the shared StagingIndex for staging_path (one per folder per process)"""
+    key = str(Path(staging_path).resolve())
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = StagingIndex(staging_path)
+        return _indexes[key]
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Compressed, fingerprinted static assets for the photo organizer server
+photo_organizer.html stays a single file to edit, but it's served split up: the
+inline <style> and <script> become /static/organizer.<hash>.css and .js, which
+browsers cache forever (the hash changes whenever the file does), and only the
+small HTML shell is revalidated. Every part is compressed once with gzip (and
+brotli, if installed) when the page is built, instead of on every request.
+"""
+
+import gzip
+import hashlib
+import re
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this aren't worth compressing
+COMPRESS_MIN_BYTES = 1024
+# Per-request compression favours speed; static assets are compressed once, so use the best
+DYNAMIC_GZIP_LEVEL = 5
+DYNAMIC_BROTLI_QUALITY = 5
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+PAGE_CACHE_CONTROL = 'no-cache'  # always revalidate (cheap: 304 on the ETag)
+
+INLINE_STYLE = re.compile(r'<style>(.*?)</style>', re.DOTALL)
+INLINE_SCRIPT = re.compile(r'<script>(.*?)</script>', re.DOTALL)
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encoding):
+    """Best content coding we support from an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        match = re.search(r'q=([0-9.]+)', params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding, static=False):
+    if encoding == 'br':
+        return brotli.compress(body, quality=STATIC_BROTLI_QUALITY if static else DYNAMIC_BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=STATIC_GZIP_LEVEL if static else DYNAMIC_GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding '{encoding}'")
+
+
+def compressible(content_type):
+    return content_type.startswith(('text/', 'application/json', 'application/javascript', 'image/svg'))
+
+
+# ETag suffix per content coding: each encoded body is a different representation
+ETAG_SUFFIXES = {None: '', 'gzip': '-gz', 'br': '-br'}
+
+
+class StaticAsset:
+    """One asset body plus its precompressed variants"""
+
+    def __init__(self, body, content_type, cache_control):
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {}
+        if len(body) >= COMPRESS_MIN_BYTES:
+            for encoding in supported_encodings():
+                compressed = compress(body, encoding, static=True)
+                if len(compressed) < len(body):
+                    self.variants[encoding] = compressed
+
+    def etag(self, encoding=None):
+        """Strong ETag of the body sent with this content coding"""
+        return f'"{self.digest}{ETAG_SUFFIXES[encoding]}"'
+
+    def negotiate(self, accept_encoding):
+        """(body, content coding or None) for a request's Accept-Encoding"""
+        encoding = choose_encoding(accept_encoding)
+        if encoding in self.variants:
+            return self.variants[encoding], encoding
+        return self.body, None
+
+
+class OrganizerAssets:
+    """The organizer page split into a shell and fingerprinted CSS/JS, rebuilt when the file changes"""
+
+    def __init__(self, html_path):
+        self.html_path = html_path
+        self._signature = None
+        self.page = None
+        self.assets = {}  # '/static/<name>' -> StaticAsset
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Rebuild if photo_organizer.html changed since the last build (one stat per request)"""
+        stat = self.html_path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if signature != self._signature:
+                self._build(self.html_path.read_text(encoding='utf-8'))
+                self._signature = signature
+
+    def _build(self, html):
+        assets = {}
+
+        def extract(pattern, suffix, content_type, tag):
+            nonlocal html
+            match = pattern.search(html)
+            if match is None:
+                return
+            body = match.group(1).encode('utf-8')
+            name = f"/static/organizer.{hashlib.sha256(body).hexdigest()[:12]}.{suffix}"
+            assets[name] = StaticAsset(body, content_type, IMMUTABLE_CACHE_CONTROL)
+            html = html[:match.start()] + tag.format(url=name) + html[match.end():]
+
+        extract(INLINE_STYLE, 'css', 'text/css; charset=utf-8', '<link rel="stylesheet" href="{url}">')
+        extract(INLINE_SCRIPT, 'js', 'application/javascript; charset=utf-8', '<script src="{url}"></script>')
+
+        self.page = StaticAsset(html.encode('utf-8'), 'text/html; charset=utf-8', PAGE_CACHE_CONTROL)
+        # Earlier builds stay servable for tabs still showing the old page
+        self.assets.update(assets)
+
+    def get(self, route):
+        """StaticAsset for '/' or a /static/ URL, or None"""
+        self.refresh()
+        with self._lock:
+            if route in ('/', '/photo_organizer.html'):
+                return self.page
+            return self.assets.get(route)
+
+
+_organizer_assets = {}
+_organizer_assets_lock = threading.Lock()
+
+
+def get_organizer_assets(html_path):
+    """Shared OrganizerAssets for this page (one per path)"""
+    with _organizer_assets_lock:
+        if html_path not in _organizer_assets:
+            _organizer_assets[html_path] = OrganizerAssets(html_path)
+        return _organizer_assets[html_path]
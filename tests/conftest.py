@@ -0,0 +1,77 @@
+"""Shared fixtures: the repo's scripts are importable, and an organizer server runs on a temp project"""
+
+import http.client
+import json
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+REPO_PATH = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_PATH))
+
+
+def make_project(root):
+    """An empty organizer project with two staging photos"""
+    staging = root / "photos" / "staging"
+    for folder in (staging, root / "photos" / "by_category", root / "photos" / "ready_for_depop", root / "data"):
+        folder.mkdir(parents=True)
+    Image.new('RGB', (64, 48), (200, 40, 40)).save(staging / "IMG_0001.jpg", quality=90)
+    Image.new('RGB', (64, 48), (40, 200, 40)).save(staging / "IMG_0002.jpg", quality=90)
+    shutil.copy2(REPO_PATH / "photo_organizer.html", root / "photo_organizer.html")
+    return root
+
+
+class Client:
+    """Keep-alive HTTP client for the test server"""
+
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+
+    def request(self, method, path, body=None, headers=None):
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = dict(headers or {})
+        if payload is not None:
+            headers['Content-Type'] = 'application/json'
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        response.body = response.read()
+        if response.will_close:
+            self.connection.close()
+        return response
+
+    def json(self, method, path, body=None, headers=None):
+        response = self.request(method, path, body, headers)
+        return response.status, json.loads(response.body)
+
+
+@pytest.fixture
+def project(tmp_path):
+    return make_project(tmp_path / "project")
+
+
+@pytest.fixture
+def server(project, monkeypatch):
+    """PhotoOrganizerHandler on a free port, serving project; yields a Client"""
+    import photo_server
+    from photo_cache import DerivativeCache
+
+    class QuietHandler(photo_server.PhotoOrganizerHandler):
+        def log_message(self, format, *args):
+            pass
+
+    monkeypatch.setattr(photo_server, 'PROJECT_PATH', project)
+    monkeypatch.setattr(photo_server, 'preview_cache', DerivativeCache(project / "cache" / "previews"))
+    httpd = photo_server.ThreadedPhotoServer(('127.0.0.1', 0), QuietHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    client = Client(httpd.server_address[1])
+    try:
+        yield client
+    finally:
+        client.connection.close()
+        httpd.shutdown()
+        httpd.server_close()
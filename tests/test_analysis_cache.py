@@ -0,0 +1,78 @@
+"""AnalysisCache: keyed by photo contents, backend, model and prompt version"""
+
+import json
+import shutil
+
+import pytest
+
+import analysis_cache
+from analysis_cache import AnalysisCache
+from vision_backends import ConcurrentAnalyzer, VisionBackend
+
+
+class FakeBackend(VisionBackend):
+    name = 'fake'
+    needs_images = False
+
+    def complete(self, images, prompt, timeout):
+        return json.dumps({'category': 'tops', 'brand': 'Zara'})
+
+
+@pytest.fixture
+def photo(tmp_path):
+    path = tmp_path / "IMG_0001.jpg"
+    path.write_bytes(b'photo bytes')
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnalysisCache(tmp_path / "cache" / "analysis")
+
+
+def test_key_follows_contents_not_path(cache, photo, tmp_path):
+    moved = tmp_path / "renamed.jpg"
+    shutil.copy2(photo, moved)
+    backend = FakeBackend()
+    assert cache.key_for([photo], backend) == cache.key_for([moved], backend)
+
+    photo.write_bytes(b'edited photo bytes')
+    assert cache.key_for([photo], backend) != cache.key_for([moved], backend)
+
+
+def test_key_includes_model_and_prompt_version(cache, photo, monkeypatch):
+    key = cache.key_for([photo], FakeBackend('model-a'))
+    assert cache.key_for([photo], FakeBackend('model-a')) == key
+    assert cache.key_for([photo], FakeBackend('model-b')) != key
+
+    monkeypatch.setattr(analysis_cache, 'PROMPT_VERSION', analysis_cache.PROMPT_VERSION + 1)
+    assert cache.key_for([photo], FakeBackend('model-a')) != key
+
+
+def test_photo_order_is_part_of_the_key(cache, photo, tmp_path):
+    other = tmp_path / "IMG_0002.jpg"
+    other.write_bytes(b'other photo')
+    backend = FakeBackend()
+    assert cache.key_for([photo, other], backend) != cache.key_for([other, photo], backend)
+
+
+def test_analyzer_reuses_cached_answers_until_the_model_changes(cache, photo):
+    analyzer = ConcurrentAnalyzer(FakeBackend('model-a'), requests_per_minute=10 ** 6, cache=cache)
+    first = analyzer.analyze(photo)
+    assert analyzer.analyze(photo) == first
+    assert (analyzer.calls, analyzer.cache_hits) == (1, 1)
+    analyzer.shutdown()
+
+    upgraded = ConcurrentAnalyzer(FakeBackend('model-b'), requests_per_minute=10 ** 6, cache=cache)
+    upgraded.analyze(photo)
+    assert (upgraded.calls, upgraded.cache_hits) == (1, 0)
+    upgraded.shutdown()
+
+
+def test_unreadable_entry_is_a_miss(cache, photo):
+    key = cache.key_for([photo], FakeBackend())
+    cache.put(key, {'brand': 'Zara'})
+    cache.store.path_for(key).write_bytes(b'{not json')
+
+    assert cache.get(key) is None
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,70 @@
+"""/api/completed-items: server-side filters combined with cursor pagination"""
+
+import pytest
+
+from inventory_store import get_inventory_store
+
+ITEMS = [
+    ('DP004', 'Zara', 'Tops > T-shirts', 'Listed', '2024-03-01', 'Striped tee'),
+    ('DP005', 'Nike', 'Tops', 'Listed', '2024-03-02', 'Running top'),
+    ('DP006', 'Zara', 'Bottoms', 'Listed', '2024-03-03', 'Wide jeans'),
+    ('DP007', 'Zara', 'Tops', 'Sold', '2024-03-04', 'Linen shirt'),
+    ('DP008', 'Zara', 'Tops', 'Listed', '2024-04-01', 'Cropped tee'),
+    ('DP009', 'zara ', 'tops', 'listed', '2024-04-02', 'Vintage tee'),
+]
+
+
+@pytest.fixture
+def inventory(project):
+    store = get_inventory_store(project / "data" / "inventory_tracker.csv")
+    for item_id, brand, category, status, date_added, title in ITEMS:
+        store.append({'Item_ID': item_id, 'Brand': brand, 'Category': category, 'Status': status,
+                      'Date_Added': date_added, 'Title': title})
+    return store
+
+
+def ids(server, query):
+    """Item IDs of every page, following nextCursor"""
+    pages, cursor = [], None
+    while True:
+        status, page = server.json('GET', f'/api/completed-items?{query}' + (f'&cursor={cursor}' if cursor else ''))
+        assert status == 200
+        pages.append([item['id'] for item in page['items']])
+        cursor = page['nextCursor']
+        if cursor is None:
+            return pages, page['total']
+
+
+def test_filters_page_with_the_cursor(server, inventory):
+    pages, total = ids(server, 'status=listed&category=tops&brand=zara&limit=2')
+    assert pages == [['DP004', 'DP008'], ['DP009']]
+    assert total == 3
+
+
+def test_descending_pages_with_date_range_and_text(server, inventory):
+    pages, total = ids(server, 'dateFrom=2024-03-02&dateTo=2024-04-02&q=tee&sort=dateAdded&order=desc&limit=1')
+    assert pages == [['DP009'], ['DP008']]
+    assert total == 2
+
+
+def test_edits_between_pages_dont_shift_them(server, inventory):
+    _, first = server.json('GET', '/api/completed-items?brand=zara&limit=2')
+    assert [item['id'] for item in first['items']] == ['DP004', 'DP006']
+
+    inventory.delete('DP004')
+    _, second = server.json('GET', f"/api/completed-items?brand=zara&limit=2&cursor={first['nextCursor']}")
+    assert [item['id'] for item in second['items']] == ['DP007', 'DP008']
+    assert second['total'] == 4
+    assert second['inventoryTotal'] == 5
+
+
+def test_invalid_cursor_is_rejected(server, inventory):
+    status, body = server.json('GET', '/api/completed-items?status=listed&cursor=not-a-cursor')
+    assert status == 400
+    assert 'Invalid cursor' in body['error']
+
+
+def test_unknown_sort_is_rejected(server, inventory):
+    status, body = server.json('GET', '/api/completed-items?sort=colour')
+    assert status == 400
+    assert not body['success']
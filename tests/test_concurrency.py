@@ -0,0 +1,47 @@
+"""Concurrent request handling: a slow render doesn't hold up other requests"""
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import photo_server
+from conftest import Client
+from photo_cache import init_decode_worker
+
+
+def test_other_requests_are_served_while_a_render_is_slow(server, monkeypatch):
+    rendering = threading.Event()
+    release = threading.Event()
+    get_preview = photo_server.PhotoOrganizerHandler.get_preview
+
+    def slow_get_preview(self, *args):
+        rendering.set()
+        release.wait(10)
+        return get_preview(self, *args)
+
+    monkeypatch.setattr(photo_server.PhotoOrganizerHandler, 'get_preview', slow_get_preview)
+    slow_client = Client(server.connection.port)
+    slow = []
+    thread = threading.Thread(target=lambda: slow.append(slow_client.request('GET', '/api/photo/IMG_0001.jpg?w=100')))
+    thread.start()
+    assert rendering.wait(10)
+
+    status, _ = server.json('GET', '/api/stats')
+    assert status == 200
+    assert not slow
+
+    release.set()
+    thread.join(10)
+    assert slow[0].status == 200
+
+
+def test_renders_run_in_the_decode_pool(server, monkeypatch):
+    pool = ProcessPoolExecutor(max_workers=1, initializer=init_decode_worker)
+    monkeypatch.setattr(photo_server, 'decode_pool', pool)
+    try:
+        slots = photo_server.decode_slots._value
+        response = server.request('GET', '/api/photo/IMG_0001.jpg?w=100')
+        assert response.status == 200
+        assert response.getheader('Content-Type') == 'image/jpeg'
+        assert photo_server.decode_slots._value == slots
+    finally:
+        pool.shutdown()
@@ -0,0 +1,114 @@
+"""EventFeed: subscriber cap, Last-Event-ID replay and resync"""
+
+import http.client
+import threading
+
+import photo_server
+from event_feed import EventFeed
+
+
+def test_subscriber_cap_holds_under_simultaneous_subscribes():
+    feed = EventFeed()
+    start = threading.Barrier(32)
+    results = []
+
+    def connect():
+        start.wait()
+        results.append(feed.subscribe(max_subscribers=8))
+
+    threads = [threading.Thread(target=connect) for _ in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(result is not None for result in results) == 8
+    assert feed.subscriber_count() == 8
+
+    # A closed stream frees its place
+    next(result for result in results if result is not None)[0].close()
+    assert feed.subscribe(max_subscribers=8) is not None
+    assert feed.subscribe(max_subscribers=8) is None
+
+
+def test_reconnect_replays_the_events_after_last_event_id():
+    feed = EventFeed()
+    first = feed.publish('item.created', {'id': 'DP004'})
+    feed.publish('item.updated', {'id': 'DP004'})
+    feed.publish('item.deleted', {'id': 'DP004'})
+
+    subscription, missed = feed.subscribe(first)
+    assert [event['type'] for event in missed] == ['item.updated', 'item.deleted']
+
+    feed.publish('photo.added', {'name': 'IMG_0003.jpg'})
+    assert subscription.next_event(timeout=1)['type'] == 'photo.added'
+
+    # Already up to date: nothing to replay
+    assert feed.subscribe(feed.last_id)[1] == []
+
+
+def test_events_dropped_from_history_mean_a_resync():
+    feed = EventFeed(history=3)
+    first = feed.publish('item.created', {'id': 'DP004'})
+    for _ in range(4):
+        feed.publish('item.updated', {'id': 'DP004'})
+
+    # The event right after first is gone
+    assert feed.subscribe(first)[1] is None
+    # The newest three are still there
+    assert len(feed.subscribe(first + 1)[1]) == 3
+
+
+def test_ids_from_before_a_restart_mean_a_resync():
+    old = EventFeed()
+    old_id = old.publish('item.created', {'id': 'DP004'})
+
+    restarted = EventFeed()
+    assert restarted.subscribe(old_id)[1] is None
+    assert restarted.subscribe(restarted.last_id + 50)[1] is None
+
+
+def read_events(response, count):
+    """The first count events of an SSE stream as (id, type) pairs"""
+    events, current = [], {}
+    while len(events) < count:
+        line = response.readline().decode('utf-8').rstrip('\n')
+        if not line:
+            if 'event' in current:
+                events.append((int(current['id']), current['event']))
+            current = {}
+        elif not line.startswith(':'):
+            field, _, value = line.partition(': ')
+            current[field] = value
+    return events
+
+
+def open_stream(server, last_event_id):
+    connection = http.client.HTTPConnection('127.0.0.1', server.connection.port, timeout=10)
+    connection.request('GET', '/api/events', headers={'Last-Event-ID': str(last_event_id)})
+    response = connection.getresponse()
+    assert response.status == 200
+    assert response.getheader('Content-Type').startswith('text/event-stream')
+    return connection, response
+
+
+def test_stream_replays_missed_events_then_follows_new_ones(server):
+    feed = photo_server.change_feed
+    last_seen = feed.publish('item.created', {'id': 'DP004'})
+    missed = feed.publish('item.updated', {'id': 'DP004'})
+
+    connection, response = open_stream(server, last_seen)
+    try:
+        assert read_events(response, 1) == [(missed, 'item.updated')]
+        live = feed.publish('item.deleted', {'id': 'DP004'})
+        assert read_events(response, 1) == [(live, 'item.deleted')]
+    finally:
+        connection.close()
+
+
+def test_stream_asks_a_client_that_was_away_too_long_to_resync(server):
+    connection, response = open_stream(server, 1)
+    try:
+        assert read_events(response, 1) == [(photo_server.change_feed.last_id, 'resync')]
+    finally:
+        connection.close()
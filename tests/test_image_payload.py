@@ -0,0 +1,68 @@
+"""Vision payloads: upright, within the edge limit and under the byte budget"""
+
+import io
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_payload import PayloadPreparer, render_payload, render_tiled_payload
+
+
+@pytest.fixture
+def busy_photo(tmp_path):
+    """A 3MP photo full of detail, about 1MB as a JPEG"""
+    pixels = np.random.default_rng(1).integers(0, 256, (150, 200, 3), dtype=np.uint8)
+    path = tmp_path / "IMG_0001.jpg"
+    Image.fromarray(pixels).resize((2000, 1500), Image.Resampling.BILINEAR).save(path, quality=95)
+    return path
+
+
+def decoded(payload):
+    img = Image.open(io.BytesIO(payload))
+    assert img.format == 'JPEG'
+    return img
+
+
+@pytest.mark.parametrize('max_bytes', [400_000, 150_000, 60_000])
+def test_payload_stays_under_the_byte_budget(busy_photo, max_bytes):
+    payload = render_payload(busy_photo, max_edge=1200, max_bytes=max_bytes)
+    assert len(payload) <= max_bytes
+    assert max(decoded(payload).size) <= 1200
+
+
+def test_payload_is_rotated_upright(tmp_path):
+    path = tmp_path / "IMG_0002.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # camera held sideways: rotate 90 degrees clockwise to view
+    Image.new('RGB', (400, 300), (200, 40, 40)).save(path, exif=exif)
+
+    assert decoded(render_payload(path, max_edge=200)).size == (150, 200)
+
+
+def test_tiled_payload_fits_the_budget(busy_photo, tmp_path):
+    second = tmp_path / "IMG_0002.jpg"
+    Image.new('RGB', (300, 400), (40, 40, 200)).save(second)
+
+    payload = render_tiled_payload([busy_photo, second, busy_photo], max_edge=1000, max_bytes=150_000)
+    assert len(payload) <= 150_000
+    width, height = decoded(payload).size
+    assert width == height <= 1000  # a 2x2 grid of square cells
+
+
+def test_preparer_reuses_cached_payloads(busy_photo, tmp_path):
+    preparer = PayloadPreparer(tmp_path / "payloads", max_edge=800, max_bytes=100_000, workers=1)
+    try:
+        [(first, media_type)] = preparer.prepare([busy_photo])
+        assert media_type == 'image/jpeg'
+        assert len(first) <= 100_000
+
+        # The pool stores the payload from a done-callback, just after prepare() returns
+        deadline = time.monotonic() + 10
+        while not preparer.cache.stats()['entries'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert preparer.prepare([busy_photo]) == [(first, media_type)]
+        assert preparer.cache.stats()['hits'] == 1
+    finally:
+        preparer.shutdown()
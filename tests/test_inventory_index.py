@@ -0,0 +1,62 @@
+"""InventoryIndex: reloads only when the CSV changes on disk"""
+
+import csv
+import os
+
+import pytest
+
+from inventory_store import INVENTORY_FIELDNAMES, InventoryIndex
+
+
+def write_csv(path, *rows):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=INVENTORY_FIELDNAMES, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def bump_mtime(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "inventory_tracker.csv"
+    write_csv(path, {'Item_ID': 'DP001', 'Brand': 'Zara', 'Status': 'Not Listed'})
+    return path
+
+
+def test_unchanged_file_is_not_reloaded(csv_path):
+    index = InventoryIndex(csv_path)
+    assert index.get('DP001')['Brand'] == 'Zara'
+    index.rows()
+    index.by_status('Not Listed')
+    assert index.load_count == 1
+
+
+def test_edited_file_is_reloaded(csv_path):
+    index = InventoryIndex(csv_path)
+    assert index.get('DP001')['Status'] == 'Not Listed'
+
+    # Edited in a spreadsheet: same size, only the mtime gives it away
+    write_csv(csv_path, {'Item_ID': 'DP001', 'Brand': 'Zara', 'Status': 'Listed    '})
+    bump_mtime(csv_path)
+
+    assert index.get('DP001')['Status'] == 'Listed    '
+    assert index.by_status('Not Listed') == []
+    assert index.load_count == 2
+
+
+def test_rows_added_on_disk_are_picked_up(csv_path):
+    index = InventoryIndex(csv_path)
+    assert index.max_id_number() == 1
+
+    write_csv(csv_path,
+              {'Item_ID': 'DP001', 'Brand': 'Zara', 'Status': 'Not Listed'},
+              {'Item_ID': 'DP007', 'Brand': 'Nike', 'Status': 'Listed'})
+    bump_mtime(csv_path)
+
+    assert [row['Item_ID'] for row in index.rows()] == ['DP001', 'DP007']
+    assert index.by_brand('nike')[0]['Item_ID'] == 'DP007'
+    assert index.max_id_number() == 7
@@ -0,0 +1,107 @@
+"""InventoryIndex journal: replay, torn-write recovery and compaction"""
+
+import threading
+
+import pytest
+
+from inventory_store import InventoryIndex
+
+
+def item(number, **values):
+    return {'Item_ID': f"DP{number:03d}", 'Brand': 'Zara', 'Category': 'Tops', 'Status': 'Not Listed', **values}
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    return tmp_path / "inventory_tracker.csv"
+
+
+def test_journal_is_replayed_by_a_fresh_index(csv_path):
+    index = InventoryIndex(csv_path, compact_threshold=1000)
+    index.append(item(1))
+    index.append(item(2))
+    index.update('DP001', {'Status': 'Listed'})
+    index.delete('DP002')
+
+    reloaded = InventoryIndex(csv_path)
+    assert [row['Item_ID'] for row in reloaded.rows()] == ['DP001']
+    assert reloaded.get('DP001')['Status'] == 'Listed'
+
+
+def test_torn_last_line_is_dropped_before_the_next_append(csv_path):
+    index = InventoryIndex(csv_path, compact_threshold=1000)
+    index.append(item(1))
+    # A writer crashed halfway through its record
+    with open(index.journal_path, 'ab') as journal:
+        journal.write(b'{"op": "upsert", "id": "DP0')
+
+    fresh = InventoryIndex(csv_path, compact_threshold=1000)
+    assert fresh.append(item(2))['Item_ID'] == 'DP002'
+
+    reloaded = InventoryIndex(csv_path)
+    assert sorted(row['Item_ID'] for row in reloaded.rows()) == ['DP001', 'DP002']
+    assert index.journal_path.read_bytes().endswith(b'\n')
+
+
+def test_writes_raise_when_their_record_is_not_applied(csv_path, monkeypatch):
+    index = InventoryIndex(csv_path, compact_threshold=1000)
+    index.append(item(1))
+    monkeypatch.setattr(index, '_apply_record', lambda record: None)
+    with pytest.raises(RuntimeError):
+        index.append(item(2))
+    with pytest.raises(RuntimeError):
+        index.update('DP001', {'Status': 'Sold'})
+
+
+def test_compaction_folds_the_journal_into_the_csv(csv_path):
+    index = InventoryIndex(csv_path, compact_threshold=1000)
+    for number in range(1, 6):
+        index.append(item(number))
+    index.delete('DP003')
+    index.compact()
+
+    assert index.journal_path.stat().st_size == 0
+    reloaded = InventoryIndex(csv_path)
+    assert [row['Item_ID'] for row in reloaded.rows()] == ['DP001', 'DP002', 'DP004', 'DP005']
+
+
+def test_appends_from_another_writer_survive_compaction(csv_path):
+    # Two indexes on one file stand in for the server and photo_analyzer.py
+    compactor = InventoryIndex(csv_path, compact_threshold=10 ** 6)
+    writer = InventoryIndex(csv_path, compact_threshold=10 ** 6)
+    compactor.append(item(1))
+    done = threading.Event()
+
+    def compact_repeatedly():
+        while not done.is_set():
+            compactor.compact()
+
+    thread = threading.Thread(target=compact_repeatedly)
+    thread.start()
+    try:
+        for number in range(2, 202):
+            writer.append(item(number))
+    finally:
+        done.set()
+        thread.join()
+
+    assert InventoryIndex(csv_path).count() == 201
+
+
+def test_sqlite_import_includes_journaled_changes(tmp_path, monkeypatch):
+    import inventory_store
+    from inventory_store import INVENTORY_DB_NAME, SqliteInventory
+
+    csv_path = tmp_path / "data" / "inventory_tracker.csv"
+    csv_path.parent.mkdir()
+    index = InventoryIndex(csv_path, compact_threshold=1000)
+    index.append(item(1))
+    index.append(item(2))
+    index.update('DP002', {'Status': 'Sold'})
+
+    monkeypatch.setattr('sys.argv', ['inventory_store.py', 'import', str(tmp_path)])
+    inventory_store.main()
+
+    database = SqliteInventory(csv_path.with_name(INVENTORY_DB_NAME))
+    assert database.count() == 2
+    assert database.get('DP002')['Status'] == 'Sold'
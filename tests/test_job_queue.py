@@ -0,0 +1,36 @@
+"""JobQueue: finished jobs and pruning"""
+
+import threading
+
+from job_queue import JobQueue
+
+
+def test_finished_jobs_always_have_a_finish_time():
+    queue = JobQueue(max_workers=4)
+    jobs = [queue.submit('test', 1, lambda job: 'ok') for _ in range(200)]
+    queue.shutdown(wait=True)
+    assert all(job.status == 'done' and job.finished_at is not None and job.result == 'ok' for job in jobs)
+
+
+def test_pruning_skips_a_job_that_is_finishing():
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+    job = queue.submit('test', 1, lambda job: release.wait(5))
+    # A job caught between being marked done and getting its finish time
+    job.status = 'done'
+    job.finished_at = None
+    queue.submit('test', 1, lambda job: None)  # prunes; must not compare None
+    release.set()
+    queue.shutdown(wait=True)
+    assert job.finished_at is not None
+
+
+def test_failed_job_records_its_error():
+    queue = JobQueue(max_workers=1)
+
+    def fail(job):
+        raise ValueError('nope')
+
+    job = queue.submit('test', 2, fail)
+    queue.shutdown(wait=True)
+    assert job.status == 'failed' and job.error == 'nope' and job.finished_at is not None
@@ -0,0 +1,83 @@
+"""?since=<revision> deltas and ETag revalidation for /api/photos and /api/completed-items"""
+
+import pytest
+from PIL import Image
+
+from inventory_store import get_inventory_store
+
+
+@pytest.fixture
+def inventory(project):
+    store = get_inventory_store(project / "data" / "inventory_tracker.csv")
+    for item_id, brand in (('DP004', 'Zara'), ('DP005', 'Zara'), ('DP006', 'Nike')):
+        store.append({'Item_ID': item_id, 'Brand': brand, 'Category': 'Tops', 'Status': 'Listed'})
+    return store
+
+
+def test_photos_delta_has_only_the_changes(server, project):
+    response = server.request('GET', '/api/photos?limit=10')
+    revision = int(response.getheader('X-Revision'))
+
+    staging = project / "photos" / "staging"
+    Image.new('RGB', (8, 8)).save(staging / "IMG_0003.jpg")
+    (staging / "IMG_0001.jpg").unlink()
+
+    status, delta = server.json('GET', f'/api/photos?since={revision}')
+    assert status == 200
+    assert delta['full'] is False
+    assert [photo['name'] for photo in delta['photos']] == ['IMG_0003.jpg']
+    assert delta['deleted'] == ['IMG_0001.jpg']
+    assert delta['revision'] > revision
+
+    _, unchanged = server.json('GET', f"/api/photos?since={delta['revision']}")
+    assert (unchanged['photos'], unchanged['deleted']) == ([], [])
+
+
+def test_photos_since_an_unknown_revision_is_the_full_list(server):
+    status, body = server.json('GET', '/api/photos?since=1')
+    assert status == 200
+    assert body['full'] is True
+    assert [photo['name'] for photo in body['photos']] == ['IMG_0001.jpg', 'IMG_0002.jpg']
+    assert body['deleted'] == []
+
+
+def test_items_delta_applies_the_filters(server, inventory):
+    _, page = server.json('GET', '/api/completed-items?brand=zara&limit=10')
+    revision = page['revision']
+
+    inventory.update('DP004', {'Title': 'Striped tee'})
+    inventory.update('DP005', {'Brand': 'Nike'})
+    inventory.delete('DP006')
+    inventory.append({'Item_ID': 'DP007', 'Brand': 'Zara', 'Category': 'Tops', 'Status': 'Listed'})
+
+    status, delta = server.json('GET', f'/api/completed-items?brand=zara&since={revision}')
+    assert status == 200
+    assert delta['full'] is False
+    assert sorted(item['id'] for item in delta['items']) == ['DP004', 'DP007']
+    # Deleted, or no longer matching the filter
+    assert sorted(delta['deleted']) == ['DP005', 'DP006']
+    assert delta['inventoryTotal'] == 3
+
+
+def test_items_since_an_unknown_revision_is_the_full_page(server, inventory):
+    status, body = server.json('GET', '/api/completed-items?brand=zara&since=1')
+    assert status == 200
+    assert body['full'] is True
+    assert [item['id'] for item in body['items']] == ['DP004', 'DP005']
+    assert body['deleted'] == []
+
+
+@pytest.mark.parametrize('path', ['/api/photos', '/api/completed-items?limit=10'])
+def test_unchanged_list_is_not_modified(server, inventory, project, path):
+    first = server.request('GET', path)
+    etag = first.getheader('ETag')
+
+    again = server.request('GET', path, headers={'If-None-Match': etag})
+    assert again.status == 304
+    assert again.body == b''
+
+    inventory.update('DP004', {'Title': 'Striped tee'})
+    Image.new('RGB', (8, 8)).save(project / "photos" / "staging" / "IMG_0003.jpg")
+    changed = server.request('GET', path, headers={'If-None-Match': etag})
+    assert changed.status == 200
+    assert changed.getheader('ETag') != etag
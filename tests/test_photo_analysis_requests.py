@@ -0,0 +1,62 @@
+"""/api/duplicates and /api/suggested-groups: bounded work per request, decoding in the decode pool"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import photo_server
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(photo_server, 'decode_pool', executor)
+    yield executor
+    executor.shutdown()
+
+
+def free_slots():
+    return photo_server.decode_slots._value
+
+
+def test_map_in_pool_keeps_order_and_returns_its_slots(pool):
+    before = free_slots()
+    results = list(photo_server.map_in_pool(str.upper, ['a', 'b', 'c', 'd', 'e']))
+    assert results == ['A', 'B', 'C', 'D', 'E']
+    assert free_slots() == before
+
+
+def test_map_in_pool_returns_slots_when_abandoned(pool):
+    before = free_slots()
+    results = photo_server.map_in_pool(str.upper, ['a'] * 20)
+    assert next(results) == 'A'
+    results.close()
+    pool.shutdown(wait=True)
+    assert free_slots() == before
+
+
+def test_new_photos_are_hashed_a_share_per_request(server, pool, monkeypatch):
+    monkeypatch.setattr(photo_server, 'ANALYSIS_PHOTOS_PER_REQUEST', 1)
+
+    status, first = server.json('GET', '/api/duplicates')
+    assert status == 200
+    assert first['pending'] == 1 and first['newlyHashed'] == 1
+
+    _, second = server.json('GET', '/api/duplicates')
+    assert second['pending'] == 0 and second['newlyHashed'] == 1
+
+    # Everything is cached by path + mtime now
+    _, third = server.json('GET', '/api/duplicates')
+    assert third['pending'] == 0
+    assert third['newlyHashed'] == 0 and third['photosIndexed'] == 2
+
+
+def test_suggested_groups_leave_out_photos_not_analysed_yet(server, pool, monkeypatch):
+    monkeypatch.setattr(photo_server, 'ANALYSIS_PHOTOS_PER_REQUEST', 1)
+
+    status, first = server.json('GET', '/api/suggested-groups')
+    assert status == 200
+    assert first['pending'] == 1 and first['photoCount'] == 1
+
+    _, second = server.json('GET', '/api/suggested-groups')
+    assert second['pending'] == 0 and second['photoCount'] == 2
@@ -0,0 +1,87 @@
+"""photo_analyzer.py --batch: manifest skip values and odd AI confidences"""
+
+import json
+
+import pytest
+
+from photo_analyzer import PhotoAnalyzer, manifest_skips, parse_confidence
+from vision_backends import ConcurrentAnalyzer, VisionBackend
+
+
+class FakeBackend(VisionBackend):
+    name = 'fake'
+    needs_images = False
+
+    def __init__(self, analysis):
+        super().__init__()
+        self.analysis = analysis
+
+    def complete(self, images, prompt, timeout):
+        return json.dumps(self.analysis)
+
+
+def analyzer_for(project, analysis):
+    return PhotoAnalyzer(project, vision=ConcurrentAnalyzer(FakeBackend(analysis), requests_per_minute=10 ** 6))
+
+
+@pytest.mark.parametrize('value, skipped', [('yes', True), ('1', True), ('TRUE', True),
+                                            ('no', False), ('0', False), ('', False)])
+def test_manifest_skips(value, skipped):
+    assert manifest_skips({'skip': value}) is skipped
+
+
+@pytest.mark.parametrize('value, expected', [('0.9', 0.9), (0.5, 0.5), ('high', 0.0), (None, 0.0), ([1], 0.0)])
+def test_parse_confidence(value, expected):
+    assert parse_confidence(value) == expected
+
+
+def test_skip_no_still_gets_an_ai_analysis(project):
+    analyzer = analyzer_for(project, {'category': 'tops', 'item_type': 'shirt', 'brand': 'Zara',
+                                      'color': 'Red', 'size': 'M', 'condition': 'Good', 'confidence': 0.9})
+    manifest = {'IMG_0001.jpg': {'filename': 'IMG_0001.jpg', 'skip': 'no', 'brand': 'COS'},
+                'IMG_0002.jpg': {'filename': 'IMG_0002.jpg', 'skip': 'yes'}}
+    report = analyzer.process_staging_photos_batch(manifest, report_path=project / "report.json")
+
+    by_name = {item['filename']: item for item in report['items']}
+    assert by_name['IMG_0001.jpg']['status'] == 'added'
+    assert by_name['IMG_0001.jpg']['brand'] == 'COS'
+    assert by_name['IMG_0001.jpg']['category'] == 'tops'
+    assert by_name['IMG_0002.jpg']['status'] == 'skipped'
+
+
+def test_non_numeric_confidence_needs_review_instead_of_crashing(project):
+    analyzer = analyzer_for(project, {'category': 'tops', 'confidence': 'high'})
+    report = analyzer.process_staging_photos_batch(min_confidence=0.5, report_path=project / "report.json")
+    assert [item['status'] for item in report['items']] == ['needs_review', 'needs_review']
+
+
+CONFIDENT = {'category': 'tops', 'item_type': 'shirt', 'brand': 'Zara', 'color': 'Red', 'size': 'M',
+             'condition': 'Good', 'confidence': 0.9}
+
+
+def test_failed_inventory_write_moves_photos_back(project, monkeypatch):
+    analyzer = analyzer_for(project, CONFIDENT)
+
+    def locked(rows):
+        raise TimeoutError('inventory is locked')
+
+    monkeypatch.setattr(analyzer.inventory, 'append_many', locked)
+    report_path = project / "report.json"
+    report = analyzer.process_staging_photos_batch(min_confidence=0.5, report_path=report_path)
+
+    assert report['added'] == 0 and report['errors'] == 2
+    assert all('inventory is locked' in item['reason'] for item in report['items'])
+    assert sorted(path.name for path in analyzer.staging_image_files()) == ['IMG_0001.jpg', 'IMG_0002.jpg']
+    assert not list((project / "photos" / "by_category").rglob('*.jpg'))
+    assert report_path.exists()
+
+
+def test_item_ids_come_from_the_store_at_write_time(project):
+    analyzer = analyzer_for(project, CONFIDENT)
+    # The organizer saves an item after the analyzer has started
+    other = PhotoAnalyzer(project, vision=analyzer.vision)
+    other.inventory.append(other.build_inventory_row(
+        {**CONFIDENT, 'category': 'tops'}, 'elsewhere.jpg', 'DP010'))
+
+    report = analyzer.process_staging_photos_batch(min_confidence=0.5, report_path=project / "report.json")
+    assert [item['itemId'] for item in report['items']] == ['DP011', 'DP012']
@@ -0,0 +1,74 @@
+"""photo_analyzer.py prompted mode: stopping early cancels the analyses queued ahead"""
+
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+import photo_analyzer
+from photo_analyzer import PhotoAnalyzer
+from vision_backends import DEFAULT_ANALYSIS, ConcurrentAnalyzer, VisionBackend
+
+
+class SlowBackend(VisionBackend):
+    name = 'slow'
+    needs_images = False
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def complete(self, images, prompt, timeout):
+        raise AssertionError('analyze is overridden')
+
+    def analyze(self, images, prompt=None, timeout=60):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.2)
+        return dict(DEFAULT_ANALYSIS, category='tops')
+
+
+@pytest.fixture
+def analyzer(project):
+    # A third photo, so one analysis is still queued behind the one running
+    Image.new('RGB', (64, 48), (40, 40, 200)).save(project / "photos" / "staging" / "IMG_0003.jpg")
+    backend = SlowBackend()
+    vision = ConcurrentAnalyzer(backend, max_workers=1, requests_per_minute=10 ** 6)
+    yield PhotoAnalyzer(project, vision=vision)
+    vision.shutdown()
+
+
+def answers(final):
+    """input() replacement: defaults for every detail, then final at the 'Process this item?' prompt"""
+    def fake_input(prompt=''):
+        if prompt.strip().startswith('Process this item?'):
+            if isinstance(final, type) and issubclass(final, BaseException):
+                raise final
+            return final
+        return ''
+    return fake_input
+
+
+@pytest.mark.parametrize('final', ['q', EOFError, KeyboardInterrupt])
+def test_stopping_cancels_queued_analyses(analyzer, monkeypatch, final):
+    monkeypatch.setattr('builtins.input', answers(final))
+    analyzer.process_staging_photos()
+    analyzer.vision.shutdown()
+
+    # The first photo, plus the one already running when the user stopped; not the third
+    assert analyzer.vision.backend.calls == 2
+    assert len(analyzer.staging_image_files()) == 3
+
+
+def test_main_shuts_the_vision_pools_down(project, monkeypatch):
+    shutdowns = []
+    monkeypatch.setattr(photo_analyzer.ConcurrentAnalyzer, 'shutdown',
+                        lambda self, wait=True: shutdowns.append(wait))
+    monkeypatch.setattr('builtins.input', answers('q'))
+    monkeypatch.setattr('sys.argv', ['photo_analyzer.py', '--project', str(project)])
+    monkeypatch.setenv('DEPOP_VISION_BACKEND', 'template')
+
+    photo_analyzer.main()
+    assert shutdowns == [False]
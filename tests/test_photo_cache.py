@@ -0,0 +1,109 @@
+"""DerivativeCache: hits and misses, invalidation when the source changes, LRU eviction"""
+
+import os
+import threading
+
+import pytest
+from PIL import Image
+
+from photo_cache import DerivativeCache, render_jpeg_preview
+
+
+@pytest.fixture
+def photo(tmp_path):
+    path = tmp_path / "IMG_0001.jpg"
+    Image.new('RGB', (400, 300), (200, 40, 40)).save(path, quality=90)
+    return path
+
+
+def counting(render):
+    calls = []
+
+    def wrapped(source_path, **params):
+        calls.append(params)
+        return render(source_path, **params)
+
+    return wrapped, calls
+
+
+def test_second_request_is_a_hit(tmp_path, photo):
+    cache = DerivativeCache(tmp_path / "cache")
+    render, calls = counting(render_jpeg_preview)
+
+    first = cache.get_or_render(photo, render, max_size=100, quality=70)
+    second = cache.get_or_render(photo, render, max_size=100, quality=70)
+
+    assert first == second and first.exists()
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+    with Image.open(first) as img:
+        assert max(img.size) <= 100
+
+
+def test_render_params_are_part_of_the_key(tmp_path, photo):
+    cache = DerivativeCache(tmp_path / "cache")
+    render, calls = counting(render_jpeg_preview)
+
+    small = cache.get_or_render(photo, render, max_size=100, quality=70)
+    large = cache.get_or_render(photo, render, max_size=200, quality=70)
+    assert small != large
+    assert len(calls) == 2
+
+
+def test_changed_source_misses_the_old_entry(tmp_path, photo):
+    cache = DerivativeCache(tmp_path / "cache")
+    render, calls = counting(render_jpeg_preview)
+    old_key = cache.key_for(photo, max_size=100)
+    cache.get_or_render(photo, render, max_size=100)
+
+    stat = photo.stat()
+    os.utime(photo, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert cache.key_for(photo, max_size=100) != old_key
+
+    cache.get_or_render(photo, render, max_size=100)
+    assert len(calls) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = DerivativeCache(tmp_path / "cache", max_bytes=250)
+    cache.put('a' * 40, b'x' * 100)
+    cache.put('b' * 40, b'x' * 100)
+    assert cache.get('a' * 40) is not None  # 'a' is now the most recently used
+
+    cache.put('c' * 40, b'x' * 100)
+
+    assert cache.get('b' * 40) is None
+    assert cache.get('a' * 40) is not None
+    assert cache.get('c' * 40) is not None
+    assert cache.stats()['bytes'] == 200
+    assert not cache.path_for('b' * 40).exists()
+
+
+def test_lru_order_survives_a_restart(tmp_path):
+    cache = DerivativeCache(tmp_path / "cache", max_bytes=250)
+    for key in ('a' * 40, 'b' * 40):
+        cache.put(key, b'x' * 100)
+    os.utime(cache.path_for('a' * 40), (1, 1))  # 'a' was used longest ago
+
+    reopened = DerivativeCache(tmp_path / "cache", max_bytes=250)
+    assert reopened.stats()['entries'] == 2
+    reopened.put('c' * 40, b'x' * 100)
+    assert reopened.get('a' * 40) is None
+    assert reopened.get('b' * 40) is not None
+
+
+def test_concurrent_misses_render_once(tmp_path, photo):
+    cache = DerivativeCache(tmp_path / "cache")
+    started = threading.Barrier(4)
+    render, calls = counting(render_jpeg_preview)
+
+    def request():
+        started.wait()
+        cache.get_or_render(photo, render, max_size=100)
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
@@ -0,0 +1,81 @@
+"""Photo endpoints: Range requests and conditional GETs"""
+
+from email.utils import formatdate
+
+import pytest
+
+PHOTO_URL = '/api/photo/IMG_0001.jpg'
+
+
+@pytest.fixture
+def original(server, project):
+    return (project / "photos" / "staging" / "IMG_0001.jpg").read_bytes()
+
+
+def test_range_returns_partial_content(server, original):
+    response = server.request('GET', PHOTO_URL, headers={'Range': 'bytes=10-19'})
+    assert response.status == 206
+    assert response.getheader('Content-Range') == f'bytes 10-19/{len(original)}'
+    assert response.body == original[10:20]
+
+
+def test_suffix_and_open_ended_ranges(server, original):
+    tail = server.request('GET', PHOTO_URL, headers={'Range': 'bytes=-5'})
+    assert tail.status == 206
+    assert tail.body == original[-5:]
+
+    rest = server.request('GET', PHOTO_URL, headers={'Range': f'bytes={len(original) - 3}-'})
+    assert rest.status == 206
+    assert rest.body == original[-3:]
+
+
+@pytest.mark.parametrize('spec', ['bytes=999999999-', 'bytes=20-10', 'bytes=-0'])
+def test_unsatisfiable_range(server, original, spec):
+    response = server.request('GET', PHOTO_URL, headers={'Range': spec})
+    assert response.status == 416
+    assert response.getheader('Content-Range') == f'bytes */{len(original)}'
+
+
+def test_stale_if_range_sends_whole_file(server, original):
+    response = server.request('GET', PHOTO_URL, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+    assert response.status == 200
+    assert response.body == original
+
+
+def test_if_none_match_returns_304(server):
+    etag = server.request('GET', PHOTO_URL).getheader('ETag')
+    assert etag
+
+    cached = server.request('GET', PHOTO_URL, headers={'If-None-Match': etag})
+    assert cached.status == 304
+    assert cached.body == b''
+    assert cached.getheader('ETag') == etag
+
+    # A list of tags, one of them ours, is still a match
+    listed = server.request('GET', PHOTO_URL, headers={'If-None-Match': f'"other", {etag}'})
+    assert listed.status == 304
+
+    changed = server.request('GET', PHOTO_URL, headers={'If-None-Match': '"other"'})
+    assert changed.status == 200
+
+
+def test_if_modified_since_returns_304(server, project):
+    photo = project / "photos" / "staging" / "IMG_0001.jpg"
+    mtime = photo.stat().st_mtime
+
+    cached = server.request('GET', PHOTO_URL, headers={'If-Modified-Since': formatdate(mtime, usegmt=True)})
+    assert cached.status == 304
+
+    older = server.request('GET', PHOTO_URL, headers={'If-Modified-Since': formatdate(mtime - 60, usegmt=True)})
+    assert older.status == 200
+
+
+def test_etag_changes_with_rendition(server):
+    original = server.request('GET', PHOTO_URL).getheader('ETag')
+    resized = server.request('GET', PHOTO_URL + '?w=200')
+    assert resized.status == 200
+    assert resized.getheader('ETag') != original
+
+    # The original's tag doesn't validate the resized copy
+    response = server.request('GET', PHOTO_URL + '?w=200', headers={'If-None-Match': original})
+    assert response.status == 200
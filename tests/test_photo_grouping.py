@@ -0,0 +1,83 @@
+"""Suggested groups: splits on capture-time gaps and colours, bursts joined by hash"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from photo_grouping import PhotoGrouper
+
+RED, BLUE = (1.0, 0.1, 0.1), (0.1, 0.1, 1.0)
+
+
+def shoot(staging, name, when, seed, tint, shuffle=False):
+    """Blocky random photo tinted one colour, with its capture time in EXIF"""
+    blocks = np.random.default_rng(seed).integers(0, 256, (12, 16, 3)).astype(np.float64)
+    if shuffle:
+        # Same colours, different picture
+        flat = blocks.reshape(-1, 3)
+        blocks = flat[np.random.default_rng(seed + 100).permutation(len(flat))].reshape(12, 16, 3)
+    pixels = (blocks * np.array(tint)).astype(np.uint8)
+    exif = Image.Exif()
+    exif[306] = f'2024:03:01 {when}'
+    Image.fromarray(pixels).resize((160, 120), Image.Resampling.NEAREST).save(staging / name, quality=90, exif=exif)
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "photos" / "staging").mkdir(parents=True)
+    return tmp_path
+
+
+def names(groups):
+    return [[photo['name'] for photo in group['photos']] for group in groups]
+
+
+def test_groups_follow_time_gaps_colours_and_bursts(project):
+    staging = project / "photos" / "staging"
+    shoot(staging, 'IMG_0001.jpg', '10:00:00', 1, RED)
+    shoot(staging, 'IMG_0002.jpg', '10:00:10', 2, BLUE)                # label close-up: quick gap
+    shoot(staging, 'IMG_0003.jpg', '10:30:00', 3, BLUE)                # long gap: new item
+    shoot(staging, 'IMG_0004.jpg', '10:45:00', 3, BLUE, shuffle=True)  # same colours, much later
+    shoot(staging, 'IMG_0005.jpg', '10:46:00', 5, RED)                 # different colours
+    shoot(staging, 'IMG_0006.jpg', '12:00:00', 5, RED)                 # same frame again: burst
+
+    groups, pending = PhotoGrouper(project).suggest()
+
+    assert pending == 0
+    assert names(groups) == [
+        ['IMG_0001.jpg', 'IMG_0002.jpg'],
+        ['IMG_0003.jpg'],
+        ['IMG_0004.jpg'],
+        ['IMG_0005.jpg', 'IMG_0006.jpg'],
+    ]
+    assert groups[0]['reasons'] == ['time'] and groups[0]['confidence'] == 0.9
+    assert groups[0]['startTime'] == '2024-03-01 10:00:00'
+    assert groups[3]['reasons'] == ['burst'] and groups[3]['confidence'] == 1.0
+
+
+def test_similar_colours_within_the_gap_stay_together(project):
+    staging = project / "photos" / "staging"
+    shoot(staging, 'IMG_0001.jpg', '10:00:00', 1, BLUE)
+    shoot(staging, 'IMG_0002.jpg', '10:01:00', 1, BLUE, shuffle=True)
+    shoot(staging, 'IMG_0003.jpg', '10:02:00', 2, RED)
+
+    groups, _ = PhotoGrouper(project).suggest()
+
+    assert names(groups) == [['IMG_0001.jpg', 'IMG_0002.jpg'], ['IMG_0003.jpg']]
+    assert set(groups[0]['reasons']) <= {'colour', 'time+colour'}
+    assert groups[0]['confidence'] >= 0.55
+
+
+def test_limit_leaves_photos_pending(project):
+    staging = project / "photos" / "staging"
+    for number in range(5):
+        shoot(staging, f'IMG_000{number}.jpg', f'10:0{number}:00', number, RED)
+    grouper = PhotoGrouper(project)
+
+    groups, pending = grouper.suggest(limit=2)
+    assert pending == 3
+    assert sum(len(group['photos']) for group in groups) == 2
+
+    while pending:
+        groups, pending = grouper.suggest(limit=2)
+    assert sum(len(group['photos']) for group in groups) == 5
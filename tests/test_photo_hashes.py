@@ -0,0 +1,98 @@
+"""Perceptual hashes: distances on synthetic photos, incremental scans and duplicate clusters"""
+
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance
+
+from photo_hashes import PhotoHashIndex, hamming, hash_batch, load_hash_pixels
+
+
+def noise_photo(path, seed, size=(160, 120)):
+    """Blocky random pattern: plenty of structure for the hashes to pick up"""
+    blocks = np.random.default_rng(seed).integers(0, 256, (12, 16, 3), dtype=np.uint8)
+    Image.fromarray(blocks).resize(size, Image.Resampling.NEAREST).save(path, quality=90)
+    return path
+
+
+def near_copy(source, path):
+    """Same scene, re-encoded smaller and a little brighter"""
+    with Image.open(source) as img:
+        copy = ImageEnhance.Brightness(img.resize((120, 90))).enhance(1.1)
+        copy.save(path, quality=60)
+    return path
+
+
+def distance(*paths):
+    dhashes, phashes = hash_batch([load_hash_pixels(path) for path in paths])
+    return int(max(hamming(dhashes[:1], dhashes[1:])[0], hamming(phashes[:1], phashes[1:])[0]))
+
+
+@pytest.fixture
+def photos(tmp_path):
+    root = tmp_path / "photos"
+    (root / "staging").mkdir(parents=True)
+    (root / "by_category" / "tops").mkdir(parents=True)
+    return root
+
+
+def test_hamming_counts_differing_bits():
+    a = np.array([0, 0b1011, 2**64 - 1], dtype=np.uint64)
+    b = np.array([0, 0b0001, 0], dtype=np.uint64)
+    assert hamming(a, b).tolist() == [0, 2, 64]
+
+
+def test_near_copies_are_close_and_different_photos_far(tmp_path):
+    original = noise_photo(tmp_path / "a.jpg", seed=1)
+    copy = near_copy(original, tmp_path / "a_copy.jpg")
+    other = noise_photo(tmp_path / "b.jpg", seed=2)
+
+    assert distance(original, original) == 0
+    assert distance(original, copy) <= 10
+    assert distance(original, other) > 20
+
+
+def test_scan_only_hashes_new_photos(photos, tmp_path):
+    noise_photo(photos / "staging" / "IMG_0001.jpg", seed=1)
+    noise_photo(photos / "staging" / "IMG_0002.jpg", seed=2)
+    index = PhotoHashIndex(photos, tmp_path / "hashes.json")
+    assert index.scan() == (2, 0)
+    assert index.scan() == (0, 0)
+
+    noise_photo(photos / "staging" / "IMG_0003.jpg", seed=3)
+    (photos / "staging" / "IMG_0001.jpg").unlink()
+    assert index.scan() == (1, 0)
+    assert index.count() == 2
+
+    # The cache file carries the hashes over to a fresh index
+    assert PhotoHashIndex(photos, tmp_path / "hashes.json").scan() == (0, 0)
+
+
+def test_scan_limit_leaves_the_rest_pending(photos, tmp_path):
+    for number in range(5):
+        noise_photo(photos / "staging" / f"IMG_000{number}.jpg", seed=number)
+    index = PhotoHashIndex(photos, tmp_path / "hashes.json")
+
+    assert index.scan(limit=2) == (2, 3)
+    assert index.scan(limit=2) == (2, 1)
+    assert index.scan(limit=2) == (1, 0)
+
+
+def test_clusters_group_bursts_and_reimports(photos, tmp_path):
+    noise_photo(photos / "staging" / "IMG_0001.jpg", seed=1)
+    near_copy(photos / "staging" / "IMG_0001.jpg", photos / "staging" / "IMG_0002.jpg")
+    noise_photo(photos / "staging" / "IMG_0003.jpg", seed=3)
+    near_copy(photos / "staging" / "IMG_0003.jpg", photos / "by_category" / "tops" / "IMG_0003_1.jpg")
+    noise_photo(photos / "staging" / "IMG_0004.jpg", seed=4)
+    index = PhotoHashIndex(photos, tmp_path / "hashes.json")
+    index.scan()
+
+    clusters = index.clusters()
+    assert [(cluster['kind'], [photo['path'] for photo in cluster['photos']]) for cluster in clusters] == [
+        ('reimport', ['by_category/tops/IMG_0003_1.jpg', 'staging/IMG_0003.jpg']),
+        ('burst', ['staging/IMG_0001.jpg', 'staging/IMG_0002.jpg']),
+    ]
+    assert clusters[0]['photos'][0]['url'] == '/api/category-photo/tops/IMG_0003_1.jpg'
+
+    nearest = index.nearest(*index.hashes_for('staging/IMG_0001.jpg'))
+    assert [key for key, _ in nearest] == ['staging/IMG_0001.jpg', 'staging/IMG_0002.jpg']
+    assert nearest[0][1] == 0
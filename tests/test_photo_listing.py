@@ -0,0 +1,55 @@
+"""/api/photos: cursor pagination over the staging folder"""
+
+from PIL import Image
+
+
+def add_photos(project, *names):
+    for name in names:
+        Image.new('RGB', (8, 8), (40, 40, 200)).save(project / "photos" / "staging" / name)
+
+
+def pages(server, query):
+    names, cursor = [], None
+    while True:
+        path = f'/api/photos?{query}' + (f'&cursor={cursor}' if cursor else '')
+        status, page = server.json('GET', path)
+        assert status == 200
+        names.append([photo['name'] for photo in page['photos']])
+        cursor = page['nextCursor']
+        if cursor is None:
+            return names, page['total']
+
+
+def test_pages_cover_every_photo_once(server, project):
+    add_photos(project, 'IMG_0003.jpg', 'IMG_0004.jpg', 'IMG_0005.jpg')
+
+    names, total = pages(server, 'limit=2')
+    assert names == [['IMG_0001.jpg', 'IMG_0002.jpg'], ['IMG_0003.jpg', 'IMG_0004.jpg'], ['IMG_0005.jpg']]
+    assert total == 5
+
+    names, _ = pages(server, 'limit=2&order=desc')
+    assert names == [['IMG_0005.jpg', 'IMG_0004.jpg'], ['IMG_0003.jpg', 'IMG_0002.jpg'], ['IMG_0001.jpg']]
+
+
+def test_without_paging_params_the_plain_list_is_sent(server):
+    status, photos = server.json('GET', '/api/photos')
+    assert status == 200
+    assert [photo['name'] for photo in photos] == ['IMG_0001.jpg', 'IMG_0002.jpg']
+
+
+def test_photos_added_before_the_cursor_dont_shift_the_next_page(server, project):
+    add_photos(project, 'IMG_0005.jpg', 'IMG_0006.jpg')
+    _, first = server.json('GET', '/api/photos?limit=2')
+    assert [photo['name'] for photo in first['photos']] == ['IMG_0001.jpg', 'IMG_0002.jpg']
+
+    add_photos(project, 'IMG_0000.jpg')
+    _, second = server.json('GET', f"/api/photos?limit=2&cursor={first['nextCursor']}")
+    assert [photo['name'] for photo in second['photos']] == ['IMG_0005.jpg', 'IMG_0006.jpg']
+    assert second['total'] == 5
+    assert second['nextCursor'] is None
+
+
+def test_invalid_cursor_is_rejected(server):
+    status, body = server.json('GET', '/api/photos?limit=2&cursor=not-a-cursor')
+    assert status == 400
+    assert 'Invalid cursor' in body['error']
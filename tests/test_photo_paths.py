@@ -0,0 +1,32 @@
+"""Photo endpoints only serve files inside their own folders"""
+
+import pytest
+
+from photo_server import safe_join
+
+
+@pytest.mark.parametrize('name', ['..', '../etc', 'a/b.jpg', 'a\\b.jpg', '', 'x\0.jpg'])
+def test_safe_join_rejects_names_that_leave_the_folder(tmp_path, name):
+    assert safe_join(tmp_path, name) is None
+
+
+def test_safe_join_accepts_plain_names(tmp_path):
+    assert safe_join(tmp_path, 'tops', 'IMG 1.jpg') == tmp_path / 'tops' / 'IMG 1.jpg'
+
+
+def test_staging_photo_is_served(server):
+    response = server.request('GET', '/api/photo/IMG_0001.jpg')
+    assert response.status == 200
+    assert response.body[:2] == b'\xff\xd8'
+
+
+@pytest.mark.parametrize('path', [
+    '/api/photo/..%2F..%2F..%2F..%2F..%2F..%2Fetc%2Fpasswd',
+    '/api/photo/..%5C..%5Cdata%5Cinventory_tracker.csv',
+    '/api/category-photo/..%2F..%2F..%2F..%2F..%2F..%2Fetc/passwd',
+    '/api/category-photo/tops/..%2F..%2F..%2F..%2F..%2F..%2Fetc%2Fpasswd',
+])
+def test_encoded_traversal_is_rejected(server, path):
+    response = server.request('GET', path)
+    assert response.status == 404
+    assert b'root:' not in response.body
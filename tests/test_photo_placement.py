@@ -0,0 +1,70 @@
+"""Photo placement: fallbacks between strategies and never overwriting"""
+
+import errno
+
+import pytest
+
+import photo_placement
+from photo_placement import PLACEMENT_STRATEGIES, place_file
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "IMG_0001.jpg"
+    path.write_bytes(b'photo bytes')
+    return path
+
+
+def failing(code):
+    def placer(source, destination):
+        raise OSError(code, 'simulated', str(destination))
+    return placer
+
+
+@pytest.mark.parametrize('strategy', PLACEMENT_STRATEGIES)
+def test_existing_destination_is_never_overwritten(source, tmp_path, strategy):
+    destination = tmp_path / "placed.jpg"
+    destination.write_bytes(b'already here')
+
+    with pytest.raises(FileExistsError):
+        place_file(source, destination, strategy)
+    assert destination.read_bytes() == b'already here'
+
+
+def test_copy_places_bytes_and_timestamps(source, tmp_path):
+    destination = tmp_path / "placed.jpg"
+    assert place_file(source, destination, 'copy') == 'copy'
+    assert destination.read_bytes() == b'photo bytes'
+    assert destination.stat().st_mtime == source.stat().st_mtime
+
+
+def test_unsupported_strategy_falls_through(source, tmp_path, monkeypatch):
+    monkeypatch.setitem(photo_placement._PLACERS, 'reflink', failing(errno.EOPNOTSUPP))
+    monkeypatch.setitem(photo_placement._PLACERS, 'hardlink', failing(errno.EXDEV))
+    destination = tmp_path / "placed.jpg"
+
+    assert place_file(source, destination, 'reflink') == 'copy'
+    assert destination.read_bytes() == b'photo bytes'
+
+
+@pytest.mark.parametrize('code', [errno.ENOSPC, errno.EACCES, errno.EIO])
+def test_real_errors_are_raised_not_retried(source, tmp_path, monkeypatch, code):
+    copies = []
+    monkeypatch.setitem(photo_placement._PLACERS, 'reflink', failing(code))
+    monkeypatch.setitem(photo_placement._PLACERS, 'copy', lambda *paths: copies.append(paths))
+
+    with pytest.raises(OSError) as raised:
+        place_file(source, tmp_path / "placed.jpg", 'reflink')
+    assert raised.value.errno == code
+    assert copies == []
+
+
+def test_unknown_strategy(source, tmp_path):
+    with pytest.raises(ValueError):
+        place_file(source, tmp_path / "placed.jpg", 'teleport')
+
+
+def test_hardlinks_are_opt_in():
+    assert 'hardlink' not in photo_placement.strategy_chain('auto')
+    assert 'hardlink' not in photo_placement.strategy_chain(None)
+    assert photo_placement.strategy_chain('hardlink') == ('hardlink', 'copy')
@@ -0,0 +1,19 @@
+"""Request metrics survive requests the server can't parse"""
+
+import socket
+
+from photo_server import REGISTRY
+
+
+def test_malformed_request_line_is_counted_as_bad_request(server):
+    host, port = server.connection.host, server.connection.port
+    for request_line in (b'\r\n', b'NONSENSE\r\n\r\n'):
+        with socket.create_connection((host, port), timeout=5) as connection:
+            connection.sendall(request_line)
+            connection.shutdown(socket.SHUT_WR)
+            while connection.recv(4096):
+                pass
+
+    response = server.request('GET', '/api/metrics')
+    assert response.status == 200
+    assert 'route="bad_request"' in REGISTRY.render()
@@ -0,0 +1,85 @@
+"""Request tracing: Server-Timing on asked-for traces and the slow-request log threshold"""
+
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+import photo_server
+from request_tracing import TRACE_HEADER, RequestTracer, span
+
+
+def logged(tracer):
+    if not tracer.slow_log_path.exists():
+        return []
+    return [json.loads(line) for line in tracer.slow_log_path.read_text(encoding='utf-8').splitlines()]
+
+
+def wait_for_log(tracer):
+    """The server finishes a trace just after sending the response"""
+    deadline = time.monotonic() + 10
+    while not logged(tracer) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return logged(tracer)
+
+
+def traced_request(tracer, seconds, headers=None):
+    trace = tracer.start('GET', '/api/photos', '/api/photos', headers or {})
+    with span('json'):
+        time.sleep(seconds)
+    tracer.finish(trace, 200, 123)
+    return trace
+
+
+def test_requests_over_the_threshold_are_logged_with_their_spans(tmp_path):
+    tracer = RequestTracer(tmp_path / "logs", slow_ms=50, profile_sample=0, header_enabled=False)
+    traced_request(tracer, 0.0)
+    assert logged(tracer) == []
+
+    traced_request(tracer, 0.06)
+    [record] = logged(tracer)
+    assert record['reason'] == 'slow'
+    assert (record['method'], record['route'], record['status'], record['bytes']) == ('GET', '/api/photos', 200, 123)
+    assert record['ms'] >= 50
+    assert record['spans']['json']['ms'] >= 50 and record['spans']['json']['count'] == 1
+
+
+def test_trace_header_is_ignored_unless_enabled(tmp_path):
+    tracer = RequestTracer(tmp_path / "logs", slow_ms=0, profile_sample=0, header_enabled=False)
+    assert not tracer.enabled
+
+    tracer = RequestTracer(tmp_path / "logs", slow_ms=10_000, profile_sample=0, header_enabled=False)
+    assert not traced_request(tracer, 0.0, {TRACE_HEADER: '1'}).requested
+    assert logged(tracer) == []
+
+
+@pytest.fixture
+def tracer(tmp_path, monkeypatch):
+    tracer = RequestTracer(tmp_path / "logs", slow_ms=0, profile_sample=0, header_enabled=True)
+    monkeypatch.setattr(photo_server, 'request_tracer', tracer)
+    return tracer
+
+
+def test_traced_request_gets_a_server_timing_header(server, tracer):
+    plain = server.request('GET', '/api/photos')
+    assert plain.getheader('Server-Timing') is None
+
+    response = server.request('GET', '/api/photos', headers={TRACE_HEADER: '1'})
+    assert response.status == 200
+    timings = dict(part.split(';dur=') for part in response.getheader('Server-Timing').split(', '))
+    assert 'json' in timings
+    assert float(timings['total']) >= float(timings['json'])
+
+    [record] = wait_for_log(tracer)
+    assert record['reason'] == 'header'
+    assert record['path'] == '/api/photos'
+
+
+def test_profile_header_saves_a_profile(server, tracer):
+    response = server.request('GET', '/api/photos', headers={TRACE_HEADER: 'profile'})
+    assert response.status == 200
+
+    [record] = wait_for_log(tracer)
+    assert Path(record['profile']).exists()
+    assert Path(record['profile']).is_relative_to(tracer.profile_dir)
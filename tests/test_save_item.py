@@ -0,0 +1,88 @@
+"""/api/save-item: the row is written before the response, photos are placed in the background"""
+
+import errno
+import threading
+import time
+
+import photo_server
+
+
+def wait_for_job(server, job_id):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        _, job = server.json('GET', f'/api/jobs/{job_id}')
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} didn't finish")
+
+
+def listed(server):
+    _, items = server.json('GET', '/api/completed-items')
+    return {item['id']: item for item in items}
+
+
+def save(server):
+    status, body = server.json('POST', '/api/save-item', {
+        'photos': ['IMG_0001.jpg', 'IMG_0002.jpg'], 'category': 'Tops', 'title': 'Tee', 'brand': 'Zara'
+    })
+    assert status == 200 and body['success']
+    return body
+
+
+def test_item_is_listed_while_its_photos_are_placed(server, project, monkeypatch):
+    release = threading.Event()
+    place_photo = photo_server.place_photo
+
+    def slow_place_photo(source, destination):
+        release.wait(10)
+        return place_photo(source, destination)
+
+    monkeypatch.setattr(photo_server, 'place_photo', slow_place_photo)
+    body = save(server)
+    item_id = body['itemId']
+
+    assert listed(server)[item_id]['placing'] is True
+    export = server.request('GET', '/api/export-csv').body.decode('utf-8')
+    assert item_id in export
+    status, _ = server.json('DELETE', f'/api/delete-item/{item_id}')
+    assert status == 409
+
+    release.set()
+    assert wait_for_job(server, body['jobId'])['status'] == 'done'
+    item = listed(server)[item_id]
+    assert item['placing'] is False
+    assert [photo['name'] for photo in item['photos']] == ['IMG_0001.jpg', 'IMG_0002.jpg']
+    assert (project / "photos" / "by_category" / "tops" / "IMG_0002.jpg").exists()
+
+
+def test_failed_placement_removes_the_row_and_files(server, project, monkeypatch):
+    def full_disk(source, destination):
+        raise OSError(errno.ENOSPC, 'No space left on device')
+
+    monkeypatch.setattr(photo_server, 'place_photo', full_disk)
+    body = save(server)
+
+    job = wait_for_job(server, body['jobId'])
+    assert job['status'] == 'failed'
+    assert 'No space left' in job['error']
+    assert body['itemId'] not in listed(server)
+    assert not list((project / "photos" / "ready_for_depop").iterdir())
+    assert not photo_server.pending_item_ids and not photo_server.pending_placements
+
+
+def test_routes_ignore_the_query_string(server):
+    status, body = server.json('POST', '/api/save-item?source=test', {
+        'photos': ['IMG_0001.jpg'], 'category': 'Tops', 'title': 'Tee'
+    })
+    assert status == 200 and body['success']
+    wait_for_job(server, body['jobId'])
+
+    status, batch = server.json('POST', '/api/save-items?x=1', {'items': [
+        {'photos': ['IMG_0002.jpg'], 'category': 'Tops', 'title': 'Other'}
+    ]})
+    assert status == 200 and batch['saved'] == 1
+
+    status, deleted = server.json('DELETE', f"/api/delete-item/{body['itemId']}?confirm=1")
+    assert status == 200 and deleted['success']
+    assert body['itemId'] not in listed(server)
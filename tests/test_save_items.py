@@ -0,0 +1,103 @@
+"""/api/save-items: per-item validation and cleanup"""
+
+import photo_server
+
+
+def folders(project):
+    return sorted(path.name for path in (project / "photos" / "ready_for_depop").iterdir())
+
+
+def test_invalid_items_fail_alone_and_leave_no_folders(server, project):
+    status, body = server.json('POST', '/api/save-items', {'items': [
+        {'photos': ['IMG_0001.jpg'], 'category': 'Tops', 'title': 'A', 'brand': 'Zara'},
+        {'photos': ['IMG_0002.jpg'], 'title': 'no category'},
+        {'itemId': 'DP001', 'category': 'Tops'},
+        'not an item',
+        {'photos': 'IMG_0002.jpg', 'category': 'Tops'},
+    ]})
+
+    assert status == 200
+    assert [result['success'] for result in body['results']] == [True, False, False, False, False]
+    assert body['results'][1]['error'] == 'Missing category'
+    saved_id = body['results'][0]['itemId']
+    assert folders(project) == [f"Item_{saved_id}_Zara_A"]
+    assert photo_server.get_inventory_store(project / "data" / "inventory_tracker.csv").get(saved_id)
+
+
+def test_an_unexpected_placement_error_only_fails_its_item(server, project, monkeypatch):
+    place_photo = photo_server.place_photo
+
+    def flaky_place_photo(source, destination):
+        if source.name == 'IMG_0002.jpg':
+            raise ValueError('disk on fire')
+        return place_photo(source, destination)
+
+    monkeypatch.setattr(photo_server, 'place_photo', flaky_place_photo)
+    status, body = server.json('POST', '/api/save-items', {'items': [
+        {'photos': ['IMG_0001.jpg'], 'category': 'Tops', 'title': 'Good'},
+        {'photos': ['IMG_0002.jpg'], 'category': 'Dresses', 'title': 'Bad'},
+    ]})
+
+    assert status == 200
+    assert [result['success'] for result in body['results']] == [True, False]
+    assert 'disk on fire' in body['results'][1]['error']
+    assert len(folders(project)) == 1
+    assert not list((project / "photos" / "by_category").glob('dresses/*'))
+
+
+def test_items_after_a_failed_one_keep_consecutive_ids(server, project, monkeypatch):
+    place_photo = photo_server.place_photo
+
+    def flaky_place_photo(source, destination):
+        if source.name == 'IMG_0002.jpg':
+            raise ValueError('disk on fire')
+        return place_photo(source, destination)
+
+    monkeypatch.setattr(photo_server, 'place_photo', flaky_place_photo)
+    status, body = server.json('POST', '/api/save-items', {'items': [
+        {'photos': ['IMG_0002.jpg'], 'category': 'Dresses', 'title': 'Bad'},
+        {'photos': ['IMG_0001.jpg'], 'category': 'Tops', 'title': 'First'},
+        {'photos': ['IMG_0001.jpg'], 'category': 'Tops', 'title': 'Second'},
+    ]})
+
+    assert status == 200
+    assert body['saved'] == 2 and body['failed'] == 1
+    assert [result.get('itemId') for result in body['results']] == [None, 'DP004', 'DP005']
+    assert folders(project) == ['Item_DP004_First', 'Item_DP005_Second']
+    inventory = photo_server.get_inventory_store(project / "data" / "inventory_tracker.csv")
+    assert inventory.get('DP004')['Depop_Folder'] == 'Item_DP004_First'
+    assert inventory.get('DP006') is None
+    assert (project / "photos" / "ready_for_depop" / "Item_DP005_Second" / "IMG_0001_1.jpg").exists()
+    assert not photo_server.pending_item_ids and not photo_server.pending_placements
+
+
+def test_single_saves_are_not_blocked_while_a_batch_places_photos(server, project, monkeypatch):
+    import threading
+    from conftest import Client
+
+    placing = threading.Event()
+    release = threading.Event()
+    place_photo = photo_server.place_photo
+
+    def slow_place_photo(source, destination):
+        placing.set()
+        release.wait(10)
+        return place_photo(source, destination)
+
+    monkeypatch.setattr(photo_server, 'place_photo', slow_place_photo)
+    batch_client = Client(server.connection.port)
+    batch = []
+    thread = threading.Thread(target=lambda: batch.append(batch_client.json('POST', '/api/save-items', {'items': [
+        {'photos': ['IMG_0001.jpg'], 'category': 'Tops', 'title': 'Batch'},
+    ]})))
+    thread.start()
+    assert placing.wait(10)
+
+    # The batch has reserved DP004, so this save takes the next ID
+    monkeypatch.setattr(photo_server, 'place_photo', place_photo)
+    status, body = server.json('POST', '/api/save-item', {'photos': ['IMG_0002.jpg'], 'category': 'Dresses', 'title': 'Single'})
+    assert status == 200 and body['itemId'] == 'DP005'
+
+    release.set()
+    thread.join(10)
+    assert batch[0][1]['results'][0]['itemId'] == 'DP004'
@@ -0,0 +1,32 @@
+"""Organizer page assets: one ETag per content coding, Vary on every response"""
+
+import re
+
+
+def test_each_encoding_has_its_own_etag(server):
+    identity = server.request('GET', '/')
+    gzipped = server.request('GET', '/', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.getheader('Content-Encoding') == 'gzip'
+    assert identity.getheader('ETag') != gzipped.getheader('ETag')
+    assert identity.getheader('Vary') == gzipped.getheader('Vary') == 'Accept-Encoding'
+
+
+def test_etag_of_one_encoding_does_not_validate_another(server):
+    gzip_etag = server.request('GET', '/', headers={'Accept-Encoding': 'gzip'}).getheader('ETag')
+
+    fresh = server.request('GET', '/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag})
+    assert fresh.status == 304
+    assert fresh.getheader('Vary') == 'Accept-Encoding'
+    assert fresh.getheader('ETag') == gzip_etag
+
+    other = server.request('GET', '/', headers={'If-None-Match': gzip_etag})
+    assert other.status == 200
+    assert other.getheader('Content-Encoding') is None
+
+
+def test_page_links_fingerprinted_assets(server):
+    page = server.request('GET', '/').body.decode('utf-8')
+    for url in re.findall(r'/static/organizer\.[0-9a-f]{12}\.(?:css|js)', page):
+        response = server.request('GET', url)
+        assert response.status == 200
+        assert 'immutable' in response.getheader('Cache-Control')
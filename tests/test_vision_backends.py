@@ -0,0 +1,25 @@
+"""Vision backends: the base class contract and backend selection"""
+
+import pytest
+
+from vision_backends import DEFAULT_ANALYSIS, TemplateBackend, VisionBackend, backend_from_env
+
+
+def test_backend_without_complete_fails_when_constructed():
+    class Incomplete(VisionBackend):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_template_backend_returns_the_template():
+    backend = TemplateBackend()
+    assert backend.analyze([]) == DEFAULT_ANALYSIS
+    assert backend.analyze([]) is not DEFAULT_ANALYSIS
+
+
+def test_model_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv('DEPOP_VISION_BACKEND', 'local')
+    monkeypatch.setenv('DEPOP_VISION_MODEL', 'my-model')
+    assert backend_from_env().model == 'my-model'
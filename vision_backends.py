@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+AI vision backends for the photo analyzer
+A backend sends one or more images plus the analysis prompt to a model and
+returns the reply text. ConcurrentAnalyzer runs those calls on a bounded thread
+pool with a token-bucket rate limit, per-call timeouts and retries with
+exponential backoff, so a whole staging folder is analyzed in parallel.
+
+Pick a backend with environment variables:
+    DEPOP_VISION_BACKEND   template (default, no AI) | anthropic | openai | local
+    DEPOP_VISION_MODEL     model name for anthropic/openai
+    DEPOP_VISION_URL       endpoint for the local backend (see mock_vision_server.py)
+    DEPOP_VISION_WORKERS   concurrent requests (default 4)
+    DEPOP_VISION_RPM       requests per minute (default 50)
+Payload size settings are in image_payload.py.
+"""
+
+import abc
+import base64
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from image_payload import PAYLOAD_MEDIA_TYPE, render_payload
+
+# Bump when ANALYSIS_PROMPT or the parsing below changes meaningfully
+PROMPT_VERSION = 1
+
+ANALYSIS_PROMPT = """You are helping list second-hand clothing on Depop.
+Look at the photo(s) of a single item and reply with only a JSON object with these keys:
+  item_type (e.g. dress, top, jeans, blazer), category (one of tops, dresses, bottoms,
+  outerwear, shoes, accessories), brand (read tags/logos, "Unknown" if unsure), color,
+  size (from the size tag, "Unknown" if not visible), condition (Excellent, Very Good,
+  Good or Fair), material, style (e.g. casual, formal, vintage), unique_features (list
+  of short strings), suggested_price_range (GBP as "low-high", e.g. "15-35"),
+  confidence (0 to 1), image_quality (Good, Fair or Poor for a listing photo)."""
+
+# What the analyzer returns when a field is missing (and the whole result for the template backend)
+DEFAULT_ANALYSIS = {
+    "item_type": "Unknown",
+    "category": "Unknown",
+    "brand": "Unknown",
+    "color": "Unknown",
+    "size": "Unknown",
+    "condition": "Good",
+    "material": "Unknown",
+    "style": "Unknown",
+    "unique_features": [],
+    "suggested_price_range": "15-35",
+    "confidence": 0.7,
+    "image_quality": "Good",
+}
+
+DEFAULT_MODELS = {
+    'anthropic': 'claude-sonnet-4-5',
+    'openai': 'gpt-4o-mini',
+    'local': 'mock-vision',
+}
+DEFAULT_LOCAL_URL = 'http://localhost:8765/analyze'
+
+# HTTP statuses worth retrying (rate limited, overloaded, server errors)
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class VisionBackendError(Exception):
+    """A backend call failed; retryable errors are attempted again after a backoff"""
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def is_retryable(error):
+    """Timeouts, connection problems, rate limits and 5xx responses are worth retrying"""
+    if isinstance(error, VisionBackendError):
+        return error.retryable
+    if isinstance(error, (TimeoutError, socket.timeout, ConnectionError)):
+        return True
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUSES
+    if isinstance(error, urllib.error.URLError):
+        return True
+    # SDK exceptions such as APITimeoutError / APIConnectionError
+    return 'Timeout' in type(error).__name__ or 'Connection' in type(error).__name__
+
+
+def parse_analysis(text):
+    """Pull the JSON object out of a model reply and fill in any missing fields"""
+    match = re.search(r'\{.*\}', text or '', re.DOTALL)
+    if not match:
+        raise VisionBackendError(f"No JSON in model reply: {(text or '')[:200]}")
+    try:
+        parsed = json.loads(match.group(0))
+    except ValueError as e:
+        raise VisionBackendError(f"Invalid JSON in model reply: {e}")
+    analysis = dict(DEFAULT_ANALYSIS)
+    analysis.update({key: value for key, value in parsed.items() if value not in (None, '')})
+    return analysis
+
+
+class VisionBackend(abc.ABC):
+    """Base class: send images + prompt to a model and return its reply text"""
+
+    name = 'base'
+    needs_images = True
+
+    def __init__(self, model=None):
+        self.model = model or DEFAULT_MODELS.get(self.name, self.name)
+
+    @abc.abstractmethod
+    def complete(self, images, prompt, timeout):
+        """images is a list of (bytes, media type); returns the model's reply text"""
+
+    def analyze(self, images, prompt=ANALYSIS_PROMPT, timeout=60):
+        return parse_analysis(self.complete(images, prompt, timeout))
+
+
+class TemplateBackend(VisionBackend):
+    """No AI: returns the default template for you to fill in by hand"""
+
+    name = 'template'
+    needs_images = False
+
+    def complete(self, images, prompt, timeout):
+        return json.dumps(DEFAULT_ANALYSIS)
+
+    def analyze(self, images, prompt=ANALYSIS_PROMPT, timeout=60):
+        return dict(DEFAULT_ANALYSIS)
+
+
+class AnthropicBackend(VisionBackend):
+    """Claude vision via the anthropic package (ANTHROPIC_API_KEY)"""
+
+    name = 'anthropic'
+
+    def __init__(self, model=None, api_key=None):
+        super().__init__(model)
+        try:
+            import anthropic
+        except ImportError:
+            raise VisionBackendError("The anthropic backend needs: pip3 install anthropic")
+        # Retries are handled by ConcurrentAnalyzer so they share its rate limit
+        self.client = anthropic.Anthropic(api_key=api_key, max_retries=0)
+
+    def complete(self, images, prompt, timeout):
+        content = [
+            {
+                'type': 'image',
+                'source': {'type': 'base64', 'media_type': media_type, 'data': base64.b64encode(data).decode('ascii')}
+            }
+            for data, media_type in images
+        ]
+        content.append({'type': 'text', 'text': prompt})
+        response = self.client.messages.create(
+            model=self.model,
+            max_tokens=1024,
+            messages=[{'role': 'user', 'content': content}],
+            timeout=timeout
+        )
+        return ''.join(block.text for block in response.content if block.type == 'text')
+
+
+class OpenAIBackend(VisionBackend):
+    """GPT vision via the openai package (OPENAI_API_KEY)"""
+
+    name = 'openai'
+
+    def __init__(self, model=None, api_key=None):
+        super().__init__(model)
+        try:
+            import openai
+        except ImportError:
+            raise VisionBackendError("The openai backend needs: pip3 install openai")
+        self.client = openai.OpenAI(api_key=api_key, max_retries=0)
+
+    def complete(self, images, prompt, timeout):
+        content = [{'type': 'text', 'text': prompt}]
+        content.extend(
+            {
+                'type': 'image_url',
+                'image_url': {'url': f"data:{media_type};base64,{base64.b64encode(data).decode('ascii')}"}
+            }
+            for data, media_type in images
+        )
+        response = self.client.chat.completions.create(
+            model=self.model,
+            max_tokens=1024,
+            response_format={'type': 'json_object'},
+            messages=[{'role': 'user', 'content': content}],
+            timeout=timeout
+        )
+        return response.choices[0].message.content
+
+
+class LocalHTTPBackend(VisionBackend):
+    """Any HTTP endpoint taking {model, prompt, images: [{data, mediaType}]} and returning JSON
+
+    Used with mock_vision_server.py for testing, or a self-hosted model behind a small adapter.
+    """
+
+    name = 'local'
+
+    def __init__(self, model=None, url=None):
+        super().__init__(model)
+        self.url = url or DEFAULT_LOCAL_URL
+
+    def complete(self, images, prompt, timeout):
+        body = json.dumps({
+            'model': self.model,
+            'prompt': prompt,
+            'images': [
+                {'data': base64.b64encode(data).decode('ascii'), 'mediaType': media_type}
+                for data, media_type in images
+            ]
+        }).encode('utf-8')
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return response.read().decode('utf-8')
+        except urllib.error.HTTPError as e:
+            raise VisionBackendError(f"{self.url} returned {e.code}", retryable=e.code in RETRYABLE_STATUSES)
+
+
+BACKENDS = {
+    'template': TemplateBackend,
+    'anthropic': AnthropicBackend,
+    'openai': OpenAIBackend,
+    'local': LocalHTTPBackend,
+}
+
+
+def backend_from_env():
+    """Build the backend named by DEPOP_VISION_BACKEND (template if unset)"""
+    name = os.environ.get('DEPOP_VISION_BACKEND', 'template').lower()
+    if name not in BACKENDS:
+        raise VisionBackendError(f"Unknown vision backend: {name} (choose from {', '.join(BACKENDS)})")
+    model = os.environ.get('DEPOP_VISION_MODEL')
+    if name == 'local':
+        return LocalHTTPBackend(model, os.environ.get('DEPOP_VISION_URL'))
+    return BACKENDS[name](model)
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class ConcurrentAnalyzer:
+    """Runs backend calls for many photos at once, within rate and concurrency limits"""
+
+    def __init__(self, backend, max_workers=4, requests_per_minute=50, timeout=60,
+                 max_retries=3, backoff=1.0, cache=None, payloads=None):
+        self.backend = backend
+        # PayloadPreparer that encodes photos in a process pool (inline encoding if None)
+        self.payloads = payloads
+        # Placeholder results aren't worth caching
+        self.cache = cache if backend.name != 'template' else None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.bucket = TokenBucket(requests_per_minute / 60.0, capacity=max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='vision')
+        self.calls = 0  # backend calls made, including retries
+        self.cache_hits = 0
+        self._calls_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, backend=None, cache=None, payloads=None):
+        return cls(
+            backend or backend_from_env(),
+            max_workers=int(os.environ.get('DEPOP_VISION_WORKERS', 4)),
+            requests_per_minute=float(os.environ.get('DEPOP_VISION_RPM', 50)),
+            cache=cache,
+            payloads=payloads
+        )
+
+    def _normalise(self, image_paths):
+        return [image_paths] if isinstance(image_paths, (str, Path)) else list(image_paths)
+
+    def _prepare_images(self, image_paths):
+        if not self.backend.needs_images:
+            return []
+        if self.payloads is not None:
+            return self.payloads.prepare(image_paths)
+        return [(render_payload(path), PAYLOAD_MEDIA_TYPE) for path in image_paths]
+
+    def prefetch(self, image_paths):
+        """Start encoding payloads for photos whose analysis isn't cached yet"""
+        image_paths = self._normalise(image_paths)
+        if self.payloads is None or not self.backend.needs_images:
+            return
+        if self.cache and self.cache.get(self.cache.key_for(image_paths, self.backend)) is not None:
+            return
+        self.payloads.submit(image_paths)
+
+    def analyze(self, image_paths):
+        """Analyze one item (one or more photos of it) in the calling thread; returns the analysis dict"""
+        image_paths = self._normalise(image_paths)
+
+        # Same photo contents + model + prompt version -> reuse the earlier answer
+        cache_key = self.cache.key_for(image_paths, self.backend) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                with self._calls_lock:
+                    self.cache_hits += 1
+                return cached
+
+        images = self._prepare_images(image_paths)
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self._calls_lock:
+                self.calls += 1
+            try:
+                analysis = self.backend.analyze(images, ANALYSIS_PROMPT, timeout=self.timeout)
+                if cache_key:
+                    self.cache.put(cache_key, analysis)
+                return analysis
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                # Exponential backoff with jitter so parallel retries don't line up
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                print(f"⏳ {Path(image_paths[0]).name}: {e} - retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def submit(self, image_paths):
+        """Start analyzing in the background; returns a Future for the analysis dict"""
+        return self._pool.submit(self.analyze, image_paths)
+
+    def submit_call(self, fn, *args):
+        """Run fn(*args) on the analyzer's pool, for wrappers around analyze(); returns a Future"""
+        return self._pool.submit(fn, *args)
+
+    def analyze_many(self, items):
+        """Analyze several items concurrently; returns [(item, analysis or None, error or None)] in order"""
+        futures = [(item, self.submit(item)) for item in items]
+        results = []
+        for item, future in futures:
+            try:
+                results.append((item, future.result(), None))
+            except Exception as e:
+                results.append((item, None, e))
+        return results
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+        if self.payloads is not None:
+            self.payloads.shutdown()